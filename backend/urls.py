@@ -29,6 +29,7 @@ urlpatterns = [
     path('api/v1/', include('background.urls')),                                    # 'background' 앱의 URL을 포함
     path('api/v1/', include('recreated_background.urls')),                          # 'recreated_background' 앱의 URL을 포함
     path('api/v1/', include('image_resizing.urls')),                                # 'image_resizing' 앱의 URL을 포함
+    path('api/v1/', include('common.urls')),                                        # 'common' 앱의 URL을 포함 (작업 상태)
     path('', include('django_prometheus.urls')),                                    # 'django_prometheus' 앱의 URL을 포함
 ]
 
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('background', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='background',
+            name='byte_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='background',
+            name='format',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='background',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='background',
+            name='mode',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='background',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
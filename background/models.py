@@ -8,11 +8,17 @@ class Background(models.Model):
     concept_option = models.TextField(default='default_concept')  # 기본값 설정
     output_h = models.IntegerField()
     output_w = models.IntegerField()
-    image_url = models.CharField(max_length=500)
+    image_url = models.CharField(max_length=500, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
     recreated = models.BooleanField(default=False)
+    # 생성된 결과 이미지의 메타데이터
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True, default='')
+    mode = models.CharField(max_length=10, blank=True, default='')
+    byte_size = models.PositiveBigIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f'Background {self.id} for {self.user.nickname}'
@@ -5,6 +5,7 @@ class BackgroundSerializer(serializers.ModelSerializer):
     class Meta:
         model = Background
         fields = [
-            'id', 'user', 'image_url', 'output_h', 'output_w'
+            'id', 'user', 'image_url', 'output_h', 'output_w',
+            'width', 'height', 'format', 'mode', 'byte_size'
         ]
-        read_only_fields = ['id', 'image_url']
+        read_only_fields = ['id', 'image_url', 'width', 'height', 'format', 'mode', 'byte_size']
@@ -1,15 +1,15 @@
 from celery import shared_task
+from celery.exceptions import Retry
 from .models import Background, Image, User
 from .serializers import BackgroundSerializer
-import requests
-import io
-import base64
-import boto3
-from PIL import Image as PILImage
 import json
 from django.conf import settings
+from django.utils import timezone
 import logging
 import redis
+from common import storage, draph, jobs, generation
+from common.locks import release_lock
+from common.retry import retry_or_dead_letter
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
@@ -17,56 +17,130 @@ logger = logging.getLogger(__name__)
 # Redis 클라이언트 설정
 redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
 
-@shared_task
-def generate_background_task(user_id, image_id, gen_type, output_w, output_h, concept_option, unique_filename):
-    try:
-        user = User.objects.get(id=user_id)
-        image = Image.objects.get(id=image_id)
-        image_url = image.image_url
-        image_response = requests.get(image_url)
-        image_response.raise_for_status()
-        image_file = io.BytesIO(image_response.content)
-        url = "https://api.draph.art/v1/generate/"
-        headers = {'Authorization': f'Bearer {settings.DRAPHART_API_KEY}'}
-        files = {'image': ('image.jpg', image_file, 'image/jpeg')}
-        data = {
-            "username": settings.DRAPHART_USER_NAME,
-            "gen_type": gen_type,
-            "multiblob_sod": settings.DRAPHART_MULTIBLOD_SOD,
-            "output_w": output_w,
-            "output_h": output_h,
-            "bg_color_hex_code": settings.DRAPHART_BD_COLOR_HEX_CODE,
-            'concept_option': json.dumps(concept_option),
-        }
-
-        response = requests.post(url, headers=headers, data=data, files=files)
-        response_data = response.content
-        image_data = base64.b64decode(response_data)
-        image_bytes = io.BytesIO(image_data)
-        pil_image = PILImage.open(image_bytes)
-        pil_image = pil_image.convert('RGB')
-        png_image_bytes = io.BytesIO()
-        pil_image.save(png_image_bytes, format='PNG')
-        png_image_bytes.seek(0)
-
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        s3.upload_fileobj(png_image_bytes, settings.AWS_STORAGE_BUCKET_NAME, unique_filename,
-                          ExtraArgs={'ContentType': 'image/png'})
-        s3_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
-
-        background_image = Background.objects.create(
+
+def regenerate_lock_key(background_id):
+    return f'background_regenerate_{background_id}'
+
+
+def acquire_regenerate_lock(background_id, task_id):
+    """
+    배경 이미지 재생성 잠금을 잡습니다. 이미 진행 중인 재생성 작업이 있으면 그 작업 ID를 반환하고,
+    잠금을 잡았으면 None을 반환합니다.
+    """
+    lock_key = regenerate_lock_key(background_id)
+    for _ in range(2):
+        if redis_client.set(lock_key, task_id, nx=True, ex=settings.BACKGROUND_REGENERATE_LOCK_TTL):
+            return None
+        running_task_id = redis_client.get(lock_key)
+        # 조회 직전에 잠금이 만료된 경우 한 번 더 시도
+        if running_task_id:
+            return running_task_id.decode('utf-8')
+    return None
+
+
+def release_regenerate_lock(background_id, task_id):
+    release_lock(redis_client, regenerate_lock_key(background_id), task_id)
+
+def create_backgrounds(user, image, gen_type, output_w, output_h, concept_option, results):
+    """
+    생성 결과마다 Background 행을 하나의 bulk_create로 만들고, 만든 행 목록을 반환합니다.
+    MySQL은 bulk_create 후 기본 키를 돌려주지 않으므로 그럴 때는 방금 만든 행을 다시 조회합니다.
+    """
+    backgrounds = Background.objects.bulk_create([
+        Background(
             user=user,
             image=image,
             gen_type=gen_type,
             concept_option=json.dumps(concept_option),
             output_w=output_w,
             output_h=output_h,
-            image_url=s3_url
+            image_url=result['image_url'],
+            **result['image_info']
         )
+        for result in results
+    ])
+    if all(background.pk for background in backgrounds):
+        return backgrounds
+
+    image_urls = [result['image_url'] for result in results]
+    created = Background.objects.filter(user=user, image=image, image_url__in=image_urls).order_by('-id')[:len(results)]
+    return sorted(created, key=lambda background: (image_urls.index(background.image_url), background.id))
+
+
+@shared_task(bind=True)
+def generate_background_task(self, user_id, image_id, gen_type, output_w, output_h, concept_option, unique_filename):
+    try:
+        user = User.objects.get(id=user_id)
+        image = Image.objects.get(id=image_id)
+        data = draph.build_generate_data(gen_type, output_w, output_h, concept_option)
+        # concept_option의 num_results만큼 결과가 오며, 결과마다 Background 행을 만듦
+        results = generation.generate_images(image, data, unique_filename, self.request.id)
+        backgrounds = create_backgrounds(user, image, gen_type, output_w, output_h, concept_option, results)
 
         redis_client.delete(f'background_image_url_{image_id}')
 
-        return BackgroundSerializer(background_image).data
+        # 첫 번째 결과는 결과가 하나일 때와 같은 필드로도 전달
+        jobs.succeed_job(self.request.id, {
+            "background_id": backgrounds[0].id,
+            "image_url": backgrounds[0].image_url,
+            "background_ids": [background.id for background in backgrounds],
+            "image_urls": [background.image_url for background in backgrounds],
+        })
+        return BackgroundSerializer(backgrounds, many=True).data
     except Exception as e:
         logger.error("Error in generate_background_task: %s", e)
+        # 일시적인 오류면 재시도하고, 그 외에는 DeadLetter에 기록
+        retry_or_dead_letter(self, e)
+        return {"error": str(e)}
+
+
+@shared_task(bind=True)
+def regenerate_background_task(self, background_id, unique_filename):
+    retrying = False
+    try:
+        background = Background.objects.select_related('image').get(id=background_id)
+        try:
+            concept_option = json.loads(background.concept_option)
+        except json.JSONDecodeError as e:
+            logger.error("JSONDecodeError: %s", e)
+            concept_option = {}  # 기본값 설정
+
+        data = draph.build_generate_data(background.gen_type, background.output_w, background.output_h, concept_option)
+        # 재생성 요청이므로 현재 이미지와 같은 캐시 결과는 사용하지 않음
+        s3_url, image_info = generation.generate_image(
+            background.image, data, unique_filename, self.request.id, exclude_url=background.image_url
+        )
+
+        # 생성 결과 컬럼만 하나의 UPDATE로 반영 (작업 중에 바뀐 다른 필드를 덮어쓰지 않음)
+        updated = Background.objects.filter(id=background_id).update(
+            image_url=s3_url,
+            recreated=True,
+            updated_at=timezone.now(),
+            **image_info
+        )
+        if not updated:
+            # 작업 중에 배경 이미지가 삭제된 경우 새로 올린 파일도 정리 (다른 행이 참조 중이면 삭제 큐에서 건너뜀)
+            storage.enqueue_delete(storage.key_from_url(s3_url))
+            jobs.fail_job(self.request.id, "해당 배경 이미지가 없습니다.")
+            return {"error": "해당 배경 이미지가 없습니다."}
+
+        # 교체된 이전 이미지는 삭제 큐에 추가 (캐시로 공유 중인 객체는 삭제 큐에서 건너뜀)
+        storage.enqueue_delete(storage.key_from_url(background.image_url))
+
+        background.refresh_from_db()
+        jobs.succeed_job(self.request.id, {"background_id": background_id, "image_url": s3_url})
+        return BackgroundSerializer(background).data
+    except Exception as e:
+        logger.error("Error in regenerate_background_task: %s", e)
+        try:
+            retry_or_dead_letter(self, e)
+        except Retry as retry:
+            # 재시도하는 동안에는 잠금을 유지해 같은 배경 이미지의 재생성 요청이 계속 합쳐지도록 함
+            # (재시도 대기 시간과 실행 시간 동안 잠금이 만료되지 않도록 연장)
+            retrying = True
+            redis_client.expire(regenerate_lock_key(background_id), int(retry.when or 0) + settings.CELERYD_TASK_TIME_LIMIT)
+            raise
         return {"error": str(e)}
+    finally:
+        if not retrying:
+            release_regenerate_lock(background_id, self.request.id)
@@ -5,7 +5,11 @@ from rest_framework.test import APIClient
 from user.models import User
 from image.models import Image
 from background.models import Background
+from background.tasks import create_backgrounds, regenerate_background_task, regenerate_lock_key
+from celery.exceptions import Retry
+from django.conf import settings
 import uuid
+from unittest.mock import patch
 
 @pytest.mark.integration
 @pytest.mark.django_db
@@ -60,9 +64,30 @@ class TestBackgroundAPI:
             image_url='http://testserver/media/test_background.png'
         )
         update_background_url = reverse('background-manage', kwargs={'background_id': background.id})
-        response = self.client.put(update_background_url)
-        assert response.status_code == status.HTTP_200_OK
-        assert 'image_url' in response.data
+        with patch('background.views.acquire_regenerate_lock', return_value=None), \
+                patch('background.views.jobs.create_job'), \
+                patch('background.views.regenerate_background_task.apply_async') as mock_apply_async:
+            response = self.client.put(update_background_url)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['coalesced'] is False
+        mock_apply_async.assert_called_once()
+
+    def test_update_background_coalesced(self): #진행 중인 재생성 작업에 합쳐지는지 테스트
+        background = Background.objects.create(
+            user=self.user,
+            image=self.image,
+            gen_type='simple',
+            output_w=1000,
+            output_h=1000,
+            image_url='http://testserver/media/test_background.png'
+        )
+        update_background_url = reverse('background-manage', kwargs={'backgroundId': background.id})
+        with patch('background.views.acquire_regenerate_lock', return_value='running-task-id'), \
+                patch('background.views.regenerate_background_task.apply_async') as mock_apply_async:
+            response = self.client.put(update_background_url)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data == {"task_id": 'running-task-id', "coalesced": True}
+        mock_apply_async.assert_not_called()
 
     def test_delete_background(self): #배경 이미지 삭제 테스트
         background = Background.objects.create(
@@ -93,3 +118,42 @@ class TestBackgroundAPI:
         delete_background_url = reverse('background-manage', kwargs={'background_id': uuid.uuid4()})
         response = self.client.delete(delete_background_url)
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_backgrounds_bulk(self): #생성 결과 여러 개를 Background 행으로 한 번에 저장하는지 테스트
+        results = [
+            {'image_url': f'http://testserver/media/result_{index}.png',
+             'image_info': {'width': 1000, 'height': 1000, 'format': 'PNG', 'mode': 'RGB', 'byte_size': 100}}
+            for index in range(3)
+        ]
+        backgrounds = create_backgrounds(self.user, self.image, 'simple', 1000, 1000, {'num_results': 3}, results)
+        assert [background.image_url for background in backgrounds] == [result['image_url'] for result in results]
+        assert all(background.pk for background in backgrounds)
+        assert Background.objects.filter(image=self.image).count() == 3
+
+    def test_cached_generation_returns_completed_job(self): #생성 결과 캐시를 사용해도 작업 접수와 같은 응답(202, task_id)을 반환하는지 테스트
+        self.image.sha256 = 'a' * 64
+        self.image.save()
+        cached = [{'image_url': 'http://testserver/media/cached.png',
+                   'image_info': {'width': 1000, 'height': 1000, 'format': 'PNG', 'mode': 'RGB', 'byte_size': 100}}]
+        payload = {'user_id': self.user.id, 'image_id': self.image.id, 'gen_type': 'simple', 'concept_option': {}}
+        with patch('background.views.generation_cache.get', return_value=cached), \
+                patch('background.views.jobs.create_succeeded_job', return_value='job-1') as mock_succeeded, \
+                patch('background.views.generate_background_task') as mock_task:
+            response = self.client.post(self.backgrounds_url, payload, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data == {'task_id': 'job-1', 's3_url': 'http://testserver/media/cached.png'}
+        background = Background.objects.get(image=self.image)
+        assert mock_succeeded.call_args.args[1]['background_ids'] == [background.id]
+        mock_task.apply_async.assert_not_called()
+
+    def test_regenerate_retry_extends_lock(self): #재시도 대기 중에도 재생성 잠금이 만료되지 않도록 연장하는지 테스트
+        background = Background.objects.create(
+            user=self.user, image=self.image, gen_type='simple', concept_option='{}',
+            output_w=1000, output_h=1000, image_url='http://testserver/media/test_background.png'
+        )
+        with patch('background.tasks.generation.generate_image', side_effect=RuntimeError('timeout')), \
+                patch('background.tasks.retry_or_dead_letter', side_effect=Retry(when=300)), \
+                patch('background.tasks.redis_client') as mock_redis:
+            with pytest.raises(Retry):
+                regenerate_background_task(background.id, 'result.png')
+        mock_redis.expire.assert_called_once_with(regenerate_lock_key(background.id), 300 + settings.CELERYD_TASK_TIME_LIMIT)
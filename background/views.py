@@ -5,16 +5,13 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Background, Image, User
 from .serializers import BackgroundSerializer
-import requests
-import io
 import uuid
-import base64
-import boto3
-from PIL import Image as PILImage
-import json
 import logging
-from django.conf import settings
-from .tasks import generate_background_task
+from .tasks import (generate_background_task, regenerate_background_task, acquire_regenerate_lock,
+                    release_regenerate_lock, create_backgrounds)
+from common import storage, jobs, draph, generation_cache, encoding
+from django.core.exceptions import ValidationError
+from common.webhooks import validate_callback_url
 import redis
 
 # 로깅 설정
@@ -41,11 +38,12 @@ GEN_TYPES = ['remove_bg', 'color_bg', 'simple', 'concept']
                 'theme': openapi.Schema(type=openapi.TYPE_STRING, description='Theme'),
                 'num_results': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of Results', minimum=1, maximum=4)
             }),
+            'callback_url': openapi.Schema(type=openapi.TYPE_STRING, description='작업 완료 시 웹훅을 받을 URL'),
         },
         required=['user_id', 'image_id', 'gen_type']
     ),
     responses={
-        201: openapi.Response('AI 이미지 생성 성공', BackgroundSerializer(many=True)),
+        202: 'AI 이미지 생성 작업 접수 (task_id로 진행 상태 조회, 같은 요청의 생성 결과를 재사용한 경우 이미 완료된 작업)',
         400: 'Bad Request',
         500: 'Internal Server Error'
     }
@@ -59,10 +57,16 @@ def backgrounds_view(request):
     output_h = request.data.get('output_h', 1000)
     output_w = request.data.get('output_w', 1000)
     concept_option = request.data.get('concept_option', {})
+    callback_url = request.data.get('callback_url')
 
     # 필수 필드 확인
     if not (user_id and image_id and gen_type):
         return Response({"error": "user_id, image_id, and gen_type are required"}, status=status.HTTP_400_BAD_REQUEST)
+    if callback_url:
+        try:
+            validate_callback_url(callback_url)
+        except ValidationError:
+            return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
 
     # 유효한 gen_type 확인
     if gen_type not in GEN_TYPES:
@@ -81,16 +85,38 @@ def backgrounds_view(request):
     except Image.DoesNotExist:
         return Response({"error": "이미지 없음"}, status=status.HTTP_404_NOT_FOUND)
 
+    # 같은 원본 이미지와 요청 데이터로 생성한 결과가 있으면 Draph 호출 없이 바로 반환
+    if image.sha256:
+        data = draph.build_generate_data(gen_type, output_w, output_h, concept_option)
+        cached = generation_cache.get(generation_cache.make_key(image.sha256, data))
+        if cached is not None:
+            backgrounds = create_backgrounds(user, image, gen_type, output_w, output_h, concept_option, cached)
+            logger.info(f"Reused cached generation result for image_id {image_id}: {cached[0]['image_url']}")
+            # 작업을 접수한 경우와 같은 응답을 반환하고, task_id로 조회하면 이미 완료된 작업의 결과를 받음
+            # (콜백 URL을 받았으면 완료 웹훅도 전송)
+            task_id = jobs.create_succeeded_job('background_generate', {
+                "background_id": backgrounds[0].id,
+                "image_url": backgrounds[0].image_url,
+                "background_ids": [background.id for background in backgrounds],
+                "image_urls": [background.image_url for background in backgrounds],
+            }, callback_url)
+            return Response({"task_id": task_id, "s3_url": backgrounds[0].image_url}, status=status.HTTP_202_ACCEPTED)
+
     # UUID 생성 및 S3 URL 설정
-    unique_filename = f"{uuid.uuid4()}.png"
-    s3_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
+    unique_filename = encoding.output_filename(str(uuid.uuid4()))
+    s3_url = storage.build_url(unique_filename)
     redis_client.set(f'background_image_url_{image_id}', s3_url)
 
     # 로그 추가
     logger.info(f"Temporary S3 URL for image_id {image_id}: {s3_url}")
 
     # 비동기 작업으로 배경 이미지 생성
-    task = generate_background_task.delay(user_id, image_id, gen_type, output_w, output_h, concept_option, unique_filename)
+    # 작업 ID는 Celery 태스크 ID와 같으며, 태스크 발행 전에 상태 레코드를 만들어 바로 조회할 수 있게 함
+    task_id = str(uuid.uuid4())
+    jobs.create_job(task_id, 'background_generate', callback_url)
+    task = generate_background_task.apply_async(
+        args=(user_id, image_id, gen_type, output_w, output_h, concept_option, unique_filename), task_id=task_id
+    )
 
     return Response({"task_id": task.id, "s3_url": s3_url}, status=status.HTTP_202_ACCEPTED)
 
@@ -108,10 +134,23 @@ def backgrounds_view(request):
 @swagger_auto_schema(
     method='put',
     operation_id='생성된 이미지 수정',
-    operation_description='생성된 이미지를 수정합니다.',
+    operation_description='생성된 이미지를 다시 생성합니다. 작업은 비동기로 처리되며, 이미 진행 중인 재생성 작업이 있으면 그 작업 ID를 반환합니다.',
     tags=['backgrounds'],
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'callback_url': openapi.Schema(type=openapi.TYPE_STRING, description='작업 완료 시 웹훅을 받을 URL'),
+        }
+    ),
     responses={
-        200: BackgroundSerializer,
+        202: openapi.Response('재생성 요청 접수', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'task_id': openapi.Schema(type=openapi.TYPE_STRING, description='Celery Task ID'),
+                's3_url': openapi.Schema(type=openapi.TYPE_STRING, description='재생성될 이미지의 S3 URL'),
+                'coalesced': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='진행 중인 작업에 합쳐졌는지 여부'),
+            }
+        )),
         400: "Bad Request",
         404: "Background not found.",
     }
@@ -140,95 +179,39 @@ def background_manage(request, backgroundId):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'PUT':
-        # 배경 이미지 수정
-        user = background.user
-        image = background.image
-        gen_type = background.gen_type
-        try:
-            concept_option = json.loads(background.concept_option)
-        except json.JSONDecodeError as e:
-            logger.error("JSONDecodeError: %s", e)
-            concept_option = {}  # 기본값 설정
-
-        output_w = background.output_w
-        output_h = background.output_h
-
-        # 이미지 URL에서 이미지 다운로드
-        image_url = image.image_url
-        try:
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
-            image_file = io.BytesIO(image_response.content)
-            logger.debug("Downloaded image from URL: %s", image_url)
-        except requests.RequestException as e:
-            logger.error("Failed to download image: %s", e)
-            return Response({"error": "Failed to download image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # Draph.art API 호출 준비
-        url = "https://api.draph.art/v1/generate/"
-        headers = {'Authorization': f'Bearer {settings.DRAPHART_API_KEY}'}
-
-        # 파일 객체에 파일 이름을 수동으로 추가
-        files = {
-            'image': ('image.jpg', image_file, 'image/jpeg')
-        }
-
-        # 요청 데이터 구성
-        data = {
-            "username": settings.DRAPHART_USER_NAME,
-            "gen_type": gen_type,
-            "multiblob_sod": settings.DRAPHART_MULTIBLOD_SOD,
-            "output_w": output_w,
-            "output_h": output_h,
-            "bg_color_hex_code": settings.DRAPHART_BD_COLOR_HEX_CODE,
-            'concept_option': json.dumps(concept_option),
-        }
-
-        # API 호출
-        response = requests.post(url, headers=headers, data=data, files=files)
-
-        if response.status_code != 200:
-            logger.debug("AI 이미지 생성 실패: %s", response.text)
-            return Response({"error": "AI 이미지 생성 실패", "details": response.text}, status=status.HTTP_400_BAD_REQUEST)
-
-        response_data = response.content
-
+        # 배경 이미지 재생성 (작업 큐에 넣고 바로 응답)
+        callback_url = request.data.get('callback_url')
+        if callback_url:
+            try:
+                validate_callback_url(callback_url)
+            except ValidationError:
+                return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
+
+        task_id = str(uuid.uuid4())
+        running_task_id = acquire_regenerate_lock(background.id, task_id)
+        if running_task_id:
+            # 같은 배경 이미지에 대해 진행 중인 재생성 작업이 있으면 그 작업으로 합침
+            logger.info(f"Background {background.id} regeneration already running: {running_task_id}")
+            if callback_url:
+                jobs.add_callback(running_task_id, callback_url)
+            return Response({"task_id": running_task_id, "coalesced": True}, status=status.HTTP_202_ACCEPTED)
+
+        unique_filename = encoding.output_filename(str(uuid.uuid4()))
+        s3_url = storage.build_url(unique_filename)
         try:
-            # base64 이미지를 디코딩하고 처리
-            image_data = base64.b64decode(response_data)
-            image_bytes = io.BytesIO(image_data)
-            pil_image = PILImage.open(image_bytes)
-            pil_image = pil_image.convert('RGB')
-            png_image_bytes = io.BytesIO()
-            pil_image.save(png_image_bytes, format='PNG')
-            png_image_bytes.seek(0)
-
-            # S3에 업로드
-            s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-            unique_filename = f"{uuid.uuid4()}.png"
-            s3.upload_fileobj(png_image_bytes, settings.AWS_STORAGE_BUCKET_NAME, unique_filename, ExtraArgs={'ContentType': 'image/png'})
-            s3_url = f"http://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
-
-        except Exception as e:
-            logger.error("Error uploading to S3: %s", e)
-            return Response({"error": "Failed to upload image to S3", "details": str(e)},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            jobs.create_job(task_id, 'background_regenerate', callback_url)
+            regenerate_background_task.apply_async(args=(background.id, unique_filename), task_id=task_id)
+        except Exception:
+            release_regenerate_lock(background.id, task_id)
+            raise
 
-        # Background 모델 업데이트
-        background.image_url = s3_url
-        background.recreated = True
-        background.save()
-
-        # 성공적으로 저장되었음을 클라이언트에게 반환
-        serializer = BackgroundSerializer(background)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response({"task_id": task_id, "s3_url": s3_url, "coalesced": False}, status=status.HTTP_202_ACCEPTED)
 
     elif request.method == 'DELETE':
         # 배경 이미지 삭제
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        file_key = background.image_url.split('/')[-1]
         try:
-            s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+            # S3 파일 삭제는 큐에 추가하고 백그라운드에서 일괄 처리
+            storage.enqueue_delete(storage.key_from_url(background.image_url))
         except Exception as e:
             logger.error("S3 파일 삭제 오류: %s", e)
             return Response({"error": "S3 파일 삭제 오류", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -9,7 +9,7 @@ from django.contrib.auth.models import User
 from .models import Banner, UserInteraction, Image
 from .serializers import BannerSerializer, BannerDetailSerializer, BannerUpdateSerializer
 import environ
-from asgiref.sync import async_to_sync
+from common import http_client
 
 # 환경 변수 로드
 env = environ.Env()
@@ -21,8 +21,8 @@ openai_api_key = env("OPENAI_API_KEY")
 # 로거 설정
 logger = logging.getLogger(__name__)
 
-# 광고 문구 생성을 위한 비동기 함수
-async def generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data):
+# 광고 문구 생성을 위한 함수
+def generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data):
     headers = {
         'Authorization': f'Bearer {openai_api_key}',  # OpenAI API 키를 헤더에 포함
         'Content-Type': 'application/json'
@@ -39,19 +39,20 @@ async def generate_ad_text(item_name, item_concept, item_category, add_informati
         "max_tokens": 50  # 최대 토큰 수를 50으로 설정
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post('https://api.openai.com/v1/chat/completions', headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
-            maintext = response_json['choices'][0]['message']['content'].strip()
-            return maintext[:20]  # 광고 문구를 최대 20자 이내로 제한
-        except httpx.HTTPStatusError as exc:
-            logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
-            raise
+    # 공유 커넥션 풀 사용 (매 호출마다 새 연결을 맺지 않음)
+    client = http_client.get_client('openai')
+    try:
+        response = client.post('https://api.openai.com/v1/chat/completions', headers=headers, json=data)
+        response.raise_for_status()
+        response_json = response.json()
+        maintext = response_json['choices'][0]['message']['content'].strip()
+        return maintext[:20]  # 광고 문구를 최대 20자 이내로 제한
+    except httpx.HTTPStatusError as exc:
+        logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
+        raise
 
-# 서브 광고 문구 생성을 위한 비동기 함수
-async def generate_serve_text(maintext, item_concept, item_category, add_information, interaction_data):
+# 서브 광고 문구 생성을 위한 함수
+def generate_serve_text(maintext, item_concept, item_category, add_information, interaction_data):
     headers = {
         'Authorization': f'Bearer {openai_api_key}',  # OpenAI API 키를 헤더에 포함
         'Content-Type': 'application/json'
@@ -69,23 +70,24 @@ async def generate_serve_text(maintext, item_concept, item_category, add_informa
         "max_tokens": 50  # 최대 토큰 수를 50으로 설정
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post('https://api.openai.com/v1/chat/completions', headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
-            servetext = response_json['choices'][0]['message']['content'].strip()
-            return servetext[:30]  # 서브 광고 문구를 최대 30자 이내로 제한
-        except httpx.HTTPStatusError as exc:
-            logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
-            raise
+    # 공유 커넥션 풀 사용 (매 호출마다 새 연결을 맺지 않음)
+    client = http_client.get_client('openai')
+    try:
+        response = client.post('https://api.openai.com/v1/chat/completions', headers=headers, json=data)
+        response.raise_for_status()
+        response_json = response.json()
+        servetext = response_json['choices'][0]['message']['content'].strip()
+        return servetext[:30]  # 서브 광고 문구를 최대 30자 이내로 제한
+    except httpx.HTTPStatusError as exc:
+        logger.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
+        raise
 
-# 광고 문구와 서브 광고 문구를 생성하는 비동기 함수
-async def generate_ad_and_serve_texts(item_name, item_concept, item_category, add_information, interaction_data):
-    maintext = await generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data)
-    servetext = await generate_serve_text(maintext, item_concept, item_category, add_information, interaction_data)
-    maintext2 = await generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data)
-    servetext2 = await generate_serve_text(maintext2, item_concept, item_category, add_information, interaction_data)
+# 광고 문구와 서브 광고 문구를 생성하는 함수
+def generate_ad_and_serve_texts(item_name, item_concept, item_category, add_information, interaction_data):
+    maintext = generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data)
+    servetext = generate_serve_text(maintext, item_concept, item_category, add_information, interaction_data)
+    maintext2 = generate_ad_text(item_name, item_concept, item_category, add_information, interaction_data)
+    servetext2 = generate_serve_text(maintext2, item_concept, item_category, add_information, interaction_data)
     return maintext, servetext, maintext2, servetext2
 
 # Swagger를 이용한 API 문서화와 배너 생성 API
@@ -136,8 +138,8 @@ def create_banner(request):
         interaction_records = UserInteraction.objects.filter(image_id=image_instance).order_by('-created_at')
         interaction_data = " ".join(record.interaction_data for record in interaction_records)
 
-        # 비동기 태스크로 광고 문구 생성
-        maintext, servetext, maintext2, servetext2 = async_to_sync(generate_ad_and_serve_texts)(
+        # 광고 문구 생성
+        maintext, servetext, maintext2, servetext2 = generate_ad_and_serve_texts(
             item_name, item_concept, item_category, add_information, interaction_data
         )
 
@@ -243,7 +245,7 @@ def handle_banner(request, bannerId):
             interaction_data = " ".join(record.interaction_data for record in interaction_records)
 
             # 광고 문구와 서브 광고 문구 생성
-            maintext, servetext, maintext2, servetext2 = async_to_sync(generate_ad_and_serve_texts)(
+            maintext, servetext, maintext2, servetext2 = generate_ad_and_serve_texts(
                 item_name, item_concept, item_category, add_information, interaction_data
             )
 
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from common.models import WebhookDelivery, DeadLetter
+
+
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'job_id', 'event', 'url', 'status', 'attempts', 'response_status', 'created_at', 'delivered_at']
+    list_filter = ['status', 'event']
+    search_fields = ['job_id', 'url']
+
+admin.site.register(WebhookDelivery, WebhookDeliveryAdmin)
+
+
+class DeadLetterAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task_name', 'task_id', 'job_id', 'error_class', 'transient', 'retries', 'status', 'created_at', 'replayed_at']
+    list_filter = ['status', 'task_name', 'transient']
+    search_fields = ['task_id', 'job_id', 'error']
+
+admin.site.register(DeadLetter, DeadLetterAdmin)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class CommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'common'
+
+    def ready(self):
+        # Celery 작업별 메모리 사용량 기록
+        from common import memory  # noqa: F401
+        # Celery 워커 메트릭 엔드포인트
+        from common import worker_metrics  # noqa: F401
@@ -0,0 +1,266 @@
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+import httpx
+import redis
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+STATE_CLOSED = 'closed'
+STATE_HALF_OPEN = 'half_open'
+STATE_OPEN = 'open'
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+# 회로 차단기 상태 전이 (모든 워커와 웹 서버가 Redis의 같은 상태를 공유)
+# ARGV: 동작(allow, success, failure, release), 실패 임계값, 실패 집계 구간, 차단 유지 시간, 시험 호출 제한 시간
+# 반환: {허용 여부, 이전 상태, 현재 상태}
+BREAKER_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local op = ARGV[1]
+local threshold = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local cooldown = tonumber(ARGV[4])
+local probe_timeout = tonumber(ARGV[5])
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+
+local function transition(new_state)
+    redis.call('HSET', KEYS[1], 'state', new_state, 'changed_at', tostring(now))
+    redis.call('HDEL', KEYS[1], 'failures', 'window_start')
+    return {1, state, new_state}
+end
+
+if op == 'allow' then
+    if state == 'open' then
+        local changed_at = tonumber(redis.call('HGET', KEYS[1], 'changed_at')) or 0
+        if now - changed_at < cooldown then
+            return {0, state, state}
+        end
+        redis.call('HSET', KEYS[1], 'probe_at', tostring(now))
+        return transition('half_open')
+    end
+    if state == 'half_open' then
+        -- 시험 호출은 하나만 보냄 (시험 호출한 프로세스가 결과를 남기지 못하고 종료된 경우에만 다시 허용)
+        local probe_at = tonumber(redis.call('HGET', KEYS[1], 'probe_at')) or 0
+        if now - probe_at < probe_timeout then
+            return {0, state, state}
+        end
+        redis.call('HSET', KEYS[1], 'probe_at', tostring(now))
+    end
+    return {1, state, state}
+end
+
+if op == 'success' then
+    if state == 'half_open' then
+        return transition('closed')
+    end
+    redis.call('HDEL', KEYS[1], 'failures', 'window_start')
+    return {1, state, state}
+end
+
+if op == 'release' then
+    -- 결과를 판단할 수 없는 시험 호출(요청을 보내지 못함 등)은 바로 다음 호출이 다시 시험하도록 함
+    if state == 'half_open' then
+        redis.call('HDEL', KEYS[1], 'probe_at')
+    end
+    return {1, state, state}
+end
+
+-- failure
+if state == 'half_open' then
+    return transition('open')
+end
+if state == 'open' then
+    return {1, state, state}
+end
+local window_start = tonumber(redis.call('HGET', KEYS[1], 'window_start')) or 0
+local failures
+if now - window_start > window then
+    redis.call('HSET', KEYS[1], 'window_start', tostring(now), 'failures', 1)
+    failures = 1
+else
+    failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+end
+if failures >= threshold then
+    return transition('open')
+end
+return {1, state, state}
+"""
+
+# 동시 호출 슬롯 확보. 작업이 비정상 종료되어 반환되지 않은 슬롯은 ttl이 지나면 정리됨
+# ARGV: 슬롯 토큰, 슬롯 유지 시간, 초기 한도
+# 반환: {확보 여부, 진행 중인 호출 수, 현재 한도}
+ACQUIRE_SLOT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local ttl = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[3])
+local inflight = redis.call('ZCARD', KEYS[1])
+if inflight >= math.max(1, math.floor(limit)) then
+    return {0, inflight, tostring(limit)}
+end
+redis.call('ZADD', KEYS[1], now + ttl, ARGV[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+return {1, inflight + 1, tostring(limit)}
+"""
+
+# 슬롯 반환과 한도 조정 (AIMD)
+# 정상 응답이면 한도를 조금씩(1/한도) 늘리고, 느리거나 실패하면 한도를 곱으로 줄임
+# 동시에 끝난 여러 호출이 한도를 연달아 줄이지 않도록 decrease_interval 안에서는 한 번만 줄임
+# ARGV: 슬롯 토큰, 결과(ok, slow, failure, neutral), 최소 한도, 최대 한도, 초기 한도, 감소 비율, decrease_interval
+# 반환: 현재 한도
+RELEASE_SLOT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local outcome = ARGV[2]
+local min_limit = tonumber(ARGV[3])
+local max_limit = tonumber(ARGV[4])
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[5])
+redis.call('ZREM', KEYS[1], ARGV[1])
+if outcome == 'ok' then
+    limit = math.min(max_limit, limit + 1 / limit)
+elseif outcome == 'slow' or outcome == 'failure' then
+    local decreased_at = tonumber(redis.call('GET', KEYS[3])) or 0
+    if now - decreased_at >= tonumber(ARGV[7]) then
+        limit = math.max(min_limit, limit * tonumber(ARGV[6]))
+        redis.call('SET', KEYS[3], tostring(now))
+    end
+end
+limit = math.max(min_limit, math.min(max_limit, limit))
+redis.call('SET', KEYS[2], tostring(limit))
+return tostring(limit)
+"""
+
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    'circuit_breaker_transitions_total', '회로 차단기 상태 전이 수', ['upstream', 'from_state', 'to_state']
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    'circuit_breaker_state', '회로 차단기 상태 (0: closed, 1: half_open, 2: open)', ['upstream'],
+    multiprocess_mode='mostrecent',
+)
+UPSTREAM_REJECTED = Counter(
+    'upstream_calls_rejected_total', '외부 API를 호출하지 않고 바로 실패한 수 (open: 차단 중, concurrency: 동시 호출 한도 초과)',
+    ['upstream', 'reason'],
+)
+ADAPTIVE_CONCURRENCY_LIMIT = Gauge('adaptive_concurrency_limit', '외부 API 동시 호출 한도', ['upstream'], multiprocess_mode='mostrecent')
+ADAPTIVE_CONCURRENCY_INFLIGHT = Gauge('adaptive_concurrency_inflight', '진행 중인 외부 API 호출 수', ['upstream'], multiprocess_mode='mostrecent')
+
+
+class UpstreamUnavailable(Exception):
+    """회로가 차단되어 있거나 동시 호출 한도를 넘어 외부 API를 호출하지 않을 때 발생합니다."""
+
+    def __init__(self, upstream, reason):
+        super().__init__(f"{upstream} 호출 불가 ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+
+
+def _breaker_key(upstream):
+    return f'circuit_breaker_{upstream}'
+
+
+def _slot_keys(upstream):
+    return (f'concurrency_inflight_{upstream}', f'concurrency_limit_{upstream}',
+            f'concurrency_decreased_at_{upstream}')
+
+
+def _breaker(upstream, op):
+    config = settings.CIRCUIT_BREAKERS[upstream]
+    allowed, from_state, to_state = redis_client.eval(
+        BREAKER_SCRIPT, 1, _breaker_key(upstream), op,
+        config['failure_threshold'], config['failure_window'], config['cooldown'], config['probe_timeout'],
+    )
+    from_state, to_state = from_state.decode('utf-8'), to_state.decode('utf-8')
+    if from_state != to_state:
+        CIRCUIT_BREAKER_TRANSITIONS.labels(upstream=upstream, from_state=from_state, to_state=to_state).inc()
+        logger.warning("Circuit breaker for %s: %s -> %s", upstream, from_state, to_state)
+    CIRCUIT_BREAKER_STATE.labels(upstream=upstream).set(STATE_VALUES[to_state])
+    return bool(allowed)
+
+
+def _acquire_slot(upstream, token):
+    config = settings.ADAPTIVE_CONCURRENCY[upstream]
+    deadline = time.monotonic() + config['max_wait']
+    while True:
+        acquired, inflight, limit = redis_client.eval(
+            ACQUIRE_SLOT_SCRIPT, 2, *_slot_keys(upstream)[:2], token, config['slot_ttl'], config['max_limit'],
+        )
+        ADAPTIVE_CONCURRENCY_LIMIT.labels(upstream=upstream).set(float(limit))
+        ADAPTIVE_CONCURRENCY_INFLIGHT.labels(upstream=upstream).set(inflight)
+        if acquired:
+            return
+        if time.monotonic() >= deadline:
+            UPSTREAM_REJECTED.labels(upstream=upstream, reason='concurrency').inc()
+            raise UpstreamUnavailable(upstream, 'concurrency')
+        time.sleep(0.25)
+
+
+def _release_slot(upstream, token, outcome):
+    config = settings.ADAPTIVE_CONCURRENCY[upstream]
+    limit = redis_client.eval(
+        RELEASE_SLOT_SCRIPT, 3, *_slot_keys(upstream), token, outcome,
+        config['min_limit'], config['max_limit'], config['max_limit'],
+        config['decrease_factor'], config['decrease_interval'],
+    )
+    ADAPTIVE_CONCURRENCY_LIMIT.labels(upstream=upstream).set(float(limit))
+
+
+def is_upstream_failure(exc):
+    """외부 API 상태 이상(연결 실패, 시간 초과, 5xx, 429)으로 볼 수 있는 예외인지 확인합니다."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    status_code = getattr(exc, 'status_code', None)
+    return status_code is not None and (status_code >= 500 or status_code == 429)
+
+
+class _Call:
+    # 호출자가 응답 시간을 직접 기록하지 않으면 전체 경과 시간을 사용
+    latency = None
+
+
+@contextmanager
+def guard(upstream):
+    """
+    외부 API 호출을 회로 차단기와 적응형 동시 호출 한도로 보호합니다.
+    회로가 차단되어 있거나 max_wait 안에 슬롯을 얻지 못하면 호출하지 않고 UpstreamUnavailable이 발생합니다.
+    블록 안에서 발생한 예외는 is_upstream_failure로 분류해 실패로 기록하고, 그 외의 응답 오류(4xx)는 성공으로 기록합니다.
+    요청을 보내지 못한 예외(속도 제한 초과 등)는 시험 호출만 반환합니다.
+    응답 시간(call.latency)이 target_latency를 넘으면 동시 호출 한도를 줄입니다.
+    """
+    if not _breaker(upstream, 'allow'):
+        UPSTREAM_REJECTED.labels(upstream=upstream, reason='open').inc()
+        raise UpstreamUnavailable(upstream, 'open')
+
+    token = uuid.uuid4().hex
+    try:
+        _acquire_slot(upstream, token)
+    except Exception:
+        # 슬롯을 얻지 못해 호출하지 않았으므로 half_open 상태에서 받은 시험 호출을 반환
+        _breaker(upstream, 'release')
+        raise
+    call = _Call()
+    started_at = time.perf_counter()
+    outcome = 'neutral'
+    try:
+        yield call
+        latency = call.latency if call.latency is not None else time.perf_counter() - started_at
+        outcome = 'slow' if latency > settings.ADAPTIVE_CONCURRENCY[upstream]['target_latency'] else 'ok'
+        _breaker(upstream, 'success')
+    except Exception as e:
+        if is_upstream_failure(e):
+            outcome = 'failure'
+            _breaker(upstream, 'failure')
+        elif getattr(e, 'status_code', None) is not None:
+            # 외부 API가 응답했으므로 상태는 정상 (half_open이면 회로를 닫음)
+            _breaker(upstream, 'success')
+        else:
+            # 결과를 남기지 않으면 half_open 상태에서 probe_timeout 동안 모든 호출이 막히므로 시험 호출을 반환
+            _breaker(upstream, 'release')
+        raise
+    finally:
+        _release_slot(upstream, token, outcome)
@@ -0,0 +1,169 @@
+import re
+import json
+import logging
+from django.conf import settings
+from common import source_cache, circuit_breaker
+from common.encoding import timed, Base64StreamDecoder
+from common.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+DRAPH_GENERATE_URL = "https://api.draph.art/v1/generate/"
+
+# 응답 본문을 읽는 단위 (64 KB)
+STREAM_CHUNK_SIZE = 64 * 1024
+# JSON 응답에서 문자열 안/밖의 의미 있는 문자
+JSON_STRING_TOKEN = re.compile(rb'["\\]')
+JSON_STRUCTURE_TOKEN = re.compile(rb'["\[\]]')
+
+
+class DraphError(Exception):
+    """Draph.art API가 이미지 생성에 실패했을 때 발생합니다."""
+
+    def __init__(self, message, details=None, status_code=None):
+        super().__init__(message)
+        self.details = details
+        self.status_code = status_code
+
+
+def build_generate_data(gen_type, output_w, output_h, concept_option):
+    """배경 이미지 생성 요청에 사용하는 기본 요청 데이터를 만듭니다."""
+    return {
+        "username": settings.DRAPHART_USER_NAME,
+        "gen_type": gen_type,
+        "multiblob_sod": settings.DRAPHART_MULTIBLOD_SOD,
+        "output_w": output_w,
+        "output_h": output_h,
+        "bg_color_hex_code": settings.DRAPHART_BD_COLOR_HEX_CODE,
+        'concept_option': json.dumps(concept_option),
+    }
+
+
+def generate(image_url, data):
+    """
+    원본 이미지와 요청 데이터로 Draph.art API를 호출하고, 결과 이미지 파일 목록을 반환합니다.
+    (concept_option의 num_results만큼 결과가 옵니다.)
+    응답을 받는 대로 base64를 디코딩해 결과마다 임시 파일(spool)에 쓰므로 응답 전체를 메모리에 올리지 않으며,
+    응답이 DRAPH_MAX_RESPONSE_BYTES를 넘으면 중단합니다. 반환된 파일은 호출자가 닫아야 합니다.
+    """
+    headers = {'Authorization': f'Bearer {settings.DRAPHART_API_KEY}'}
+    parser = ResultStreamParser()
+    # 원본을 출력 크기에 맞게 줄이고 압축해 보냄 (전송량과 Draph 처리 시간 감소)
+    image_file, filename, content_type = source_cache.open_source(image_url, int(data['output_w']), int(data['output_h']))
+    try:
+        with image_file:
+            # Draph가 느려지거나 실패하면 호출을 쌓지 않고 바로 실패 (회로 차단기, 적응형 동시 호출 한도)
+            with circuit_breaker.guard('draph') as call, timed('request'):
+                # 파일 객체에 파일 이름과 형식을 지정
+                files = {'image': (filename, image_file, content_type)}
+                with get_client('draph').stream('POST', DRAPH_GENERATE_URL, headers=headers, data=data, files=files) as response:
+                    if response.status_code != 200:
+                        response.read()
+                        logger.debug("AI 이미지 생성 실패: %s", response.text)
+                        raise DraphError("AI 이미지 생성 실패", response.text, response.status_code)
+
+                    received = 0
+                    for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > settings.DRAPH_MAX_RESPONSE_BYTES:
+                            raise DraphError("AI 이미지 생성 결과가 너무 큽니다", f"{received} bytes", response.status_code)
+                        parser.feed(chunk)
+                # 속도 제한 대기 시간을 제외한 실제 응답 시간 (응답 본문 수신 포함)
+                call.latency = response.elapsed.total_seconds()
+
+        results = parser.close()
+    except Exception:
+        parser.discard()
+        raise
+    if not results:
+        raise DraphError("AI 이미지 생성 결과 없음")
+    return results
+
+
+class ResultStreamParser:
+    """
+    Draph 응답 본문을 조각 단위로 받아 결과 이미지마다 Base64StreamDecoder로 디코딩합니다.
+    결과가 하나면 본문 전체가 base64 문자열이고, 여러 개(num_results > 1)면 base64 문자열의 JSON 배열
+    (또는 images/results 키에 배열을 담은 JSON 객체)입니다. JSON에서는 배열 안의 문자열만 결과로 봅니다.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self._decoders = []
+        self._decoder = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        if self.mode is None:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return
+            # base64 문자열은 '['나 '{'로 시작하지 않음
+            self.mode = 'json' if stripped[:1] in (b'[', b'{') else 'raw'
+            if self.mode == 'raw':
+                self._start_result()
+        if self.mode == 'raw':
+            self._decoder.feed(chunk)
+        else:
+            self._feed_json(chunk)
+
+    def _start_result(self):
+        self._decoder = Base64StreamDecoder()
+        self._decoders.append(self._decoder)
+
+    def _feed_string(self, data):
+        if self._decoder is not None:
+            self._decoder.feed(data)
+
+    def _feed_json(self, chunk):
+        position = 0
+        if self._escape and chunk:
+            # 이전 조각이 역슬래시로 끝난 경우 ('\/'만 의미 있는 이스케이프)
+            self._escape = False
+            if chunk[:1] == b'/':
+                self._feed_string(b'/')
+            position = 1
+
+        while position < len(chunk):
+            if self._in_string:
+                match = JSON_STRING_TOKEN.search(chunk, position)
+                end = match.start() if match else len(chunk)
+                self._feed_string(chunk[position:end])
+                if match is None:
+                    return
+                if chunk[end:end + 1] == b'"':
+                    self._in_string = False
+                    self._decoder = None
+                    position = end + 1
+                elif end + 1 < len(chunk):
+                    if chunk[end + 1:end + 2] == b'/':
+                        self._feed_string(b'/')
+                    position = end + 2
+                else:
+                    self._escape = True
+                    return
+            else:
+                match = JSON_STRUCTURE_TOKEN.search(chunk, position)
+                if match is None:
+                    return
+                token = match.group()
+                if token == b'[':
+                    self._depth += 1
+                elif token == b']':
+                    self._depth -= 1
+                else:
+                    self._in_string = True
+                    if self._depth > 0:
+                        self._start_result()
+                position = match.end()
+
+    def close(self):
+        """디코딩을 마치고 결과 이미지 파일 목록을 반환합니다."""
+        return [decoder.close() for decoder in self._decoders]
+
+    def discard(self):
+        """중간에 실패한 경우 임시 파일을 정리합니다."""
+        for decoder in self._decoders:
+            decoder.file.close()
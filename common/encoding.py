@@ -0,0 +1,146 @@
+import os
+import time
+import binascii
+import logging
+import tempfile
+from contextlib import contextmanager
+from PIL import Image as PILImage
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# 생성 결과 저장 형식별 확장자, Content-Type, 그대로 저장할 수 있는 색상 모드
+OUTPUT_FORMATS = {
+    'PNG': {'extension': '.png', 'content_type': 'image/png', 'modes': ('RGB',)},
+    'WEBP': {'extension': '.webp', 'content_type': 'image/webp', 'modes': ('RGB',)},
+    'JPEG': {'extension': '.jpg', 'content_type': 'image/jpeg', 'modes': ('RGB',)},
+}
+
+# base64 디코딩 전에 제거할 공백 문자
+BASE64_WHITESPACE = b' \t\r\n'
+
+GENERATION_STAGE_SECONDS = Histogram(
+    'generation_stage_seconds',
+    '이미지 생성 단계별 소요 시간 (초)',
+    ['stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+GENERATION_ENCODING = Counter(
+    'generation_encoding_total', '생성 결과 저장 방식 (passthrough: 받은 그대로, transcoded: 다시 인코딩)', ['result']
+)
+
+
+@contextmanager
+def timed(stage):
+    """블록 실행 시간을 generation_stage_seconds{stage}에 기록합니다."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        GENERATION_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - started_at)
+
+
+def output_filename(stem):
+    """저장 형식(GENERATION_OUTPUT_FORMAT)에 맞는 확장자를 붙인 파일 이름을 반환합니다."""
+    return stem + OUTPUT_FORMATS[settings.GENERATION_OUTPUT_FORMAT]['extension']
+
+
+def _save_options(image_format):
+    if image_format == 'PNG':
+        return {'compress_level': settings.GENERATION_PNG_COMPRESS_LEVEL}
+    if image_format == 'WEBP':
+        return {'quality': settings.GENERATION_OUTPUT_QUALITY, 'method': settings.GENERATION_WEBP_METHOD}
+    return {'quality': settings.GENERATION_OUTPUT_QUALITY}
+
+
+class ImageTooLarge(ValueError):
+    """생성 결과의 픽셀 수가 GENERATION_MAX_PIXELS를 넘을 때 발생합니다."""
+
+
+def spool():
+    """GENERATION_SPOOL_MAX_MEMORY까지는 메모리에, 넘으면 디스크에 쓰는 임시 파일을 반환합니다."""
+    return tempfile.SpooledTemporaryFile(max_size=settings.GENERATION_SPOOL_MAX_MEMORY)
+
+
+class Base64StreamDecoder:
+    """
+    base64 텍스트를 받은 조각 단위로 디코딩해 임시 파일(spool)에 씁니다.
+    응답 전체나 디코딩된 전체 바이트를 메모리에 올리지 않습니다.
+    """
+
+    def __init__(self):
+        self.file = spool()
+        self._pending = b''
+        self._decode_seconds = 0.0
+
+    def feed(self, data):
+        # 4바이트 단위로만 디코딩할 수 있으므로 남는 부분은 다음 조각과 합침
+        data = self._pending + data.translate(None, BASE64_WHITESPACE)
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        if usable:
+            started_at = time.perf_counter()
+            self.file.write(binascii.a2b_base64(data[:usable]))
+            self._decode_seconds += time.perf_counter() - started_at
+
+    def close(self):
+        """남은 데이터를 디코딩하고 처음 위치로 되돌린 임시 파일을 반환합니다."""
+        if self._pending:
+            # 패딩(=)이 생략된 경우
+            self.file.write(binascii.a2b_base64(self._pending + b'=' * (-len(self._pending) % 4)))
+            self._pending = b''
+        GENERATION_STAGE_SECONDS.labels(stage='decode').observe(self._decode_seconds)
+        self.file.seek(0)
+        return self.file
+
+
+def encode(source, image_format=None):
+    """
+    생성된 이미지 파일 객체를 저장 형식(GENERATION_OUTPUT_FORMAT)으로 맞춰 (파일 객체, 이미지 메타데이터)를 반환합니다.
+    이미 같은 형식과 색상 모드이면 픽셀을 디코딩하지 않고 받은 파일을 그대로 사용하고,
+    아니면 RGB로 변환해 설정된 품질/압축 수준으로 다시 인코딩합니다. (결과는 임시 파일)
+    픽셀 수가 GENERATION_MAX_PIXELS를 넘으면 픽셀을 디코딩하기 전에 ImageTooLarge가 발생합니다.
+    """
+    image_format = image_format or settings.GENERATION_OUTPUT_FORMAT
+    output = OUTPUT_FORMATS[image_format]
+
+    with timed('probe'):
+        # 헤더만 읽음 (픽셀 데이터는 필요할 때만 디코딩)
+        pil_image = PILImage.open(source)
+        width, height = pil_image.size
+        if width * height > settings.GENERATION_MAX_PIXELS:
+            raise ImageTooLarge(f"생성된 이미지가 너무 큽니다 ({width}x{height})")
+        passthrough = pil_image.format == image_format and pil_image.mode in output['modes']
+        if passthrough:
+            # 청크 CRC 등 파일 구조만 검사해 손상된 결과를 그대로 올리지 않도록 함
+            pil_image.verify()
+
+    if passthrough:
+        GENERATION_ENCODING.labels(result='passthrough').inc()
+        byte_size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+        return source, {
+            'width': width,
+            'height': height,
+            'format': image_format,
+            'mode': pil_image.mode,
+            'byte_size': byte_size,
+        }
+
+    with timed('transcode'):
+        pil_image = pil_image.convert('RGB')
+        encoded = spool()
+        pil_image.save(encoded, format=image_format, **_save_options(image_format))
+        byte_size = encoded.tell()
+        encoded.seek(0)
+    GENERATION_ENCODING.labels(result='transcoded').inc()
+    logger.debug("Transcoded generation result to %s (%d bytes)", image_format, byte_size)
+
+    return encoded, {
+        'width': pil_image.width,
+        'height': pil_image.height,
+        'format': image_format,
+        'mode': pil_image.mode,
+        'byte_size': byte_size,
+    }
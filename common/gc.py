@@ -0,0 +1,119 @@
+import os
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from image.models import Image
+from background.models import Background
+from recreated_background.models import RecreatedBackground
+from image_resizing.models import ImageResizing
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# S3 객체를 참조하는 image_url 컬럼을 가진 모델 목록
+URL_MODELS = (Image, Background, RecreatedBackground, ImageResizing)
+
+# list_objects_v2 한 페이지 및 DB 조회 한 번에 처리할 키 수
+PAGE_SIZE = 1000
+
+
+def iter_bucket_objects(prefix=''):
+    """
+    list_objects_v2를 페이지 단위로 호출하며 객체를 하나씩 돌려주는 제너레이터.
+    버킷 전체 목록을 메모리에 올리지 않습니다.
+    """
+    paginator = storage.get_s3_client().get_paginator('list_objects_v2')
+    pages = paginator.paginate(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Prefix=prefix,
+        PaginationConfig={'PageSize': PAGE_SIZE},
+    )
+    for page in pages:
+        for obj in page.get('Contents', []):
+            yield obj
+
+
+def iter_batches(iterable, size):
+    """이터러블을 size 크기의 리스트로 나누어 돌려줍니다."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _content_digest(key):
+    # 내용 기반 키({sha256}{확장자})이면 다이제스트를, 아니면 None을 반환
+    digest = os.path.splitext(key)[0]
+    if len(digest) == 64 and all(c in '0123456789abcdef' for c in digest):
+        return digest
+    return None
+
+
+def find_referenced_keys(keys):
+    """
+    주어진 키 중 DB에서 참조 중인 키 집합을 반환합니다.
+    키마다 가능한 URL 형태를 모두 만들어 인덱스가 걸린 image_url 컬럼을 IN 조건으로 조회합니다.
+    업로드가 아직 끝나지 않은(image_url이 비어 있는) Image가 같은 내용의 키를 기다리고 있으면 그 키도 참조 중으로 봅니다.
+    (같은 내용을 다시 올릴 때 HEAD로 기존 객체를 확인하고 PUT을 생략하므로, 그 사이에 삭제되면 안 됨)
+    """
+    url_to_key = {}
+    for key in keys:
+        for url in storage.url_variants(key):
+            url_to_key[url] = key
+
+    referenced = set()
+    urls = list(url_to_key)
+    for model in URL_MODELS:
+        for url in model.objects.filter(image_url__in=urls).values_list('image_url', flat=True).distinct():
+            referenced.add(url_to_key[url])
+
+    digest_to_keys = {}
+    for key in keys:
+        digest = _content_digest(key)
+        if digest:
+            digest_to_keys.setdefault(digest, []).append(key)
+    if digest_to_keys:
+        pending = Image.objects.filter(sha256__in=list(digest_to_keys), image_url='').values_list('sha256', flat=True)
+        for digest in pending.distinct():
+            referenced.update(digest_to_keys[digest])
+    return referenced
+
+
+def iter_orphan_keys(grace_period, prefix=''):
+    """
+    유예 기간보다 오래되었고 어떤 행에서도 참조하지 않는 객체 키를 돌려주는 제너레이터.
+    유예 기간은 업로드 직후 아직 DB에 URL이 기록되지 않은 객체를 보호합니다.
+    """
+    cutoff = timezone.now() - grace_period
+    old_keys = (obj['Key'] for obj in iter_bucket_objects(prefix) if obj['LastModified'] < cutoff)
+    for batch in iter_batches(old_keys, PAGE_SIZE):
+        referenced = find_referenced_keys(batch)
+        for key in batch:
+            if key not in referenced:
+                yield key
+
+
+def collect_orphans(grace_hours=None, prefix='', dry_run=False):
+    """
+    참조되지 않는 S3 객체를 찾아 삭제 큐에 추가하고 처리 결과를 반환합니다.
+    dry_run이면 삭제 큐에 추가하지 않고 개수만 셉니다.
+    """
+    if grace_hours is None:
+        grace_hours = settings.S3_GC_GRACE_HOURS
+
+    orphan_count = 0
+    for batch in iter_batches(iter_orphan_keys(timedelta(hours=grace_hours), prefix), PAGE_SIZE):
+        orphan_count += len(batch)
+        if dry_run:
+            for key in batch:
+                logger.info("Orphaned S3 object: %s", key)
+        else:
+            storage.enqueue_delete(*batch)
+
+    logger.info("S3 garbage collection found %d orphaned objects (dry_run=%s)", orphan_count, dry_run)
+    return {'orphans': orphan_count, 'dry_run': dry_run}
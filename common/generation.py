@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import redis
+from django.conf import settings
+from prometheus_client import Counter
+from common import storage, draph, jobs, generation_cache, encoding, source_cache
+from common.locks import release_lock
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+GENERATION_SINGLE_FLIGHT = Counter(
+    'generation_single_flight_total',
+    '같은 생성 요청의 합치기 결과 (leader: 직접 생성, follower: 다른 작업 결과 사용, fallback: 대기 실패 후 직접 생성)',
+    ['role'],
+)
+
+
+def _inflight_key(cache_key):
+    return f'{cache_key}_inflight'
+
+
+def _done_channel(cache_key):
+    return f'{cache_key}_done'
+
+
+def _store_result(result_file, filename, keep_local=False):
+    # 저장 형식으로 변환 (이미 같은 형식이면 받은 파일을 그대로 사용)
+    try:
+        image_file, image_info = encoding.encode(result_file)
+        try:
+            # 저장 형식에 맞는 확장자와 Content-Type 사용
+            output = encoding.OUTPUT_FORMATS[image_info['format']]
+            filename = os.path.splitext(filename)[0] + output['extension']
+            with encoding.timed('upload'):
+                s3_url = storage.upload_fileobj(image_file, filename, output['content_type'])
+            if keep_local:
+                # 같은 워커의 다음 단계(리사이징 등)가 S3에서 다시 내려받지 않도록 로컬 캐시에 기록
+                image_file.seek(0)
+                source_cache.put(s3_url, image_file)
+        finally:
+            image_file.close()
+    finally:
+        result_file.close()
+    return {'image_url': s3_url, 'image_info': image_info}
+
+
+def _generate_and_upload(image, data, unique_filename, job_id, cache_key, keep_local=False):
+    jobs.update_job(job_id, stage='generating')
+    result_files = draph.generate(image.image_url, data)
+    jobs.update_job(job_id, stage='uploading')
+
+    # 첫 결과는 요청 시 알려 준 파일 이름을 그대로 사용하고, 나머지는 번호를 붙임
+    stem = os.path.splitext(unique_filename)[0]
+    filenames = [unique_filename] + [f"{stem}_{index}" for index in range(1, len(result_files))]
+    if len(result_files) == 1:
+        results = [_store_result(result_files[0], filenames[0], keep_local)]
+    else:
+        # 결과가 여러 개면 인코딩과 업로드를 동시에 처리 (스레드 수 제한)
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(result_files), settings.GENERATION_UPLOAD_WORKERS)) as executor:
+                results = list(executor.map(partial(_store_result, keep_local=keep_local), result_files, filenames))
+        finally:
+            # 실패한 경우 처리하지 못한 임시 파일도 정리 (이미 닫힌 파일은 무시됨)
+            for result_file in result_files:
+                result_file.close()
+
+    generation_cache.put(cache_key, results)
+    return results
+
+
+def _wait_for_leader(cache_key, exclude_url):
+    """
+    같은 요청을 처리 중인 작업이 끝날 때까지 기다렸다가 캐시에 저장된 결과를 반환합니다.
+    그 작업이 결과 없이 끝났거나(실패) GENERATION_SINGLE_FLIGHT_WAIT가 지나면 None을 반환합니다.
+    """
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(_done_channel(cache_key))
+    try:
+        deadline = time.monotonic() + settings.GENERATION_SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            # 구독한 뒤에 확인해야 그 사이에 끝난 작업을 놓치지 않음
+            if not redis_client.exists(_inflight_key(cache_key)):
+                # 먼저 시작한 작업이 방금 저장한 결과이므로 아직 참조하는 행이 없어도 사용
+                return generation_cache.get(cache_key, exclude_url, verify=False)
+            pubsub.get_message(timeout=1.0)
+        return None
+    finally:
+        pubsub.close()
+
+
+def _single_result_data(data):
+    """concept_option의 num_results를 1로 바꾼 요청 데이터를 반환합니다."""
+    try:
+        concept_option = json.loads(data.get('concept_option') or '{}')
+    except (TypeError, json.JSONDecodeError):
+        concept_option = {}
+    if not isinstance(concept_option, dict):
+        concept_option = {}
+    concept_option['num_results'] = 1
+    return {**data, 'concept_option': json.dumps(concept_option)}
+
+
+def generate_image(image, data, unique_filename, job_id=None, exclude_url=None):
+    """
+    생성 결과 하나의 (S3 URL, 이미지 메타데이터)를 반환합니다. 결과를 하나만 저장하는 경로에서 사용합니다.
+    쓰지 않는 결과가 업로드되어 남지 않도록 num_results를 1로 요청합니다. (캐시 항목도 결과 하나로 저장됨)
+    """
+    result = generate_images(image, _single_result_data(data), unique_filename, job_id, exclude_url)[0]
+    return result['image_url'], result['image_info']
+
+
+def generate_images(image, data, unique_filename, job_id=None, exclude_url=None, keep_local=False, use_cache=True):
+    """
+    원본 이미지와 Draph 요청 데이터로 배경 이미지를 만들고 결과 목록([{'image_url', 'image_info'}, ...])을 반환합니다.
+    같은 원본과 요청 데이터로 만든 결과가 캐시에 있으면 Draph 호출과 S3 업로드 없이 기존 객체를 재사용하고,
+    같은 요청을 다른 작업이 처리 중이면 Draph를 다시 호출하지 않고 그 결과를 기다립니다.
+    keep_local이면 새로 만든 결과를 원본 이미지 로컬 캐시에도 기록합니다.
+    use_cache가 False이면(다시 만들기 요청) 캐시나 처리 중인 작업의 결과를 사용하지 않고 항상 새로 생성합니다.
+    """
+    cache_key = generation_cache.make_key(generation_cache.source_digest(image), data)
+    if not use_cache:
+        return _generate_and_upload(image, data, unique_filename, job_id, cache_key, keep_local)
+    cached = generation_cache.get(cache_key, exclude_url)
+    if cached is not None:
+        logger.info("Reused cached generation result for Image %s: %s", image.id, cached[0]['image_url'])
+        return cached
+
+    token = uuid.uuid4().hex
+    lock_key = _inflight_key(cache_key)
+    # 먼저 시작한 작업이 실패하면 기다리던 작업 중 하나만 다시 생성하도록 잠금을 한 번 더 시도
+    for _ in range(2):
+        if redis_client.set(lock_key, token, nx=True, ex=settings.GENERATION_SINGLE_FLIGHT_LOCK_TTL):
+            GENERATION_SINGLE_FLIGHT.labels(role='leader').inc()
+            try:
+                return _generate_and_upload(image, data, unique_filename, job_id, cache_key, keep_local)
+            finally:
+                release_lock(redis_client, lock_key, token)
+                redis_client.publish(_done_channel(cache_key), token)
+
+        jobs.update_job(job_id, stage='waiting')
+        cached = _wait_for_leader(cache_key, exclude_url)
+        if cached is not None:
+            GENERATION_SINGLE_FLIGHT.labels(role='follower').inc()
+            logger.info("Reused in-flight generation result for Image %s: %s", image.id, cached[0]['image_url'])
+            return cached
+
+    # 기다려도 결과를 받지 못하면 직접 생성
+    GENERATION_SINGLE_FLIGHT.labels(role='fallback').inc()
+    return _generate_and_upload(image, data, unique_filename, job_id, cache_key, keep_local)
@@ -0,0 +1,84 @@
+import json
+import hashlib
+import logging
+import redis
+from django.conf import settings
+from prometheus_client import Counter
+from common import storage, source_cache
+from common.gc import find_referenced_keys
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# 원본 이미지 해시 계산 시 한 번에 읽는 크기 (1 MB)
+CHUNK_SIZE = 1024 * 1024
+
+GENERATION_CACHE_REQUESTS = Counter(
+    'generation_cache_requests_total', '생성 결과 캐시 조회 수 (hit, miss, stale)', ['result']
+)
+
+
+def source_digest(image):
+    """
+    원본 이미지 내용의 SHA-256을 반환합니다.
+    업로드 시 계산해 둔 값이 없으면(예전 이미지) 로컬 캐시의 파일로 계산해 저장합니다.
+    """
+    if image.sha256:
+        return image.sha256
+
+    digest = hashlib.sha256()
+    with open(source_cache.fetch(image.image_url), 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    image.sha256 = digest.hexdigest()
+    type(image).objects.filter(id=image.id).update(sha256=image.sha256)
+    return image.sha256
+
+
+def make_key(digest, data):
+    """
+    원본 이미지 해시와 Draph 요청 데이터로 캐시 키를 만듭니다.
+    concept_option은 JSON 키 순서와 공백이 달라도 같은 키가 되도록 정규화합니다.
+    """
+    params = dict(data)
+    concept_option = params.get('concept_option')
+    if isinstance(concept_option, str):
+        try:
+            params['concept_option'] = json.loads(concept_option)
+        except json.JSONDecodeError:
+            pass
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return 'generation_cache_' + hashlib.sha256(f"{digest}:{canonical}".encode('utf-8')).hexdigest()
+
+
+def get(key, exclude_url=None, verify=True):
+    """
+    캐시된 생성 결과 목록([{'image_url', 'image_info'}, ...])을 반환합니다.
+    결과 객체 중 하나라도 참조하는 행이 없으면(삭제되었을 수 있으므로) 캐시를 지우고 None을 반환합니다.
+    방금 저장된 결과처럼 아직 행이 만들어지지 않았을 수 있으면 verify=False로 이 확인을 건너뜁니다.
+    exclude_url이 포함된 결과는 사용하지 않습니다. (재생성 요청이 같은 이미지를 다시 받지 않도록)
+    """
+    raw = redis_client.get(key)
+    if raw is None:
+        GENERATION_CACHE_REQUESTS.labels(result='miss').inc()
+        return None
+
+    entry = json.loads(raw)
+    # 결과가 하나뿐이던 예전 형식의 캐시 항목
+    results = entry['results'] if 'results' in entry else [entry]
+    if any(result['image_url'] == exclude_url for result in results):
+        GENERATION_CACHE_REQUESTS.labels(result='miss').inc()
+        return None
+    keys = {storage.key_from_url(result['image_url']) for result in results}
+    if verify and find_referenced_keys(list(keys)) != keys:
+        redis_client.delete(key)
+        GENERATION_CACHE_REQUESTS.labels(result='stale').inc()
+        return None
+
+    GENERATION_CACHE_REQUESTS.labels(result='hit').inc()
+    return results
+
+
+def put(key, results):
+    """생성 결과 목록을 캐시에 저장합니다. GENERATION_CACHE_TTL이 지나면 만료됩니다."""
+    redis_client.set(key, json.dumps({'results': results}), ex=settings.GENERATION_CACHE_TTL)
@@ -0,0 +1,97 @@
+import os
+import time
+import logging
+import threading
+import httpx
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+from common import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# h2 패키지가 설치되어 있을 때만 HTTP/2 사용
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 업스트림별 응답 대기 시간 설정 이름 (없으면 HTTP_CLIENT_READ_TIMEOUT 사용)
+UPSTREAM_READ_TIMEOUT_SETTINGS = {
+    'draph': 'DRAPHART_READ_TIMEOUT',
+    'openai': 'OPENAI_READ_TIMEOUT',
+    'webhook': 'WEBHOOK_READ_TIMEOUT',
+}
+
+HTTP_CLIENT_REQUEST_SECONDS = Histogram(
+    'http_client_request_seconds',
+    '외부 HTTP 요청 응답 헤더 수신까지 걸린 시간 (초)',
+    ['upstream', 'method', 'status'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+HTTP_CLIENTS_CREATED = Counter(
+    'http_client_clients_created_total', '업스트림별로 생성된 HTTP 클라이언트(커넥션 풀) 수', ['upstream']
+)
+
+# 업스트림 이름 -> 프로세스 전체에서 공유하는 httpx.Client
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _reset_clients():
+    # 부모 프로세스의 소켓을 닫지 않고 참조만 버림 (부모가 계속 사용하므로)
+    _clients.clear()
+
+
+# gunicorn/Celery prefork 워커가 부모 프로세스의 커넥션을 물려받지 않도록 fork 후 초기화
+os.register_at_fork(after_in_child=_reset_clients)
+
+
+def _event_hooks(upstream):
+    def wait_for_rate_limit(request):
+        # 업스트림/API 키별 공유 토큰 버킷 (응답 시간 측정 전에 기다림)
+        rate_limit.acquire(upstream, request.headers.get('Authorization', ''))
+
+    def on_request(request):
+        request.extensions['started_at'] = time.perf_counter()
+
+    def on_response(response):
+        started_at = response.request.extensions.get('started_at')
+        if started_at is not None:
+            HTTP_CLIENT_REQUEST_SECONDS.labels(
+                upstream=upstream, method=response.request.method, status=response.status_code
+            ).observe(time.perf_counter() - started_at)
+
+    return {'request': [wait_for_rate_limit, on_request], 'response': [on_response]}
+
+
+def _build_client(upstream):
+    read_timeout = getattr(settings, UPSTREAM_READ_TIMEOUT_SETTINGS.get(upstream, ''), settings.HTTP_CLIENT_READ_TIMEOUT)
+    client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(read_timeout, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        event_hooks=_event_hooks(upstream),
+    )
+    HTTP_CLIENTS_CREATED.labels(upstream=upstream).inc()
+    logger.info("Built HTTP client for %s (pid %s, http2=%s)", upstream, os.getpid(), HTTP2_AVAILABLE)
+    return client
+
+
+def get_client(upstream):
+    """
+    업스트림(draph, openai, s3 등)별로 프로세스 전체에서 공유하는 httpx.Client를 반환합니다.
+    keep-alive 커넥션 풀을 재사용해 매 요청마다 TCP/TLS 연결을 새로 맺지 않으며,
+    기본 연결/응답 제한 시간이 적용됩니다.
+    """
+    client = _clients.get(upstream)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(upstream)
+            if client is None:
+                client = _clients[upstream] = _build_client(upstream)
+    return client
@@ -0,0 +1,179 @@
+import json
+import time
+import uuid
+import logging
+import redis
+from django.conf import settings
+from .models import WebhookDelivery
+from .tasks import deliver_webhook
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# 작업 상태
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+def _job_key(job_id):
+    return f'job_{job_id}'
+
+
+def _channel(job_id):
+    return f'job_events_{job_id}'
+
+
+def _callbacks_key(job_id):
+    return f'job_callbacks_{job_id}'
+
+
+def _decode(state):
+    state = {k.decode('utf-8'): v.decode('utf-8') for k, v in state.items()}
+    if 'result' in state:
+        state['result'] = json.loads(state['result'])
+    return state
+
+
+def create_jobs(kind, job_ids, callback_url=None):
+    """
+    작업 상태 레코드를 만듭니다. 작업 ID는 Celery 태스크 ID를 그대로 사용하므로
+    태스크를 발행하기 전에 호출해야 클라이언트가 바로 조회할 수 있습니다.
+    callback_url이 주어지면 작업이 끝났을 때 해당 URL로 웹훅을 전송합니다.
+    """
+    now = time.time()
+    pipe = redis_client.pipeline()
+    for job_id in job_ids:
+        key = _job_key(job_id)
+        pipe.hset(key, mapping={
+            'job_id': job_id,
+            'kind': kind,
+            'status': STATUS_QUEUED,
+            'stage': STATUS_QUEUED,
+            'updated_at': now,
+        })
+        pipe.expire(key, settings.JOB_STATE_TTL)
+        if callback_url:
+            pipe.sadd(_callbacks_key(job_id), callback_url)
+            pipe.expire(_callbacks_key(job_id), settings.JOB_STATE_TTL)
+    pipe.execute()
+
+
+def create_job(job_id, kind, callback_url=None):
+    create_jobs(kind, [job_id], callback_url)
+
+
+def add_callback(job_id, callback_url):
+    """진행 중인 작업에 콜백 URL을 추가합니다. (합쳐진 요청의 호출자도 완료 알림을 받도록)"""
+    pipe = redis_client.pipeline()
+    pipe.sadd(_callbacks_key(job_id), callback_url)
+    pipe.expire(_callbacks_key(job_id), settings.JOB_STATE_TTL)
+    pipe.execute()
+
+
+def _schedule_webhooks(job_id, state):
+    # 콜백 목록을 꺼내면서 지워 같은 작업에 대해 두 번 전송하지 않음
+    pipe = redis_client.pipeline()
+    pipe.smembers(_callbacks_key(job_id))
+    pipe.delete(_callbacks_key(job_id))
+    callback_urls = pipe.execute()[0]
+
+    for callback_url in sorted(callback_urls):
+        delivery = WebhookDelivery.objects.create(
+            job_id=job_id,
+            event=f"job.{state['status']}",
+            url=callback_url.decode('utf-8'),
+            payload=state,
+        )
+        deliver_webhook.delay(delivery.id)
+
+
+def update_job(job_id, status=STATUS_RUNNING, stage=None, result=None, error=None):
+    """
+    작업 상태를 갱신하고 변경된 전체 상태를 구독자(SSE 연결)에게 발행합니다.
+    레코드가 없으면(만료되었거나 작업 없이 태스크를 직접 호출한 경우) 아무것도 하지 않습니다.
+    """
+    if job_id is None:
+        return None
+    fields = {'status': status, 'stage': stage or status, 'updated_at': time.time()}
+    if result is not None:
+        fields['result'] = json.dumps(result)
+    if error is not None:
+        fields['error'] = str(error)
+
+    key = _job_key(job_id)
+    if not redis_client.exists(key):
+        return None
+    pipe = redis_client.pipeline()
+    pipe.hset(key, mapping=fields)
+    pipe.expire(key, settings.JOB_STATE_TTL)
+    pipe.hgetall(key)
+    state = _decode(pipe.execute()[-1])
+    redis_client.publish(_channel(job_id), json.dumps(state))
+    if status in TERMINAL_STATUSES:
+        _schedule_webhooks(job_id, state)
+    return state
+
+
+def succeed_job(job_id, result=None):
+    return update_job(job_id, status=STATUS_SUCCEEDED, result=result)
+
+
+def fail_job(job_id, error):
+    return update_job(job_id, status=STATUS_FAILED, error=error)
+
+
+def create_succeeded_job(kind, result, callback_url=None):
+    """
+    태스크 없이 바로 끝난 요청(중복 업로드 재사용, 생성 결과 캐시 등)의 작업 레코드를 만들고 성공 처리한 뒤 작업 ID를 반환합니다.
+    callback_url이 주어지면 다른 작업과 같이 완료 웹훅이 전송됩니다.
+    """
+    job_id = str(uuid.uuid4())
+    create_job(job_id, kind, callback_url)
+    succeed_job(job_id, result)
+    return job_id
+
+
+def get_job(job_id):
+    """작업 상태를 반환합니다. 없으면 None을 반환합니다."""
+    state = redis_client.hgetall(_job_key(job_id))
+    return _decode(state) if state else None
+
+
+def iter_job_events(job_id, max_duration=None, heartbeat=None):
+    """
+    작업 상태 변경을 차례로 반환하는 제너레이터입니다.
+    heartbeat 초 동안 변경이 없으면 None을 반환하고, 작업이 끝나거나 max_duration이 지나면 종료합니다.
+    """
+    max_duration = max_duration or settings.JOB_EVENTS_MAX_DURATION
+    heartbeat = heartbeat or settings.JOB_EVENTS_HEARTBEAT
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(_channel(job_id))
+    try:
+        # 구독한 뒤에 현재 상태를 읽어 그 사이에 발생한 변경을 놓치지 않음
+        state = get_job(job_id)
+        if state is None:
+            return
+        yield state
+        if state['status'] in TERMINAL_STATUSES:
+            return
+
+        deadline = time.monotonic() + max_duration
+        last_event = time.monotonic()
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=1.0)
+            if message is None:
+                if time.monotonic() - last_event >= heartbeat:
+                    last_event = time.monotonic()
+                    yield None
+                continue
+            last_event = time.monotonic()
+            state = json.loads(message['data'])
+            yield state
+            if state['status'] in TERMINAL_STATUSES:
+                return
+    finally:
+        pubsub.close()
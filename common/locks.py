@@ -0,0 +1,12 @@
+# 잠금 값이 자신의 토큰과 같을 때만 삭제 (만료 후 다른 작업이 다시 잡은 잠금을 지우지 않도록)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def release_lock(client, key, token):
+    """토큰이 일치할 때만 Redis 잠금을 해제합니다."""
+    return client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from common.models import DeadLetter
+from common.retry import replay
+
+
+class Command(BaseCommand):
+    help = 'DeadLetter로 기록된 작업을 조회(list)하거나, 다시 실행(replay)하거나, 삭제(purge)합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'replay', 'purge'])
+        parser.add_argument('ids', nargs='*', type=int, help='대상 DeadLetter ID (생략하면 필터에 맞는 전체)')
+        parser.add_argument('--task', help='태스크 이름 (예: background.tasks.generate_background_task)')
+        parser.add_argument('--error-class', help='오류 클래스 이름 (부분 일치)')
+        parser.add_argument('--since-hours', type=int, help='최근 몇 시간 안에 기록된 작업만 대상으로 합니다.')
+        parser.add_argument('--status', choices=[DeadLetter.STATUS_DEAD, DeadLetter.STATUS_REPLAYED],
+                            default=DeadLetter.STATUS_DEAD, help='상태 (기본값: dead)')
+        parser.add_argument('--limit', type=int, default=100, help='최대 처리 개수')
+        parser.add_argument('--dry-run', action='store_true', help='replay/purge 시 실행하지 않고 대상만 출력합니다.')
+
+    def handle(self, *args, **options):
+        queryset = DeadLetter.objects.filter(status=options['status']).order_by('id')
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        if options['task']:
+            queryset = queryset.filter(task_name=options['task'])
+        if options['error_class']:
+            queryset = queryset.filter(error_class__icontains=options['error_class'])
+        if options['since_hours']:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(hours=options['since_hours']))
+        dead_letters = list(queryset[:options['limit']])
+
+        action = options['action']
+        if action == 'list' or options['dry_run']:
+            for dead_letter in dead_letters:
+                self.stdout.write(
+                    f"{dead_letter.id}\t{dead_letter.created_at:%Y-%m-%d %H:%M:%S}\t{dead_letter.task_name}\t"
+                    f"{dead_letter.task_id}\t{dead_letter.error_class}\t{dead_letter.error[:100]}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"DeadLetter {len(dead_letters)}개"))
+            return
+
+        if action == 'replay':
+            replayed = 0
+            for dead_letter in dead_letters:
+                try:
+                    task_id = replay(dead_letter)
+                except Exception as e:
+                    raise CommandError(f"DeadLetter {dead_letter.id} 재실행 실패 ({replayed}개 재실행됨): {e}")
+                self.stdout.write(f"{dead_letter.id} -> {task_id}")
+                replayed += 1
+            self.stdout.write(self.style.SUCCESS(f"DeadLetter {replayed}개 재실행"))
+            return
+
+        deleted, _ = DeadLetter.objects.filter(id__in=[dead_letter.id for dead_letter in dead_letters]).delete()
+        self.stdout.write(self.style.SUCCESS(f"DeadLetter {deleted}개 삭제"))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from common.gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = 'DB에서 참조하지 않는 S3 객체를 찾아 삭제 큐에 추가합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=settings.S3_GC_GRACE_HOURS,
+                            help='이 시간보다 최근에 올라간 객체는 삭제하지 않습니다.')
+        parser.add_argument('--prefix', default='', help='검사할 객체 키 접두사')
+        parser.add_argument('--dry-run', action='store_true', help='삭제하지 않고 대상 객체만 출력합니다.')
+
+    def handle(self, *args, **options):
+        result = collect_orphans(
+            grace_hours=options['grace_hours'],
+            prefix=options['prefix'],
+            dry_run=options['dry_run'],
+        )
+        action = '발견' if result['dry_run'] else '삭제 큐에 추가'
+        self.stdout.write(self.style.SUCCESS(f"고아 S3 객체 {result['orphans']}개 {action}"))
@@ -0,0 +1,68 @@
+import logging
+import resource
+from celery.signals import task_prerun, task_postrun, worker_process_init
+from django.conf import settings
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# 리눅스에서 프로세스의 최대 RSS(VmHWM)를 초기화/조회하는 경로
+CLEAR_REFS_PATH = '/proc/self/clear_refs'
+STATUS_PATH = '/proc/self/status'
+
+TASK_PEAK_RSS = Histogram(
+    'celery_task_peak_rss_bytes',
+    '작업 실행 중 워커 프로세스의 최대 RSS (바이트)',
+    ['task'],
+    buckets=[size * 1024 * 1024 for size in (64, 128, 256, 384, 512, 768, 1024, 2048)],
+)
+WORKER_PEAK_RSS = Gauge('celery_worker_peak_rss_bytes', '워커 프로세스가 시작된 뒤의 최대 RSS (바이트)', multiprocess_mode='livemax')
+
+_worker_peak_rss = 0
+
+
+def reset_peak_rss():
+    """프로세스의 최대 RSS를 현재 RSS로 초기화합니다. 지원하지 않는 환경이면 False를 반환합니다."""
+    try:
+        with open(CLEAR_REFS_PATH, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """프로세스의 최대 RSS(바이트)를 반환합니다. (마지막으로 초기화한 뒤부터)"""
+    try:
+        with open(STATUS_PATH) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@worker_process_init.connect
+def limit_worker_memory(**kwargs):
+    # 설정되어 있으면 워커 프로세스의 주소 공간을 제한해, 한 작업이 컨테이너 전체를 OOM으로 죽이지 않고 MemoryError로 실패하도록 함
+    limit_mb = settings.WORKER_MEMORY_LIMIT_MB
+    if limit_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit_mb * 1024 * 1024, hard))
+        logger.info("Limited worker address space to %d MB", limit_mb)
+
+
+@task_prerun.connect
+def start_task_memory_tracking(**kwargs):
+    reset_peak_rss()
+
+
+@task_postrun.connect
+def report_task_memory(task=None, **kwargs):
+    global _worker_peak_rss
+    peak = peak_rss()
+    _worker_peak_rss = max(_worker_peak_rss, peak)
+    TASK_PEAK_RSS.labels(task=task.name).observe(peak)
+    WORKER_PEAK_RSS.set(_worker_peak_rss)
+    logger.debug("Task %s peak RSS: %.1f MB", task.name, peak / 1024 / 1024)
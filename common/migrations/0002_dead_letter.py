@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(db_index=True, max_length=200)),
+                ('task_id', models.CharField(db_index=True, max_length=64)),
+                ('job_kind', models.CharField(blank=True, default='', max_length=32)),
+                ('args', models.JSONField(default=list)),
+                ('kwargs', models.JSONField(default=dict)),
+                ('error_class', models.CharField(max_length=200)),
+                ('error', models.TextField(blank=True, default='')),
+                ('transient', models.BooleanField(default=False)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('dead', 'Dead'), ('replayed', 'Replayed')], db_index=True, default='dead', max_length=10)),
+                ('replay_task_id', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
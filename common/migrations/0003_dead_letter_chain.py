@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_dead_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deadletter',
+            name='chain',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='deadletter',
+            name='job_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+
+
+class WebhookDelivery(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DELIVERED, 'Delivered'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_id = models.CharField(max_length=64, db_index=True)  # 작업 ID (Celery 태스크 ID)
+    event = models.CharField(max_length=32)  # 예: job.succeeded, job.failed
+    url = models.URLField(max_length=500)  # 호출자가 등록한 콜백 URL
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)  # 마지막 시도의 HTTP 응답 코드
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'WebhookDelivery {self.id} ({self.event}) for job {self.job_id}'
+
+
+class DeadLetter(models.Model):
+    """재시도할 수 없거나 재시도 횟수를 모두 사용한 작업. dead_letters 관리 명령으로 조회하고 다시 실행합니다."""
+    STATUS_DEAD = 'dead'
+    STATUS_REPLAYED = 'replayed'
+    STATUS_CHOICES = [
+        (STATUS_DEAD, 'Dead'),
+        (STATUS_REPLAYED, 'Replayed'),
+    ]
+
+    task_name = models.CharField(max_length=200, db_index=True)  # 예: background.tasks.generate_background_task
+    task_id = models.CharField(max_length=64, db_index=True)  # 실패한 Celery 태스크 ID (작업 ID)
+    job_kind = models.CharField(max_length=32, blank=True, default='')  # 작업 상태 레코드의 종류 (다시 실행할 때 사용)
+    job_id = models.CharField(max_length=64, blank=True, default='')  # 작업 ID가 태스크 ID와 다를 때의 작업 ID (파이프라인 단계)
+    chain = models.JSONField(default=list)  # 실패한 태스크 뒤에 남아 있던 체인 단계 (다시 실행할 때 함께 발행)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    error_class = models.CharField(max_length=200)
+    error = models.TextField(blank=True, default='')
+    transient = models.BooleanField(default=False)  # 일시적인 오류였는지 (재시도 횟수를 모두 사용한 경우)
+    retries = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_DEAD, db_index=True)
+    replay_task_id = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'DeadLetter {self.id} ({self.task_name}) for task {self.task_id}'
@@ -0,0 +1,90 @@
+import time
+import hashlib
+import logging
+import redis
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# 토큰 버킷에서 토큰을 예약하고 기다려야 할 시간(초)을 반환합니다.
+# 토큰이 부족하면 잔량을 음수로 남겨 먼저 온 호출자부터 순서대로 다음 토큰을 받도록 합니다. (공정한 대기열)
+# 기다릴 시간이 max_wait를 넘으면 예약하지 않고 {0, wait}를 반환합니다.
+# 여러 서버의 시계 차이에 영향을 받지 않도록 Redis 서버 시간을 사용합니다.
+ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < cost then
+    wait = (cost - tokens) / rate
+end
+if wait > max_wait then
+    return {0, tostring(wait)}
+end
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 60)
+return {1, tostring(wait)}
+"""
+
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    'rate_limit_wait_seconds',
+    '외부 API 호출 전 속도 제한으로 기다린 시간 (초)',
+    ['upstream'],
+    buckets=(0, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+RATE_LIMIT_TOKENS = Counter('rate_limit_tokens_total', '외부 API 호출에 사용한 속도 제한 토큰 수', ['upstream'])
+RATE_LIMIT_REJECTED = Counter(
+    'rate_limit_rejected_total', '기다릴 시간이 너무 길어 거절된 외부 API 호출 수', ['upstream']
+)
+
+
+class RateLimitExceeded(Exception):
+    """속도 제한으로 RATE_LIMIT_MAX_WAIT보다 오래 기다려야 할 때 발생합니다."""
+
+    def __init__(self, upstream, wait):
+        super().__init__(f"{upstream} 호출 한도 초과 ({wait:.1f}초 대기 필요)")
+        self.upstream = upstream
+        self.wait = wait
+
+
+def bucket_key(upstream, api_key):
+    # API 키는 Redis에 그대로 남기지 않도록 해시 사용
+    key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    return f'rate_limit_{upstream}_{key_hash}'
+
+
+def acquire(upstream, api_key, cost=1):
+    """
+    업스트림과 API 키별로 모든 프로세스가 공유하는 토큰 버킷에서 토큰을 받습니다.
+    토큰이 부족하면 차례가 올 때까지 기다리고, RATE_LIMIT_MAX_WAIT보다 오래 기다려야 하면 RateLimitExceeded가 발생합니다.
+    설정(RATE_LIMITS)에 없는 업스트림은 제한하지 않습니다.
+    """
+    limit = settings.RATE_LIMITS.get(upstream)
+    if limit is None:
+        return 0.0
+
+    granted, wait = redis_client.eval(
+        ACQUIRE_SCRIPT, 1, bucket_key(upstream, api_key),
+        limit['rate'], limit['burst'], cost, settings.RATE_LIMIT_MAX_WAIT,
+    )
+    wait = float(wait)
+    if not granted:
+        RATE_LIMIT_REJECTED.labels(upstream=upstream).inc()
+        raise RateLimitExceeded(upstream, wait)
+
+    RATE_LIMIT_TOKENS.labels(upstream=upstream).inc(cost)
+    RATE_LIMIT_WAIT_SECONDS.labels(upstream=upstream).observe(wait)
+    if wait > 0:
+        logger.debug("Waiting %.2fs for %s rate limit", wait, upstream)
+        time.sleep(wait)
+    return wait
@@ -0,0 +1,98 @@
+import uuid
+import random
+import logging
+import httpx
+import redis
+from botocore.exceptions import ClientError, HTTPClientError
+from celery import current_app
+from django.conf import settings
+from django.db import OperationalError
+from django.utils import timezone
+from prometheus_client import Counter
+from common import jobs
+from common.circuit_breaker import UpstreamUnavailable, is_upstream_failure
+from common.models import DeadLetter
+from common.rate_limit import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# 잠시 후 다시 시도하면 성공할 수 있는 S3 오류 코드
+TRANSIENT_S3_ERROR_CODES = ('SlowDown', 'Throttling', 'ThrottlingException', 'RequestTimeout', 'InternalError', 'ServiceUnavailable')
+
+TASK_RETRIES = Counter('task_retries_total', '일시적인 오류로 다시 시도한 작업 수', ['task'])
+DEAD_LETTERS = Counter('task_dead_letters_total', 'DeadLetter로 기록된 작업 수', ['task', 'transient'])
+
+
+def is_transient(exc):
+    """
+    다시 시도하면 성공할 수 있는 오류인지 확인합니다.
+    네트워크 오류/시간 초과, 외부 API 5xx/429, 회로 차단/속도 제한, S3 스로틀링, DB/Redis 연결 오류가 해당됩니다.
+    """
+    if isinstance(exc, (UpstreamUnavailable, RateLimitExceeded, HTTPClientError, OperationalError, redis.ConnectionError)):
+        return True
+    if isinstance(exc, ClientError):
+        error = exc.response.get('Error', {})
+        status_code = exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return status_code >= 500 or error.get('Code') in TRANSIENT_S3_ERROR_CODES
+    return isinstance(exc, httpx.TransportError) or is_upstream_failure(exc)
+
+
+def backoff(retries):
+    """retries번째 재시도까지 기다릴 시간 (지수 백오프 + 지터, 초)"""
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** retries, settings.TASK_RETRY_BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 2)
+
+
+def retry_or_dead_letter(task, exc, job_id=None):
+    """
+    태스크 실패를 처리합니다. 일시적인 오류이고 재시도 횟수가 남아 있으면 task.retry를 발생시키고
+    (같은 태스크 ID로 다시 실행되므로 작업 상태도 그대로 이어짐), 그렇지 않으면 DeadLetter에 기록하고 작업을 실패 처리합니다.
+    작업 ID가 태스크 ID와 다르면(파이프라인 단계) job_id로 넘깁니다. except 블록 안에서 호출해야 합니다.
+    """
+    transient = is_transient(exc)
+    retries = task.request.retries
+    if transient and retries < settings.TASK_MAX_RETRIES:
+        countdown = backoff(retries)
+        TASK_RETRIES.labels(task=task.name).inc()
+        logger.warning("%s[%s] failed (%s), retrying in %.0fs", task.name, task.request.id, exc, countdown)
+        jobs.update_job(job_id or task.request.id, stage='retrying', error=exc)
+        raise task.retry(exc=exc, countdown=countdown, max_retries=settings.TASK_MAX_RETRIES)
+
+    job = jobs.get_job(job_id or task.request.id) if job_id or task.request.id else None
+    dead_letter = DeadLetter.objects.create(
+        task_name=task.name,
+        task_id=task.request.id or '',
+        job_kind=job['kind'] if job else '',
+        job_id=job_id or '',
+        chain=list(task.request.chain or []),
+        args=list(task.request.args or []),
+        kwargs=dict(task.request.kwargs or {}),
+        error_class=f"{type(exc).__module__}.{type(exc).__name__}",
+        error=str(exc),
+        transient=transient,
+        retries=retries,
+    )
+    DEAD_LETTERS.labels(task=task.name, transient=transient).inc()
+    logger.error("%s[%s] moved to dead letters (%s): %s", task.name, task.request.id, dead_letter.id, exc)
+    jobs.fail_job(job_id or task.request.id, exc)
+    return dead_letter
+
+
+def replay(dead_letter):
+    """
+    DeadLetter의 태스크를 같은 인자로 새 태스크 ID로 다시 실행하고 새 태스크 ID를 반환합니다.
+    체인의 단계였으면 남은 단계도 함께 발행하고, 작업 ID가 인자로 전달되는 경우 기존 작업 상태를 다시 대기 중으로 돌립니다.
+    """
+    task_id = str(uuid.uuid4())
+    if dead_letter.job_id:
+        jobs.update_job(dead_letter.job_id, status=jobs.STATUS_QUEUED)
+    elif dead_letter.job_kind:
+        jobs.create_job(task_id, dead_letter.job_kind)
+    options = {'chain': dead_letter.chain} if dead_letter.chain else {}
+    current_app.send_task(dead_letter.task_name, args=dead_letter.args, kwargs=dead_letter.kwargs, task_id=task_id, **options)
+
+    dead_letter.status = DeadLetter.STATUS_REPLAYED
+    dead_letter.replay_task_id = task_id
+    dead_letter.replayed_at = timezone.now()
+    dead_letter.save(update_fields=['status', 'replay_task_id', 'replayed_at'])
+    return task_id
@@ -0,0 +1,227 @@
+import os
+import mmap
+import hashlib
+import logging
+import tempfile
+from PIL import Image as PILImage, ImageOps
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+from common.http_client import get_client
+from common.encoding import timed
+
+logger = logging.getLogger(__name__)
+
+# 다운로드 시 한 번에 기록하는 크기 (1 MB)
+CHUNK_SIZE = 1024 * 1024
+# 작성 중인 임시 파일 접두사 (용량 계산과 삭제 대상에서 제외)
+TEMP_PREFIX = '.tmp-'
+# EXIF 회전 정보 태그
+EXIF_ORIENTATION = 0x0112
+# 외부 API로 보내는 원본 이미지 형식별 파일 이름과 Content-Type
+SOURCE_FORMATS = {
+    'JPEG': ('image.jpg', 'image/jpeg'),
+    'PNG': ('image.png', 'image/png'),
+    'WEBP': ('image.webp', 'image/webp'),
+}
+
+SOURCE_CACHE_HITS = Counter('source_image_cache_hits_total', '원본 이미지 디스크 캐시 적중 수')
+SOURCE_CACHE_MISSES = Counter('source_image_cache_misses_total', '원본 이미지 디스크 캐시 미스 수 (S3 GET 발생)')
+SOURCE_CACHE_EVICTIONS = Counter('source_image_cache_evictions_total', '용량 초과로 삭제된 캐시 파일 수')
+SOURCE_CACHE_BYTES = Gauge('source_image_cache_bytes', '원본 이미지 디스크 캐시 사용량 (바이트)', multiprocess_mode='mostrecent')
+SOURCE_PREPROCESS = Counter(
+    'source_image_preprocess_total', '원본 이미지 전처리 결과 (hit: 캐시 사용, miss: 새로 전처리, original: 원본 그대로 사용)', ['result']
+)
+
+
+def _cache_path(url):
+    return os.path.join(settings.SOURCE_IMAGE_CACHE_DIR, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+
+def _write(path, chunks):
+    """조각들을 임시 파일에 기록한 뒤 원자적으로 캐시 경로로 옮깁니다."""
+    os.makedirs(settings.SOURCE_IMAGE_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=settings.SOURCE_IMAGE_CACHE_DIR, prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _download(url, path):
+    """URL을 임시 파일로 내려받은 뒤 원자적으로 캐시 경로로 옮깁니다."""
+    with get_client('s3').stream('GET', url) as response:
+        response.raise_for_status()
+        _write(path, response.iter_bytes(CHUNK_SIZE))
+
+
+def _evict():
+    """
+    캐시 용량이 최대치를 넘으면 가장 오래 사용하지 않은 파일(mtime 기준)부터 삭제합니다.
+    여러 프로세스가 같은 디렉토리를 공유하므로 인덱스 대신 파일 시스템 정보를 사용합니다.
+    """
+    entries = []
+    total_size = 0
+    with os.scandir(settings.SOURCE_IMAGE_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.startswith(TEMP_PREFIX) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    max_bytes = settings.SOURCE_IMAGE_CACHE_MAX_BYTES
+    if total_size > max_bytes:
+        # 한 번 정리할 때 여유 공간을 두어 매 요청마다 정리하지 않도록 함
+        target = max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total_size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total_size -= size
+            SOURCE_CACHE_EVICTIONS.inc()
+    SOURCE_CACHE_BYTES.set(total_size)
+
+
+def fetch(url):
+    """
+    URL의 이미지를 로컬 디스크 캐시에서 찾고, 없으면 내려받아 캐시한 뒤 파일 경로를 반환합니다.
+    S3 객체 키는 내용이 바뀌지 않으므로 URL을 캐시 키로 사용합니다.
+    """
+    path = _cache_path(url)
+    try:
+        # 접근 시각을 갱신해 LRU 순서를 유지
+        os.utime(path)
+        SOURCE_CACHE_HITS.inc()
+        return path
+    except FileNotFoundError:
+        pass
+
+    SOURCE_CACHE_MISSES.inc()
+    _download(url, path)
+    _evict()
+    logger.debug("Cached source image %s at %s", url, path)
+    return path
+
+
+def put(url, file_obj):
+    """
+    S3에 올렸거나 올릴 파일을 해당 URL의 캐시 항목으로 기록하고 파일 경로를 반환합니다.
+    같은 워커에서 이어지는 작업은 S3에서 다시 내려받지 않고 로컬 디스크에서 읽습니다.
+    """
+    path = _cache_path(url)
+    _write(path, iter(lambda: file_obj.read(CHUNK_SIZE), b''))
+    _evict()
+    logger.debug("Stored source image %s at %s", url, path)
+    return path
+
+
+def _mmap(f, url):
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Cached image for {url} is empty")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _open_with_retry(get_path):
+    for attempt in range(2):
+        path = get_path()
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            # 경로를 얻은 직후 다른 프로세스가 삭제한 경우 한 번 더 만듦
+            if attempt:
+                raise
+
+
+def open_mmap(url):
+    """
+    캐시된 이미지 파일을 읽기 전용 mmap으로 열어 반환합니다.
+    mmap 객체는 read/seek/tell을 지원하므로 PIL이나 HTTP 업로드에 파일 객체처럼 넘길 수 있고,
+    with 문으로 닫을 수 있습니다. 매핑 후에는 캐시에서 파일이 삭제되어도 계속 읽을 수 있습니다.
+    """
+    return _mmap(_open_with_retry(lambda: fetch(url)), url)
+
+
+def _preprocessed_path(url, max_width, max_height):
+    key = f"{url}|{max_width}x{max_height}|{settings.DRAPH_SOURCE_FORMAT}|{settings.DRAPH_SOURCE_QUALITY}"
+    return os.path.join(settings.SOURCE_IMAGE_CACHE_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def _has_alpha(pil_image):
+    return pil_image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in pil_image.info
+
+
+def _preprocess(source_path, path, max_width, max_height):
+    """
+    원본을 출력 크기 안에 들어오도록 줄이고(확대하지 않음) 설정된 형식으로 인코딩해 path에 저장합니다.
+    알파 채널이 있는 이미지를 JPEG로 보내도록 설정되어 있으면 투명도를 잃지 않도록 PNG로 저장합니다.
+    원본이 이미 출력 크기 안에 들고 같은 형식이면 다시 인코딩하지 않고 False를 반환합니다.
+    """
+    with PILImage.open(source_path) as pil_image:
+        alpha = _has_alpha(pil_image)
+        image_format = 'PNG' if alpha and settings.DRAPH_SOURCE_FORMAT == 'JPEG' else settings.DRAPH_SOURCE_FORMAT
+        rotated = pil_image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        if (pil_image.width <= max_width and pil_image.height <= max_height
+                and pil_image.format == image_format and not rotated):
+            return False
+
+        # JPEG는 디코딩 단계에서 미리 축소해 전체 해상도 픽셀을 메모리에 올리지 않음
+        pil_image.draft('RGB', (max_width, max_height))
+        resized = ImageOps.exif_transpose(pil_image)
+        resized.thumbnail((max_width, max_height), PILImage.LANCZOS)
+        resized = resized.convert('RGBA' if alpha and image_format != 'JPEG' else 'RGB')
+
+        fd, temp_path = tempfile.mkstemp(dir=settings.SOURCE_IMAGE_CACHE_DIR, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if image_format == 'PNG':
+                    resized.save(f, format='PNG', optimize=True)
+                else:
+                    resized.save(f, format=image_format, quality=settings.DRAPH_SOURCE_QUALITY)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    return True
+
+
+def _fetch_preprocessed(url, max_width, max_height):
+    # 전처리 결과가 없으면 만들고, 원본을 그대로 보내도 되면 원본 경로를 반환
+    path = _preprocessed_path(url, max_width, max_height)
+    try:
+        os.utime(path)
+        SOURCE_PREPROCESS.labels(result='hit').inc()
+        return path
+    except FileNotFoundError:
+        pass
+
+    source_path = fetch(url)
+    with timed('preprocess'):
+        preprocessed = _preprocess(source_path, path, max_width, max_height)
+    if not preprocessed:
+        SOURCE_PREPROCESS.labels(result='original').inc()
+        return source_path
+    SOURCE_PREPROCESS.labels(result='miss').inc()
+    _evict()
+    logger.debug("Preprocessed source image %s for %dx%d at %s", url, max_width, max_height, path)
+    return path
+
+
+def open_source(url, max_width, max_height):
+    """
+    외부 API로 보낼 원본 이미지를 출력 크기(max_width x max_height)에 맞게 전처리해 mmap으로 열고,
+    (mmap, 파일 이름, Content-Type)을 반환합니다. 전처리 결과는 (원본, 크기)별로 디스크 캐시에 저장합니다.
+    """
+    f = _open_with_retry(lambda: _fetch_preprocessed(url, max_width, max_height))
+    with PILImage.open(f) as pil_image:
+        image_format = pil_image.format
+    f.seek(0)
+    filename, content_type = SOURCE_FORMATS.get(image_format, ('image.jpg', 'image/jpeg'))
+    return _mmap(f, url), filename, content_type
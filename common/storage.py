@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse, unquote
+import boto3
+import redis
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# 삭제 대기 중인 S3 객체 키를 담는 Redis 리스트
+DELETE_QUEUE_KEY = 's3_delete_queue'
+# 삭제 작업이 큐에서 꺼내 처리 중인 키 목록
+DELETE_PROCESSING_KEY = 's3_delete_queue_processing'
+
+# S3 클라이언트 관련 Prometheus 메트릭
+S3_CLIENT_BUILD_SECONDS = Histogram('s3_client_build_seconds', 'S3 클라이언트 생성에 걸린 시간 (초)')
+S3_POOL_MAX_CONNECTIONS = Gauge('s3_pool_max_connections', 'S3 클라이언트 커넥션 풀 최대 크기', multiprocess_mode='max')
+S3_REQUESTS_IN_FLIGHT = Gauge('s3_requests_in_flight', '커넥션 풀을 사용 중인 S3 요청 수', multiprocess_mode='livesum')
+S3_REQUESTS_TOTAL = Counter('s3_requests_total', 'S3 API 호출 수', ['operation'])
+S3_DELETE_ENQUEUED_TOTAL = Counter('s3_delete_enqueued_total', '삭제 큐에 추가된 S3 객체 수')
+
+# 프로세스당 하나의 S3 클라이언트 (boto3 클라이언트는 생성 후 스레드 간 공유 가능)
+_client = None
+_client_lock = threading.Lock()
+
+
+def _reset_client():
+    global _client
+    _client = None
+
+
+# gunicorn/Celery prefork 워커가 부모 프로세스의 커넥션을 물려받지 않도록 fork 후 초기화
+os.register_at_fork(after_in_child=_reset_client)
+
+
+def _on_before_call(model, **kwargs):
+    S3_REQUESTS_TOTAL.labels(operation=model.name).inc()
+    S3_REQUESTS_IN_FLIGHT.inc()
+
+
+def _on_after_call(**kwargs):
+    S3_REQUESTS_IN_FLIGHT.dec()
+
+
+def _build_client():
+    started = time.perf_counter()
+    client = boto3.session.Session().client(
+        's3',
+        region_name=settings.AWS_S3_REGION_NAME,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        config=Config(
+            max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+            read_timeout=settings.AWS_S3_READ_TIMEOUT,
+            retries={'max_attempts': settings.AWS_S3_MAX_ATTEMPTS, 'mode': 'adaptive'},
+            tcp_keepalive=True,
+        ),
+    )
+    events = client.meta.events
+    events.register('before-call.s3', _on_before_call)
+    events.register('after-call.s3', _on_after_call)
+    events.register('after-call-error.s3', _on_after_call)
+
+    S3_CLIENT_BUILD_SECONDS.observe(time.perf_counter() - started)
+    S3_POOL_MAX_CONNECTIONS.set(settings.AWS_S3_MAX_POOL_CONNECTIONS)
+    logger.info("Built S3 client for pid %s", os.getpid())
+    return client
+
+
+def get_s3_client():
+    """
+    프로세스 전체에서 공유하는 S3 클라이언트를 반환합니다.
+    처음 호출될 때 한 번만 생성되며, 커넥션 풀을 재사용해 매 요청마다 TLS 연결을 새로 맺지 않습니다.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def get_transfer_config():
+    """upload_fileobj에 사용할 멀티파트 전송 설정을 반환합니다."""
+    return TransferConfig(
+        multipart_threshold=settings.IMAGE_MULTIPART_PART_SIZE,
+        multipart_chunksize=settings.IMAGE_MULTIPART_PART_SIZE,
+        max_concurrency=settings.IMAGE_MULTIPART_MAX_CONCURRENCY,
+    )
+
+
+def build_url(key):
+    """
+    S3 객체 키로 공개 URL을 만듭니다.
+    로컬 S3 호환 서버를 쓰면 path-style, 그렇지 않으면 리전이 포함된 https virtual-hosted URL을 반환합니다.
+    """
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{settings.AWS_STORAGE_BUCKET_NAME}/{key}"
+    return f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{key}"
+
+
+def key_from_url(url):
+    """
+    공개 URL에서 S3 객체 키를 꺼냅니다.
+    예전에 저장된 http/https, 리전 포함/미포함 URL과 path-style URL을 모두 처리합니다.
+    """
+    path = unquote(urlparse(url).path).lstrip('/')
+    if settings.AWS_S3_ENDPOINT_URL and path.startswith(f"{settings.AWS_STORAGE_BUCKET_NAME}/"):
+        path = path[len(settings.AWS_STORAGE_BUCKET_NAME) + 1:]
+    return path
+
+
+def url_variants(key):
+    """
+    하나의 객체 키에 대해 DB에 저장되어 있을 수 있는 모든 URL 형태를 반환합니다.
+    (예전 코드가 http/https와 리전 포함/미포함 URL을 섞어서 저장했기 때문)
+    """
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    hosts = (f"{bucket}.s3.amazonaws.com", f"{bucket}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com")
+    variants = {f"{scheme}://{host}/{key}" for scheme in ('http', 'https') for host in hosts}
+    variants.add(build_url(key))
+    return variants
+
+
+def upload_fileobj(file_obj, key, content_type):
+    """파일 객체를 S3에 업로드하고 공개 URL을 반환합니다."""
+    get_s3_client().upload_fileobj(
+        file_obj,
+        settings.AWS_STORAGE_BUCKET_NAME,
+        key,
+        ExtraArgs={'ContentType': content_type},
+        Config=get_transfer_config(),
+    )
+    return build_url(key)
+
+
+def object_exists(key):
+    """HEAD 요청으로 S3 객체 존재 여부를 확인합니다."""
+    try:
+        get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def enqueue_delete(*keys):
+    """
+    S3 객체 삭제를 큐에 넣습니다. 실제 삭제는 Celery 작업이 DeleteObjects로 모아서 처리하므로
+    API 요청은 S3 응답을 기다리지 않습니다.
+    """
+    keys = [key for key in keys if key]
+    if not keys:
+        return
+    redis_client.rpush(DELETE_QUEUE_KEY, *keys)
+    S3_DELETE_ENQUEUED_TOTAL.inc(len(keys))
+    logger.debug("Queued %d S3 objects for deletion", len(keys))
+
+
+def cancel_delete(key):
+    """삭제 큐에서 키를 제거합니다. 삭제 대기 중인 객체를 다시 사용하게 되었을 때 호출합니다."""
+    pipe = redis_client.pipeline()
+    pipe.lrem(DELETE_QUEUE_KEY, 0, key)
+    # 이전 삭제 작업이 처리하지 못하고 남긴 배치에서도 제거
+    pipe.lrem(DELETE_PROCESSING_KEY, 0, key)
+    removed = sum(pipe.execute())
+    if removed:
+        logger.info("Removed %s from the S3 delete queue", key)
+    return removed
+
+
+def delete_objects(keys):
+    """
+    DeleteObjects API로 여러 객체를 한 번에 삭제하고, 삭제에 실패한 키 목록을 반환합니다.
+    한 번 호출에 최대 1000개까지 삭제할 수 있습니다.
+    """
+    response = get_s3_client().delete_objects(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+    )
+    errors = response.get('Errors', [])
+    for error in errors:
+        logger.error("Failed to delete S3 object %s: %s", error.get('Key'), error.get('Message'))
+    return [error['Key'] for error in errors]
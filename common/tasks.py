@@ -0,0 +1,136 @@
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+import random
+import uuid
+import logging
+import redis
+from prometheus_client import Counter, Gauge
+from . import storage, webhooks
+from .gc import collect_orphans, find_referenced_keys
+from .locks import release_lock
+from .models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# DeleteObjects 한 번에 삭제할 수 있는 최대 키 수
+DELETE_BATCH_SIZE = 1000
+# 동시에 하나의 워커만 큐를 비우도록 하는 잠금 키
+DELETE_QUEUE_LOCK_KEY = 's3_delete_queue_lock'
+
+# 삭제 큐에서 배치를 꺼내 처리 중 목록으로 옮김 (꺼내기와 옮기기를 원자적으로 처리해 그 사이 LREM으로 목록이 밀려도 키를 잃지 않음)
+# 이전 실행이 처리하지 못한 배치가 남아 있으면 그 배치를 먼저 반환
+# KEYS: 삭제 큐, 처리 중 목록 / ARGV: 배치 크기
+CLAIM_BATCH_SCRIPT = """
+local keys = redis.call('LRANGE', KEYS[2], 0, -1)
+if #keys > 0 then
+    return keys
+end
+keys = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #keys > 0 then
+    redis.call('LTRIM', KEYS[1], #keys, -1)
+    redis.call('RPUSH', KEYS[2], unpack(keys))
+end
+return keys
+"""
+
+S3_DELETED_OBJECTS_TOTAL = Counter('s3_deleted_objects_total', '삭제 큐에서 처리된 S3 객체 수', ['result'])
+S3_DELETE_QUEUE_LENGTH = Gauge('s3_delete_queue_length', '삭제 대기 중인 S3 객체 수', multiprocess_mode='mostrecent')
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def drain_s3_delete_queue(self):
+    """
+    삭제 큐에 쌓인 S3 객체 키를 최대 1000개씩 DeleteObjects로 삭제합니다.
+    꺼낸 키는 S3 삭제가 끝날 때까지 처리 중 목록에 남겨 두므로 워커가 중간에 죽어도 다음 실행에서 다시 처리합니다.
+    """
+    lock_timeout = settings.S3_DELETE_DRAIN_LOCK_TIMEOUT
+    token = self.request.id or uuid.uuid4().hex
+    if not redis_client.set(DELETE_QUEUE_LOCK_KEY, token, nx=True, ex=lock_timeout):
+        logger.debug("Another worker is draining the S3 delete queue")
+        return 0
+
+    deleted = 0
+    try:
+        for _ in range(settings.S3_DELETE_MAX_BATCHES_PER_RUN):
+            keys = [key.decode('utf-8') for key in redis_client.eval(
+                CLAIM_BATCH_SCRIPT, 2, storage.DELETE_QUEUE_KEY, storage.DELETE_PROCESSING_KEY, DELETE_BATCH_SIZE
+            )]
+            if not keys:
+                break
+
+            # 생성 결과 캐시나 중복 제거로 다른 행이 같은 객체를 참조하고 있으면 삭제하지 않음
+            referenced = find_referenced_keys(keys)
+            delete_keys = [key for key in keys if key not in referenced]
+            try:
+                failed_keys = storage.delete_objects(delete_keys) if delete_keys else []
+            except Exception as e:
+                logger.error("DeleteObjects failed for %d keys: %s", len(delete_keys), e)
+                raise self.retry(exc=e)
+
+            # 처리 중 목록을 비우고, 실패한 키는 다시 큐 뒤에 추가
+            pipe = redis_client.pipeline()
+            pipe.delete(storage.DELETE_PROCESSING_KEY)
+            if failed_keys:
+                pipe.rpush(storage.DELETE_QUEUE_KEY, *failed_keys)
+            pipe.expire(DELETE_QUEUE_LOCK_KEY, lock_timeout)
+            pipe.execute()
+
+            S3_DELETED_OBJECTS_TOTAL.labels(result='deleted').inc(len(delete_keys) - len(failed_keys))
+            S3_DELETED_OBJECTS_TOTAL.labels(result='failed').inc(len(failed_keys))
+            S3_DELETED_OBJECTS_TOTAL.labels(result='referenced').inc(len(referenced))
+            deleted += len(delete_keys) - len(failed_keys)
+    finally:
+        release_lock(redis_client, DELETE_QUEUE_LOCK_KEY, token)
+        S3_DELETE_QUEUE_LENGTH.set(redis_client.llen(storage.DELETE_QUEUE_KEY))
+
+    if deleted:
+        logger.info("Deleted %d S3 objects from the delete queue", deleted)
+    return deleted
+
+
+@shared_task
+def gc_s3_orphans():
+    """DB에서 참조하지 않는 S3 객체를 찾아 삭제 큐에 추가하는 주기 작업."""
+    return collect_orphans()
+
+
+@shared_task(bind=True, max_retries=None)
+def deliver_webhook(self, delivery_id):
+    """
+    서명된 웹훅을 전송합니다. 일시적인 오류는 지수 백오프(+지터)로 다시 시도하고,
+    모든 시도 결과는 WebhookDelivery에 기록합니다.
+    """
+    try:
+        delivery = WebhookDelivery.objects.get(id=delivery_id)
+    except WebhookDelivery.DoesNotExist:
+        logger.error("WebhookDelivery %s does not exist", delivery_id)
+        return None
+    if delivery.status != WebhookDelivery.STATUS_PENDING:
+        return delivery.status
+
+    delivery.attempts += 1
+    try:
+        delivery.response_status = webhooks.send(delivery)
+    except webhooks.WebhookError as e:
+        delivery.response_status = e.status_code
+        delivery.last_error = str(e)
+        if e.retryable and delivery.attempts < settings.WEBHOOK_MAX_ATTEMPTS:
+            delivery.save(update_fields=['attempts', 'response_status', 'last_error', 'updated_at'])
+            backoff = min(settings.WEBHOOK_RETRY_BACKOFF * 2 ** (delivery.attempts - 1), settings.WEBHOOK_RETRY_BACKOFF_MAX)
+            countdown = backoff + random.uniform(0, backoff / 2)
+            logger.info("Webhook %s to %s failed (%s), retrying in %.0fs", delivery.id, delivery.url, e, countdown)
+            raise self.retry(exc=e, countdown=countdown)
+
+        delivery.status = WebhookDelivery.STATUS_FAILED
+        delivery.save(update_fields=['attempts', 'response_status', 'last_error', 'status', 'updated_at'])
+        logger.warning("Webhook %s to %s failed after %d attempts: %s", delivery.id, delivery.url, delivery.attempts, e)
+        return delivery.status
+
+    delivery.status = WebhookDelivery.STATUS_DELIVERED
+    delivery.delivered_at = timezone.now()
+    delivery.last_error = ''
+    delivery.save(update_fields=['attempts', 'response_status', 'last_error', 'status', 'delivered_at', 'updated_at'])
+    logger.info("Delivered webhook %s to %s", delivery.id, delivery.url)
+    return delivery.status
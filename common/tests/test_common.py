@@ -0,0 +1,657 @@
+import io
+import os
+import json
+import hmac
+import hashlib
+import base64
+import httpx
+import pytest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from celery.exceptions import Retry
+from django.core.management import call_command
+from PIL import Image as PILImage
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from common import storage, source_cache, http_client, draph, webhooks, generation_cache, generation, rate_limit, circuit_breaker, retry, encoding, worker_metrics, memory
+from common.models import WebhookDelivery, DeadLetter
+from common.tasks import deliver_webhook, drain_s3_delete_queue, DELETE_QUEUE_LOCK_KEY
+from common.gc import find_referenced_keys, iter_batches
+from user.models import User
+from image.models import Image
+
+
+@pytest.mark.django_db
+class TestStorage:
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_REGION_NAME='ap-northeast-2', AWS_S3_ENDPOINT_URL=None)
+    def test_build_url(self): #공개 URL 생성
+        assert storage.build_url('a.png') == 'https://bucket.s3.ap-northeast-2.amazonaws.com/a.png'
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_ENDPOINT_URL='http://minio:9000/')
+    def test_build_url_with_endpoint(self): #로컬 S3 호환 서버 사용 시 path-style URL 생성
+        assert storage.build_url('a.png') == 'http://minio:9000/bucket/a.png'
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_ENDPOINT_URL=None)
+    def test_key_from_url(self): #예전에 저장된 여러 형태의 URL에서 객체 키 추출
+        assert storage.key_from_url('http://bucket.s3.ap-northeast-2.amazonaws.com/a.png') == 'a.png'
+        assert storage.key_from_url('https://bucket.s3.amazonaws.com/uuid_my%20file.png') == 'uuid_my file.png'
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_ENDPOINT_URL='http://minio:9000')
+    def test_key_from_url_with_endpoint(self): #path-style URL에서 버킷 이름을 제외한 객체 키 추출
+        assert storage.key_from_url('http://minio:9000/bucket/a.png') == 'a.png'
+
+
+@pytest.mark.django_db
+class TestOrphanCollection:
+    def setup_method(self):
+        self.user = User.objects.create(nickname='testuser')
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_REGION_NAME='ap-northeast-2', AWS_S3_ENDPOINT_URL=None)
+    def test_find_referenced_keys(self): #여러 URL 형태로 저장된 참조를 모두 찾는지 테스트
+        Image.objects.create(user=self.user, image_url='https://bucket.s3.amazonaws.com/a.png')
+        Image.objects.create(user=self.user, image_url='http://bucket.s3.ap-northeast-2.amazonaws.com/b.png')
+        assert find_referenced_keys(['a.png', 'b.png', 'c.png']) == {'a.png', 'b.png'}
+
+    def test_pending_upload_protects_content_key(self): #업로드 대기 중인 같은 내용의 Image가 있으면 내용 기반 키를 참조 중으로 보는지 테스트
+        digest = 'a' * 64
+        assert find_referenced_keys([f'{digest}.png']) == set()
+        Image.objects.create(user=self.user, image_url='', sha256=digest)
+        assert find_referenced_keys([f'{digest}.png', f'{"b" * 64}.png']) == {f'{digest}.png'}
+
+    def test_iter_batches(self): #배치 단위로 나누는지 테스트
+        assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+class TestDeleteQueue:
+    @patch('common.tasks.release_lock')
+    @patch('common.tasks.storage.delete_objects')
+    @patch('common.tasks.find_referenced_keys')
+    @patch('common.tasks.redis_client')
+    def test_drain_claims_batches_atomically(self, mock_redis, mock_referenced, mock_delete, mock_release_lock): #배치를 원자적으로 꺼내 처리 중 목록에 두고, 참조 중이 아닌 키만 삭제한 뒤 토큰으로 잠금을 해제하는지 테스트
+        mock_redis.set.return_value = True
+        mock_redis.eval.side_effect = [[b'a.png', b'b.png'], []]
+        mock_redis.llen.return_value = 0
+        mock_referenced.return_value = {'b.png'}
+        mock_delete.return_value = []
+
+        assert drain_s3_delete_queue.apply().get() == 1
+        mock_delete.assert_called_once_with(['a.png'])
+        mock_redis.lrange.assert_not_called()
+        mock_redis.ltrim.assert_not_called()
+        mock_redis.pipeline.return_value.delete.assert_called_with(storage.DELETE_PROCESSING_KEY)
+        token = mock_redis.set.call_args.args[1]
+        mock_release_lock.assert_called_once_with(mock_redis, DELETE_QUEUE_LOCK_KEY, token)
+        mock_redis.delete.assert_not_called()
+
+    @patch('common.storage.redis_client')
+    def test_cancel_delete(self, mock_redis): #삭제 큐와 처리 중 목록 모두에서 키를 제거하는지 테스트
+        mock_redis.pipeline.return_value.execute.return_value = [1, 0]
+        assert storage.cancel_delete('a.png') == 1
+        mock_redis.pipeline.return_value.lrem.assert_any_call(storage.DELETE_QUEUE_KEY, 0, 'a.png')
+        mock_redis.pipeline.return_value.lrem.assert_any_call(storage.DELETE_PROCESSING_KEY, 0, 'a.png')
+
+
+def _fake_client(data):
+    response = MagicMock()
+    response.iter_bytes.return_value = [data]
+    response.__enter__.return_value = response
+    client = MagicMock()
+    client.stream.return_value = response
+    return client
+
+
+class TestSourceCache:
+    @patch('common.source_cache.get_client')
+    def test_fetch_caches_download(self, mock_get_client, tmp_path): #두 번째 요청은 다운로드 없이 캐시에서 읽는지 테스트
+        mock_get_client.return_value = _fake_client(b'image-bytes')
+        with override_settings(SOURCE_IMAGE_CACHE_DIR=str(tmp_path), SOURCE_IMAGE_CACHE_MAX_BYTES=1024):
+            with source_cache.open_mmap('https://bucket/a.png') as image_file:
+                assert image_file.read() == b'image-bytes'
+            with source_cache.open_mmap('https://bucket/a.png') as image_file:
+                assert image_file.read() == b'image-bytes'
+        assert mock_get_client.return_value.stream.call_count == 1
+
+    @patch('common.source_cache.get_client')
+    def test_evicts_least_recently_used(self, mock_get_client, tmp_path): #용량 초과 시 오래 사용하지 않은 파일부터 삭제되는지 테스트
+        mock_get_client.return_value = _fake_client(b'x' * 60)
+        with override_settings(SOURCE_IMAGE_CACHE_DIR=str(tmp_path), SOURCE_IMAGE_CACHE_MAX_BYTES=100):
+            old_path = source_cache.fetch('https://bucket/old.png')
+            os.utime(old_path, (0, 0))
+            new_path = source_cache.fetch('https://bucket/new.png')
+        assert not os.path.exists(old_path)
+        assert os.path.exists(new_path)
+
+    @patch('common.source_cache.get_client')
+    def test_put_skips_download(self, mock_get_client, tmp_path): #직접 기록한 파일은 다운로드 없이 읽는지 테스트
+        with override_settings(SOURCE_IMAGE_CACHE_DIR=str(tmp_path), SOURCE_IMAGE_CACHE_MAX_BYTES=1024):
+            source_cache.put('https://bucket/a.png', io.BytesIO(b'image-bytes'))
+            with source_cache.open_mmap('https://bucket/a.png') as image_file:
+                assert image_file.read() == b'image-bytes'
+        mock_get_client.assert_not_called()
+
+    @patch('common.source_cache.get_client')
+    def test_open_source_downscales(self, mock_get_client, tmp_path): #출력 크기에 맞게 줄인 JPEG를 캐시해 보내는지 테스트
+        mock_get_client.return_value = _fake_client(_png_bytes(size=(400, 200), mode='RGB'))
+        with override_settings(SOURCE_IMAGE_CACHE_DIR=str(tmp_path), SOURCE_IMAGE_CACHE_MAX_BYTES=10 ** 6):
+            image_file, filename, content_type = source_cache.open_source('https://bucket/a.png', 100, 100)
+            with image_file, PILImage.open(image_file) as pil_image:
+                assert (pil_image.format, pil_image.size) == ('JPEG', (100, 50))
+            assert (filename, content_type) == ('image.jpg', 'image/jpeg')
+            source_cache.open_source('https://bucket/a.png', 100, 100)[0].close()
+        assert mock_get_client.return_value.stream.call_count == 1
+
+    @patch('common.source_cache.get_client')
+    def test_open_source_keeps_alpha(self, mock_get_client, tmp_path): #알파 채널이 있으면 PNG로, 작은 원본은 그대로 보내는지 테스트
+        mock_get_client.return_value = _fake_client(_png_bytes(size=(40, 20)))
+        with override_settings(SOURCE_IMAGE_CACHE_DIR=str(tmp_path), SOURCE_IMAGE_CACHE_MAX_BYTES=10 ** 6):
+            image_file, filename, content_type = source_cache.open_source('https://bucket/a.png', 100, 100)
+            with image_file:
+                assert image_file.read() == _png_bytes(size=(40, 20))
+            assert (filename, content_type) == ('image.png', 'image/png')
+
+
+class TestHttpClient:
+    def test_client_shared_per_upstream(self): #업스트림별로 하나의 클라이언트를 재사용하는지 테스트
+        assert http_client.get_client('draph') is http_client.get_client('draph')
+        assert http_client.get_client('draph') is not http_client.get_client('openai')
+
+    def test_upstream_read_timeout(self): #업스트림별 응답 대기 시간이 적용되는지 테스트
+        with override_settings(DRAPHART_READ_TIMEOUT=99.0):
+            http_client._reset_clients()
+            assert http_client.get_client('draph').timeout.read == 99.0
+        http_client._reset_clients()
+
+
+def _png_bytes(size=(4, 3), mode='RGBA'):
+    buffer = io.BytesIO()
+    PILImage.new(mode, size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestDraph:
+    @patch('common.draph.circuit_breaker.guard')
+    @patch('common.draph.get_client')
+    @patch('common.draph.source_cache.open_source')
+    def test_generate_streams_results(self, mock_open, mock_get_client, mock_guard): #응답을 조각 단위로 디코딩해 결과 파일로 반환하는지 테스트
+        mock_open.return_value = (io.BytesIO(b'source'), 'image.jpg', 'image/jpeg')
+        payload = base64.b64encode(_png_bytes())
+        response = mock_get_client.return_value.stream.return_value.__enter__.return_value
+        response.status_code = 200
+        response.iter_bytes.return_value = [payload[:5], payload[5:11], payload[11:]]
+        result_files = draph.generate('https://bucket/a.png', {'gen_type': 'simple', 'output_w': 1000, 'output_h': 1000})
+        assert [result_file.read() for result_file in result_files] == [_png_bytes()]
+
+    @override_settings(DRAPH_MAX_RESPONSE_BYTES=10)
+    @patch('common.draph.circuit_breaker.guard')
+    @patch('common.draph.get_client')
+    @patch('common.draph.source_cache.open_source')
+    def test_generate_rejects_large_response(self, mock_open, mock_get_client, mock_guard): #응답이 최대 크기를 넘으면 중단하는지 테스트
+        mock_open.return_value = (io.BytesIO(b'source'), 'image.jpg', 'image/jpeg')
+        response = mock_get_client.return_value.stream.return_value.__enter__.return_value
+        response.status_code = 200
+        response.iter_bytes.return_value = [b'A' * 8, b'A' * 8]
+        with pytest.raises(draph.DraphError):
+            draph.generate('https://bucket/a.png', {'gen_type': 'simple', 'output_w': 1000, 'output_h': 1000})
+
+    def test_parse_multiple_results(self): #num_results가 여러 개인 응답(JSON 배열, 객체)을 조각이 나뉘어도 해석하는지 테스트
+        images = [_png_bytes(), _png_bytes((2, 2))]
+        payloads = [base64.b64encode(image).decode('ascii') for image in images]
+        for body in (json.dumps(payloads), json.dumps({'images': payloads}), json.dumps(payloads).replace('/', '\\/')):
+            body = body.encode('utf-8')
+            parser = draph.ResultStreamParser()
+            for position in range(0, len(body), 7):
+                parser.feed(body[position:position + 7])
+            assert [result_file.read() for result_file in parser.close()] == images
+
+    def test_parse_escaped_slash(self): #JSON 문자열의 슬래시 이스케이프가 조각 경계에 걸려도 해석하는지 테스트
+        data = bytes(range(256))
+        body = b'["' + base64.b64encode(data).replace(b'/', b'\\/') + b'"]'
+        for size in (1, 2, 3):
+            parser = draph.ResultStreamParser()
+            for position in range(0, len(body), size):
+                parser.feed(body[position:position + size])
+            assert parser.close()[0].read() == data
+
+    @patch('common.draph.circuit_breaker.guard')
+    @patch('common.draph.get_client')
+    @patch('common.draph.source_cache.open_source')
+    def test_generate_raises_on_error_response(self, mock_open, mock_get_client, mock_guard): #API 오류 응답 시 DraphError 발생 테스트
+        mock_open.return_value = (io.BytesIO(b'source'), 'image.jpg', 'image/jpeg')
+        response = mock_get_client.return_value.stream.return_value.__enter__.return_value
+        response.status_code = 400
+        response.text = 'bad request'
+        with pytest.raises(draph.DraphError):
+            draph.generate('https://bucket/a.png', {'gen_type': 'simple', 'output_w': 1000, 'output_h': 1000})
+
+
+@pytest.mark.django_db
+class TestJobs:
+    def setup_method(self):
+        self.client = APIClient()
+
+    @patch('common.views.jobs.get_job', return_value=None)
+    def test_job_status_not_found(self, mock_get_job): #존재하지 않는 작업 조회 테스트
+        response = self.client.get(reverse('job-status', kwargs={'jobId': 'missing'}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @patch('common.views.jobs.get_job')
+    def test_job_status(self, mock_get_job): #작업 상태 조회 테스트
+        mock_get_job.return_value = {'job_id': 'abc', 'kind': 'image_upload', 'status': 'running', 'stage': 'uploading'}
+        response = self.client.get(reverse('job-status', kwargs={'jobId': 'abc'}))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['stage'] == 'uploading'
+
+    @patch('common.views.jobs.iter_job_events')
+    @patch('common.views.jobs.get_job')
+    def test_job_events_stream(self, mock_get_job, mock_iter_job_events): #상태 변경이 SSE 형식으로 전달되는지 테스트
+        mock_get_job.return_value = {'job_id': 'abc', 'status': 'queued'}
+        mock_iter_job_events.return_value = iter([
+            {'job_id': 'abc', 'status': 'running'},
+            None,
+            {'job_id': 'abc', 'status': 'succeeded', 'result': {'image_id': 1}},
+        ])
+        response = self.client.get(reverse('job-events', kwargs={'jobId': 'abc'}))
+        assert response['Content-Type'] == 'text/event-stream'
+        body = b''.join(response.streaming_content).decode('utf-8')
+        assert 'event: running\n' in body
+        assert ': keep-alive\n\n' in body
+        assert body.rstrip().endswith('"result": {"image_id": 1}}')
+
+
+@pytest.mark.django_db
+class TestWebhooks:
+    @patch('common.webhooks.socket.getaddrinfo', return_value=[(2, 1, 6, '', ('93.184.216.34', 443))])
+    def test_validate_callback_url(self, mock_getaddrinfo): #http(s) URL만 콜백으로 허용하는지 테스트
+        webhooks.validate_callback_url('https://partner.example.com/hooks')
+        with pytest.raises(ValidationError):
+            webhooks.validate_callback_url('ftp://partner.example.com/hooks')
+
+    @pytest.mark.parametrize('address', ['127.0.0.1', '10.0.0.5', '172.18.0.3', '169.254.169.254', '::1'])
+    def test_rejects_internal_callback(self, address): #내부 주소로 해석되는 콜백 URL을 거부하는지 테스트
+        with patch('common.webhooks.socket.getaddrinfo', return_value=[(2, 1, 6, '', (address, 80))]):
+            with pytest.raises(ValidationError):
+                webhooks.validate_callback_url('http://redis:6379/')
+
+    @override_settings(WEBHOOK_ALLOWED_HOSTS=['example.com'])
+    def test_allowed_callback_hosts(self): #허용 목록이 있으면 목록의 호스트와 하위 도메인만 허용하는지 테스트
+        webhooks.validate_callback_url('https://hooks.example.com/a')
+        with pytest.raises(ValidationError):
+            webhooks.validate_callback_url('https://example.com.evil.net/a')
+
+    @patch('common.webhooks.socket.getaddrinfo', return_value=[(2, 1, 6, '', ('169.254.169.254', 80))])
+    def test_send_blocks_internal_destination(self, mock_getaddrinfo): #전송 시점에 내부 주소로 해석되면 재시도 없이 실패하는지 테스트
+        delivery = WebhookDelivery(id=1, job_id='abc', event='job.succeeded', url='https://partner.example.com/hooks', payload={})
+        with pytest.raises(webhooks.WebhookError) as excinfo:
+            webhooks.send(delivery)
+        assert not excinfo.value.retryable
+
+    @override_settings(WEBHOOK_SIGNING_SECRET='secret')
+    def test_sign(self): #HMAC-SHA256 서명 테스트
+        expected = hmac.new(b'secret', b'1700000000.{}', hashlib.sha256).hexdigest()
+        assert webhooks.sign(b'{}', '1700000000') == expected
+
+    @patch('common.tasks.webhooks.send', return_value=200)
+    def test_deliver_webhook(self, mock_send): #전송 성공 시 전송 기록이 갱신되는지 테스트
+        delivery = WebhookDelivery.objects.create(job_id='abc', event='job.succeeded', url='https://partner.example.com/hooks', payload={})
+        deliver_webhook.apply(args=(delivery.id,))
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDelivery.STATUS_DELIVERED
+        assert delivery.attempts == 1 and delivery.response_status == 200
+
+    @patch('common.tasks.webhooks.send', side_effect=webhooks.WebhookError('HTTP 404', 404, retryable=False))
+    def test_deliver_webhook_rejected(self, mock_send): #재시도할 수 없는 응답이면 바로 실패 처리되는지 테스트
+        delivery = WebhookDelivery.objects.create(job_id='abc', event='job.succeeded', url='https://partner.example.com/hooks', payload={})
+        deliver_webhook.apply(args=(delivery.id,))
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDelivery.STATUS_FAILED
+        assert delivery.response_status == 404
+
+
+@pytest.mark.django_db
+class TestGenerationCache:
+    def test_make_key_canonical(self): #concept_option의 키 순서가 달라도 같은 캐시 키가 되는지 테스트
+        key1 = generation_cache.make_key('digest', {'gen_type': 'simple', 'concept_option': '{"theme": "modern", "category": "food"}'})
+        key2 = generation_cache.make_key('digest', {'concept_option': '{"category":"food","theme":"modern"}', 'gen_type': 'simple'})
+        assert key1 == key2
+        assert key1 != generation_cache.make_key('other', {'gen_type': 'simple', 'concept_option': '{"category":"food","theme":"modern"}'})
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_REGION_NAME='ap-northeast-2', AWS_S3_ENDPOINT_URL=None)
+    @patch('common.generation_cache.redis_client')
+    def test_get_drops_unreferenced_result(self, mock_redis): #참조하는 행이 없는 캐시 결과는 사용하지 않는지 테스트
+        mock_redis.get.return_value = json.dumps({'image_url': 'https://bucket.s3.amazonaws.com/gone.png', 'image_info': {}})
+        assert generation_cache.get('key') is None
+        mock_redis.delete.assert_called_once_with('key')
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_S3_REGION_NAME='ap-northeast-2', AWS_S3_ENDPOINT_URL=None)
+    @patch('common.generation_cache.redis_client')
+    def test_get_hit(self, mock_redis): #참조 중인 캐시 결과를 반환하는지 테스트
+        user = User.objects.create(nickname='testuser')
+        Image.objects.create(user=user, image_url='https://bucket.s3.amazonaws.com/kept.png')
+        mock_redis.get.return_value = json.dumps({'image_url': 'https://bucket.s3.amazonaws.com/kept.png', 'image_info': {}})
+        assert generation_cache.get('key')[0]['image_url'] == 'https://bucket.s3.amazonaws.com/kept.png'
+        assert generation_cache.get('key', exclude_url='https://bucket.s3.amazonaws.com/kept.png') is None
+
+
+class TestGenerationSingleFlight:
+    @patch('common.generation._generate_and_upload')
+    @patch('common.generation.generation_cache')
+    @patch('common.generation.redis_client')
+    def test_leader_generates(self, mock_redis, mock_cache, mock_generate): #처리 중인 같은 요청이 없으면 직접 생성하는지 테스트
+        mock_cache.get.return_value = None
+        mock_redis.set.return_value = True
+        mock_generate.return_value = [{'image_url': 'https://bucket/new.png', 'image_info': {'width': 1}}]
+
+        assert generation.generate_image(MagicMock(), {}, 'new.png') == ('https://bucket/new.png', {'width': 1})
+        mock_generate.assert_called_once()
+        mock_redis.publish.assert_called_once()
+
+    @patch('common.generation._generate_and_upload')
+    @patch('common.generation.generation_cache')
+    @patch('common.generation.redis_client')
+    def test_bypass_cache(self, mock_redis, mock_cache, mock_generate): #use_cache=False이면 캐시와 처리 중인 작업 결과를 사용하지 않고 새로 생성하는지 테스트
+        mock_generate.return_value = [{'image_url': 'https://bucket/new.png', 'image_info': {}}]
+        assert generation.generate_images(MagicMock(), {}, 'new.png', use_cache=False) == mock_generate.return_value
+        mock_cache.get.assert_not_called()
+        mock_redis.set.assert_not_called()
+
+    @patch('common.generation.jobs')
+    @patch('common.generation._wait_for_leader')
+    @patch('common.generation._generate_and_upload')
+    @patch('common.generation.generation_cache')
+    @patch('common.generation.redis_client')
+    def test_follower_reuses_inflight_result(self, mock_redis, mock_cache, mock_generate, mock_wait, mock_jobs): #같은 요청이 처리 중이면 그 결과를 사용하는지 테스트
+        mock_cache.get.return_value = None
+        mock_redis.set.return_value = False
+        mock_wait.return_value = [{'image_url': 'https://bucket/leader.png', 'image_info': {'width': 1}}]
+
+        assert generation.generate_image(MagicMock(), {}, 'new.png') == ('https://bucket/leader.png', {'width': 1})
+        mock_generate.assert_not_called()
+
+
+class TestRateLimit:
+    @override_settings(RATE_LIMITS={'draph': {'rate': 1.0, 'burst': 5}}, RATE_LIMIT_MAX_WAIT=10.0)
+    @patch('common.rate_limit.time.sleep')
+    @patch('common.rate_limit.redis_client')
+    def test_acquire_waits_for_turn(self, mock_redis, mock_sleep): #토큰이 부족하면 예약된 차례까지 기다리는지 테스트
+        mock_redis.eval.return_value = [1, b'0.5']
+        assert rate_limit.acquire('draph', 'key') == 0.5
+        mock_sleep.assert_called_once_with(0.5)
+
+    @override_settings(RATE_LIMITS={'draph': {'rate': 1.0, 'burst': 5}}, RATE_LIMIT_MAX_WAIT=10.0)
+    @patch('common.rate_limit.redis_client')
+    def test_acquire_rejects_long_wait(self, mock_redis): #최대 대기 시간을 넘으면 예외가 발생하는지 테스트
+        mock_redis.eval.return_value = [0, b'30']
+        with pytest.raises(rate_limit.RateLimitExceeded):
+            rate_limit.acquire('draph', 'key')
+
+    @patch('common.rate_limit.redis_client')
+    def test_unlimited_upstream(self, mock_redis): #설정에 없는 업스트림은 제한하지 않는지 테스트
+        assert rate_limit.acquire('s3', 'key') == 0.0
+        mock_redis.eval.assert_not_called()
+
+
+class TestCircuitBreaker:
+    def test_is_upstream_failure(self): #연결 실패, 5xx, 429만 외부 API 상태 이상으로 보는지 테스트
+        assert circuit_breaker.is_upstream_failure(httpx.ReadTimeout('timeout'))
+        assert circuit_breaker.is_upstream_failure(draph.DraphError('error', status_code=503))
+        assert circuit_breaker.is_upstream_failure(draph.DraphError('error', status_code=429))
+        assert not circuit_breaker.is_upstream_failure(draph.DraphError('error', status_code=400))
+
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_fails_fast_when_open(self, mock_breaker, mock_acquire_slot): #회로가 차단되어 있으면 호출하지 않고 바로 실패하는지 테스트
+        mock_breaker.return_value = False
+        with pytest.raises(circuit_breaker.UpstreamUnavailable):
+            with circuit_breaker.guard('draph'):
+                pytest.fail('차단 중에는 호출하면 안 됩니다.')
+        mock_acquire_slot.assert_not_called()
+
+    @patch('common.circuit_breaker._release_slot')
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_records_failure(self, mock_breaker, mock_acquire_slot, mock_release_slot): #5xx 응답을 실패로 기록하고 동시 호출 한도를 줄이는지 테스트
+        mock_breaker.return_value = True
+        with pytest.raises(draph.DraphError):
+            with circuit_breaker.guard('draph'):
+                raise draph.DraphError('error', status_code=502)
+        mock_breaker.assert_called_with('draph', 'failure')
+        assert mock_release_slot.call_args[0][2] == 'failure'
+
+    @override_settings(ADAPTIVE_CONCURRENCY={'draph': {'target_latency': 10.0}})
+    @patch('common.circuit_breaker._release_slot')
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_slow_response(self, mock_breaker, mock_acquire_slot, mock_release_slot): #응답이 느리면 성공이어도 한도를 줄이는지 테스트
+        mock_breaker.return_value = True
+        with circuit_breaker.guard('draph') as call:
+            call.latency = 20.0
+        mock_breaker.assert_called_with('draph', 'success')
+        assert mock_release_slot.call_args[0][2] == 'slow'
+
+    @patch('common.circuit_breaker._release_slot')
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_client_error_counts_as_success(self, mock_breaker, mock_acquire_slot, mock_release_slot): #4xx 응답은 외부 API가 응답한 것이므로 성공으로 기록하는지 테스트
+        mock_breaker.return_value = True
+        with pytest.raises(draph.DraphError):
+            with circuit_breaker.guard('draph'):
+                raise draph.DraphError('error', status_code=400)
+        mock_breaker.assert_called_with('draph', 'success')
+        assert mock_release_slot.call_args[0][2] == 'neutral'
+
+    @patch('common.circuit_breaker._release_slot')
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_releases_unsent_probe(self, mock_breaker, mock_acquire_slot, mock_release_slot): #요청을 보내지 못한 경우 시험 호출을 반환하는지 테스트
+        mock_breaker.return_value = True
+        with pytest.raises(rate_limit.RateLimitExceeded):
+            with circuit_breaker.guard('draph'):
+                raise rate_limit.RateLimitExceeded('draph', 90.0)
+        mock_breaker.assert_called_with('draph', 'release')
+
+    @patch('common.circuit_breaker._release_slot')
+    @patch('common.circuit_breaker._acquire_slot')
+    @patch('common.circuit_breaker._breaker')
+    def test_guard_releases_probe_when_slot_rejected(self, mock_breaker, mock_acquire_slot, mock_release_slot): #half_open 시험 호출이 동시 호출 한도에 막혀도 다음 호출이 허용되는지 테스트
+        probe = {'in_flight': False}
+
+        def breaker(upstream, op):
+            # half_open 상태: 시험 호출은 하나만 허용하고, 결과를 기록하거나 반환하면 다시 허용
+            if op == 'allow':
+                if probe['in_flight']:
+                    return False
+                probe['in_flight'] = True
+            else:
+                probe['in_flight'] = False
+            return True
+
+        mock_breaker.side_effect = breaker
+        mock_acquire_slot.side_effect = [circuit_breaker.UpstreamUnavailable('draph', 'concurrency'), None]
+        with pytest.raises(circuit_breaker.UpstreamUnavailable):
+            with circuit_breaker.guard('draph'):
+                pytest.fail('슬롯을 얻지 못하면 호출하면 안 됩니다.')
+        mock_breaker.assert_called_with('draph', 'release')
+        mock_release_slot.assert_not_called()
+
+        with circuit_breaker.guard('draph'):
+            pass
+        mock_breaker.assert_called_with('draph', 'success')
+
+
+@pytest.mark.django_db
+class TestDeadLetters:
+    def _task(self, retries=0):
+        task = MagicMock()
+        task.name = 'background.tasks.generate_background_task'
+        task.request.id = 'task-1'
+        task.request.retries = retries
+        task.request.args = [1, 2]
+        task.request.kwargs = {}
+        task.request.chain = None
+        task.retry.side_effect = Retry()
+        return task
+
+    def test_is_transient(self): #일시적인 오류와 영구적인 오류를 구분하는지 테스트
+        assert retry.is_transient(httpx.ConnectError('connection refused'))
+        assert retry.is_transient(draph.DraphError('error', status_code=503))
+        assert retry.is_transient(ClientError({'Error': {'Code': 'SlowDown'}}, 'PutObject'))
+        assert not retry.is_transient(ClientError({'Error': {'Code': 'AccessDenied'}, 'ResponseMetadata': {'HTTPStatusCode': 403}}, 'PutObject'))
+        assert not retry.is_transient(draph.DraphError('error', status_code=400))
+        assert not retry.is_transient(ValueError('bad image'))
+
+    @patch('common.retry.jobs')
+    def test_transient_error_retries(self, mock_jobs): #일시적인 오류면 재시도하는지 테스트
+        with pytest.raises(Retry):
+            retry.retry_or_dead_letter(self._task(), httpx.ReadTimeout('timeout'))
+        assert not DeadLetter.objects.exists()
+
+    @override_settings(TASK_MAX_RETRIES=3)
+    @patch('common.retry.jobs')
+    def test_exhausted_retries_dead_lettered(self, mock_jobs): #재시도 횟수를 모두 사용하면 DeadLetter에 기록되는지 테스트
+        mock_jobs.get_job.return_value = {'kind': 'background_generate'}
+        dead_letter = retry.retry_or_dead_letter(self._task(retries=3), httpx.ReadTimeout('timeout'))
+        assert dead_letter.transient and dead_letter.args == [1, 2] and dead_letter.job_kind == 'background_generate'
+        mock_jobs.fail_job.assert_called_once()
+
+    @patch('common.retry.current_app.send_task')
+    @patch('common.retry.jobs')
+    def test_replay_command(self, mock_jobs, mock_send_task): #관리 명령으로 DeadLetter를 다시 실행하는지 테스트
+        dead_letter = DeadLetter.objects.create(
+            task_name='image.tasks.upload_image_to_s3', task_id='task-1', job_kind='image_upload',
+            args=['a.png', 'key', 'image/png', 1], error_class='ValueError',
+        )
+        call_command('dead_letters', 'replay', stdout=io.StringIO())
+        dead_letter.refresh_from_db()
+        assert dead_letter.status == DeadLetter.STATUS_REPLAYED
+        mock_send_task.assert_called_once_with(
+            'image.tasks.upload_image_to_s3', args=['a.png', 'key', 'image/png', 1], kwargs={},
+            task_id=dead_letter.replay_task_id,
+        )
+        mock_jobs.create_job.assert_called_once_with(dead_letter.replay_task_id, 'image_upload')
+
+    @patch('common.retry.jobs')
+    def test_chain_stage_dead_lettered_with_job(self, mock_jobs): #파이프라인 단계는 작업 ID와 남은 체인 단계를 함께 기록하는지 테스트
+        mock_jobs.get_job.return_value = {'kind': 'pipeline'}
+        task = self._task()
+        task.request.chain = [{'task': 'image_resizing.tasks.pipeline_resize_task', 'args': ['job-1', 100, 100]}]
+        dead_letter = retry.retry_or_dead_letter(task, ValueError('bad image'), 'job-1')
+        assert dead_letter.job_id == 'job-1' and dead_letter.chain == task.request.chain
+        mock_jobs.get_job.assert_called_once_with('job-1')
+        assert mock_jobs.fail_job.call_args[0][0] == 'job-1'
+
+    @patch('common.retry.current_app.send_task')
+    @patch('common.retry.jobs')
+    def test_replay_chain_stage(self, mock_jobs, mock_send_task): #체인 단계를 다시 실행하면 남은 단계도 함께 발행하고 기존 작업을 이어 가는지 테스트
+        chain = [{'task': 'image_resizing.tasks.pipeline_resize_task', 'args': ['job-1', 100, 100]}]
+        dead_letter = DeadLetter.objects.create(
+            task_name='image_resizing.tasks.pipeline_generate_task', task_id='task-1', job_kind='pipeline',
+            job_id='job-1', chain=chain, args=[1, 'job-1'], error_class='ValueError',
+        )
+        task_id = retry.replay(dead_letter)
+        mock_send_task.assert_called_once_with(
+            'image_resizing.tasks.pipeline_generate_task', args=[1, 'job-1'], kwargs={}, task_id=task_id, chain=chain,
+        )
+        mock_jobs.update_job.assert_called_once_with('job-1', status=mock_jobs.STATUS_QUEUED)
+        mock_jobs.create_job.assert_not_called()
+
+
+class TestEncoding:
+    def test_passthrough_same_format(self): #이미 저장 형식과 같으면 다시 인코딩하지 않고 그대로 사용하는지 테스트
+        data = _png_bytes(mode='RGB')
+        image_bytes, image_info = encoding.encode(io.BytesIO(data), 'PNG')
+        assert image_bytes.read() == data
+        assert image_info == {'width': 4, 'height': 3, 'format': 'PNG', 'mode': 'RGB', 'byte_size': len(data)}
+
+    def test_transcode_to_configured_format(self): #다른 형식이면 설정된 형식으로 다시 인코딩하는지 테스트
+        image_bytes, image_info = encoding.encode(io.BytesIO(_png_bytes()), 'WEBP')
+        assert image_info['format'] == 'WEBP' and image_info['byte_size'] == len(image_bytes.read())
+        image_bytes.seek(0)
+        assert PILImage.open(image_bytes).format == 'WEBP'
+
+    def test_transcode_alpha(self): #알파 채널이 있으면 RGB로 변환해 저장하는지 테스트
+        image_bytes, image_info = encoding.encode(io.BytesIO(_png_bytes()), 'PNG')
+        assert image_info['mode'] == 'RGB'
+        assert PILImage.open(image_bytes).mode == 'RGB'
+
+    @override_settings(GENERATION_MAX_PIXELS=10)
+    def test_rejects_too_many_pixels(self): #픽셀 수가 최대값을 넘으면 디코딩하지 않고 실패하는지 테스트
+        with pytest.raises(encoding.ImageTooLarge):
+            encoding.encode(io.BytesIO(_png_bytes()), 'PNG')
+
+    def test_base64_stream_decoder(self): #4바이트 단위로 나뉘지 않은 조각과 줄바꿈, 생략된 패딩을 처리하는지 테스트
+        data = _png_bytes()
+        payload = base64.b64encode(data).rstrip(b'=')
+        decoder = encoding.Base64StreamDecoder()
+        for position in range(0, len(payload), 5):
+            decoder.feed(payload[position:position + 5] + b'\n')
+        assert decoder.close().read() == data
+
+
+class TestGenerationResults:
+    @override_settings(GENERATION_UPLOAD_WORKERS=2)
+    @patch('common.generation.generation_cache')
+    @patch('common.generation.storage.upload_fileobj')
+    @patch('common.generation.draph.generate')
+    def test_uploads_every_result(self, mock_generate, mock_upload, mock_cache): #결과가 여러 개면 모두 업로드하고 순서대로 반환하는지 테스트
+        mock_generate.return_value = [io.BytesIO(_png_bytes(mode='RGB')) for _ in range(3)]
+        mock_upload.side_effect = lambda file_obj, filename, content_type: f'https://bucket/{filename}'
+
+        results = generation._generate_and_upload(MagicMock(), {}, 'new.png', None, 'key')
+        assert [result['image_url'] for result in results] == [
+            'https://bucket/new.png', 'https://bucket/new_1.png', 'https://bucket/new_2.png'
+        ]
+        mock_cache.put.assert_called_once_with('key', results)
+
+    @patch('common.generation.generate_images')
+    def test_single_result_requests_one(self, mock_generate_images): #결과 하나만 쓰는 경로는 num_results를 1로 요청하는지 테스트
+        mock_generate_images.return_value = [{'image_url': 'https://bucket/new.png', 'image_info': {'width': 1}}]
+        data = {'gen_type': 'simple', 'concept_option': json.dumps({'category': 'others', 'num_results': 4})}
+
+        assert generation.generate_image(MagicMock(), data, 'new.png') == ('https://bucket/new.png', {'width': 1})
+        sent = mock_generate_images.call_args.args[1]
+        assert json.loads(sent['concept_option']) == {'category': 'others', 'num_results': 1}
+        assert json.loads(data['concept_option'])['num_results'] == 4
+
+
+class TestWorkerMemory:
+    def test_default_limit_enabled(self): #기본 설정에서 워커 주소 공간 제한이 켜져 있는지 테스트
+        assert settings.WORKER_MEMORY_LIMIT_MB == settings.CELERY_WORKER_MAX_MEMORY_PER_CHILD * 4 // 1024 > 0
+
+    @override_settings(WORKER_MEMORY_LIMIT_MB=2048)
+    @patch('common.memory.resource')
+    def test_limits_address_space(self, mock_resource): #워커 프로세스 시작 시 주소 공간을 제한하는지 테스트
+        mock_resource.getrlimit.return_value = (-1, -1)
+        memory.limit_worker_memory()
+        mock_resource.setrlimit.assert_called_once_with(mock_resource.RLIMIT_AS, (2048 * 1024 * 1024, -1))
+
+    @override_settings(WORKER_MEMORY_LIMIT_MB=0)
+    @patch('common.memory.resource')
+    def test_zero_disables_limit(self, mock_resource): #0이면 제한하지 않는지 테스트
+        memory.limit_worker_memory()
+        mock_resource.setrlimit.assert_not_called()
+
+
+class TestWorkerMetrics:
+    @patch('common.worker_metrics.start_http_server')
+    def test_no_server_without_multiproc_dir(self, mock_start, monkeypatch): #PROMETHEUS_MULTIPROC_DIR가 없으면 메트릭 서버를 띄우지 않는지 테스트
+        monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+        worker_metrics.start_worker_metrics_server()
+        mock_start.assert_not_called()
+
+    @override_settings(WORKER_METRICS_PORT=9808)
+    @patch('common.worker_metrics.start_http_server')
+    def test_serves_multiprocess_registry(self, mock_start, monkeypatch, tmp_path): #이전 메트릭 파일을 지우고 자식 프로세스 메트릭을 모으는 레지스트리로 서버를 띄우는지 테스트
+        multiproc_dir = tmp_path / 'metrics'
+        multiproc_dir.mkdir()
+        (multiproc_dir / 'gauge_livemax_1.db').write_bytes(b'stale')
+        monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(multiproc_dir))
+
+        worker_metrics.start_worker_metrics_server()
+        assert list(multiproc_dir.iterdir()) == []
+        mock_start.assert_called_once()
+        assert mock_start.call_args.args == (9808,)
+        assert mock_start.call_args.kwargs['registry'] is not None
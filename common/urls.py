@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import job_status, job_events
+
+urlpatterns = [
+    path('jobs/<str:jobId>/', job_status, name='job-status'),  # 작업 상태 조회 엔드포인트
+    path('jobs/<str:jobId>/events/', job_events, name='job-events'),  # 작업 상태 SSE 스트림 엔드포인트
+]
@@ -0,0 +1,71 @@
+import json
+import logging
+from django.http import StreamingHttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+# 연결이 끊긴 뒤 클라이언트가 다시 연결하기까지 기다리는 시간 (밀리초)
+SSE_RETRY_MS = 3000
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_id='작업 상태 조회',
+    operation_description='이미지 업로드, 배경 이미지 생성 등 비동기 작업의 상태를 조회합니다. '
+                          '작업 ID는 각 API가 반환한 task_id(job_id)입니다. '
+                          '상태 변경을 실시간으로 받으려면 /jobs/{jobId}/events/ (Server-Sent Events)를 사용하세요.',
+    tags=['Jobs'],
+    responses={
+        200: openapi.Response('작업 상태', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'job_id': openapi.Schema(type=openapi.TYPE_STRING),
+                'kind': openapi.Schema(type=openapi.TYPE_STRING),
+                'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['queued', 'running', 'succeeded', 'failed']),
+                'stage': openapi.Schema(type=openapi.TYPE_STRING),
+                'result': openapi.Schema(type=openapi.TYPE_OBJECT),
+                'error': openapi.Schema(type=openapi.TYPE_STRING),
+            }
+        )),
+        404: 'Job not found.',
+    }
+)
+@api_view(['GET'])
+def job_status(request, jobId):
+    state = jobs.get_job(jobId)
+    if state is None:
+        return Response({"error": "해당 작업이 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(state, status=status.HTTP_200_OK)
+
+
+def _format_events(job_id):
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    for state in jobs.iter_job_events(job_id):
+        if state is None:
+            # 프록시가 유휴 연결을 끊지 않도록 주석 이벤트 전송
+            yield ": keep-alive\n\n"
+            continue
+        yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+
+
+@require_GET
+def job_events(request, jobId):
+    """
+    작업 상태 변경을 Server-Sent Events로 전달합니다.
+    작업이 끝나면 스트림을 닫고, 최대 유지 시간이 지나면 클라이언트가 자동으로 다시 연결합니다.
+    """
+    if jobs.get_job(jobId) is None:
+        return JsonResponse({"error": "해당 작업이 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(_format_events(jobId), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx가 응답을 버퍼링하지 않고 바로 전달하도록 설정
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,117 @@
+import hmac
+import json
+import time
+import socket
+import hashlib
+import logging
+import ipaddress
+from urllib.parse import urlsplit
+import httpx
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from prometheus_client import Counter
+from common.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# 재시도해도 성공할 수 있는 응답 코드 (그 외 4xx는 바로 실패 처리)
+RETRYABLE_STATUS_CODES = (408, 425, 429)
+
+WEBHOOK_DELIVERIES_TOTAL = Counter('webhook_deliveries_total', '웹훅 전송 시도 수', ['result'])
+
+_validate_url = URLValidator(schemes=['http', 'https'])
+
+
+class WebhookError(Exception):
+    """웹훅 전송에 실패했을 때 발생합니다. retryable이면 일시적인 오류이므로 다시 시도합니다."""
+
+    def __init__(self, message, status_code=None, retryable=True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+def _host_allowed(host):
+    return any(host == allowed or host.endswith(f'.{allowed}') for allowed in settings.WEBHOOK_ALLOWED_HOSTS)
+
+
+def check_destination(url):
+    """
+    콜백 URL의 호스트가 외부로 나가는 주소인지 확인합니다. 내부 서비스(redis, rabbitmq 등),
+    루프백/사설/링크 로컬(메타데이터 서버) 주소로 해석되면 ValidationError가 발생합니다.
+    WEBHOOK_ALLOWED_HOSTS가 설정되어 있으면 목록의 호스트(와 하위 도메인)만 허용합니다.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower().rstrip('.')
+    if not host:
+        raise ValidationError('콜백 URL에 호스트가 없습니다.')
+    if settings.WEBHOOK_ALLOWED_HOSTS:
+        if not _host_allowed(host):
+            raise ValidationError('허용되지 않은 콜백 호스트입니다.')
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValidationError('콜백 호스트를 찾을 수 없습니다.')
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValidationError('내부 주소로는 콜백을 보낼 수 없습니다.')
+
+
+def validate_callback_url(url):
+    """
+    콜백 URL이 올바른 http(s) URL이고 외부 주소를 가리키는지 확인합니다.
+    올바르지 않으면 ValidationError가 발생합니다.
+    """
+    if len(url) > 500:
+        raise ValidationError('콜백 URL이 너무 깁니다.')
+    _validate_url(url)
+    check_destination(url)
+
+
+def sign(body, timestamp):
+    """
+    요청 본문을 HMAC-SHA256으로 서명합니다.
+    수신 측은 "{timestamp}.{body}"를 같은 비밀 키로 서명해 X-Webhook-Signature와 비교하면 됩니다.
+    """
+    message = f"{timestamp}.".encode('utf-8') + body
+    return hmac.new(settings.WEBHOOK_SIGNING_SECRET.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def send(delivery):
+    """
+    웹훅 하나를 전송하고 응답 코드를 반환합니다. 2xx가 아니면 WebhookError가 발생합니다.
+    """
+    # 등록 이후 DNS 응답이 내부 주소로 바뀌었을 수 있으므로 전송할 때마다 다시 확인
+    try:
+        check_destination(delivery.url)
+    except ValidationError as e:
+        WEBHOOK_DELIVERIES_TOTAL.labels(result='rejected').inc()
+        raise WebhookError(f"Blocked callback destination: {e.messages[0]}", retryable=False)
+
+    body = json.dumps({'event': delivery.event, 'job': delivery.payload}).encode('utf-8')
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Id': str(delivery.id),
+        'X-Webhook-Event': delivery.event,
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': f"sha256={sign(body, timestamp)}",
+    }
+    try:
+        response = get_client('webhook').post(delivery.url, content=body, headers=headers)
+    except httpx.HTTPError as e:
+        WEBHOOK_DELIVERIES_TOTAL.labels(result='error').inc()
+        raise WebhookError(str(e))
+
+    if response.is_success:
+        WEBHOOK_DELIVERIES_TOTAL.labels(result='delivered').inc()
+        return response.status_code
+    if response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES:
+        WEBHOOK_DELIVERIES_TOTAL.labels(result='retry').inc()
+        raise WebhookError(f"HTTP {response.status_code}", response.status_code)
+    WEBHOOK_DELIVERIES_TOTAL.labels(result='rejected').inc()
+    raise WebhookError(f"HTTP {response.status_code}", response.status_code, retryable=False)
@@ -0,0 +1,35 @@
+import logging
+import os
+import shutil
+from celery.signals import worker_init, worker_process_shutdown
+from django.conf import settings
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+logger = logging.getLogger(__name__)
+
+# prefork 워커는 작업을 자식 프로세스에서 실행하므로, 자식 프로세스들이 기록한 메트릭 파일을 모아 하나의 엔드포인트로 노출
+# PROMETHEUS_MULTIPROC_DIR 환경 변수는 prometheus_client를 import하기 전에 설정되어 있어야 함 (docker-compose의 celery 서비스에서 설정)
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+
+@worker_init.connect
+def start_worker_metrics_server(**kwargs):
+    # 워커 메인 프로세스에서 한 번만 실행됨
+    multiproc_dir = os.environ.get(MULTIPROC_DIR_ENV)
+    if not multiproc_dir:
+        return
+    # 이전에 실행된 워커가 남긴 메트릭 파일 정리
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(settings.WORKER_METRICS_PORT, registry=registry)
+    logger.info("Serving worker metrics on port %d", settings.WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid=None, **kwargs):
+    # 교체되거나 종료된 자식 프로세스의 live* 게이지 값이 남지 않도록 함
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0005_image_upload_batch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image_url',
+            field=models.URLField(db_index=True, max_length=500),
+        ),
+    ]
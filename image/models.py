@@ -6,7 +6,15 @@ class Image(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
-    image_url = models.URLField(max_length=500)
+    image_url = models.URLField(max_length=500, db_index=True)
+    sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True)  # 업로드 파일 내용의 SHA-256 (중복 제거용)
+    # 업로드 시 헤더에서 읽은 이미지 메타데이터
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True, default='')
+    mode = models.CharField(max_length=10, blank=True, default='')
+    byte_size = models.PositiveBigIntegerField(null=True, blank=True)
+    upload_batch = models.UUIDField(null=True, blank=True, db_index=True)  # 일괄 업로드 요청 식별자
 
     def __str__(self):
         return f"Image {self.id} by User {self.user.nickname}"
\ No newline at end of file
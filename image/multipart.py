@@ -0,0 +1,157 @@
+import json
+import uuid
+import logging
+import redis
+from django.conf import settings
+from common.storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# S3 멀티파트 업로드 파트 번호 범위
+MIN_PART_NUMBER = 1
+MAX_PART_NUMBER = 10000
+# 마지막 파트를 제외한 파트의 S3 최소 크기 (5 MiB)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class MultipartUploadNotFound(Exception):
+    """업로드 토큰에 해당하는 진행 중인 멀티파트 업로드가 없을 때 발생합니다."""
+
+
+class UploadTooLarge(Exception):
+    """업로드된 파트 크기의 합이 IMAGE_MULTIPART_MAX_SIZE를 넘을 때 발생합니다."""
+
+
+class PartTooSmall(Exception):
+    """마지막이 아닌 파트가 S3 최소 파트 크기보다 작을 때 발생합니다. 다시 보내야 하는 파트 번호를 담습니다."""
+
+    def __init__(self, part_numbers):
+        super().__init__(f"마지막 파트를 제외한 파트는 {MIN_PART_SIZE} 바이트 이상이어야 합니다: {part_numbers}")
+        self.part_numbers = part_numbers
+
+
+def _state_key(upload_token):
+    return f'image_multipart_{upload_token}'
+
+
+def _parts_key(upload_token):
+    return f'image_multipart_parts_{upload_token}'
+
+
+def start_upload(image_id, file_name, content_type):
+    """
+    S3 멀티파트 업로드를 시작하고 진행 상태를 Redis에 기록합니다.
+    클라이언트가 이후 요청에서 사용할 업로드 토큰을 반환합니다.
+    """
+    key = f"{uuid.uuid4()}_{file_name}"
+    response = get_s3_client().create_multipart_upload(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        ContentType=content_type,
+    )
+
+    upload_token = uuid.uuid4().hex
+    pipe = redis_client.pipeline()
+    pipe.hset(_state_key(upload_token), mapping={
+        'upload_id': response['UploadId'],
+        'key': key,
+        'image_id': image_id,
+        'content_type': content_type,
+        'part_size': settings.IMAGE_MULTIPART_PART_SIZE,
+    })
+    pipe.expire(_state_key(upload_token), settings.IMAGE_MULTIPART_TTL)
+    pipe.execute()
+
+    logger.info(f"Started multipart upload {upload_token} for Image {image_id}: {key}")
+    return upload_token
+
+
+def get_state(upload_token):
+    """진행 중인 멀티파트 업로드의 상태를 반환합니다."""
+    state = redis_client.hgetall(_state_key(upload_token))
+    if not state:
+        raise MultipartUploadNotFound(upload_token)
+    state = {k.decode('utf-8'): v.decode('utf-8') for k, v in state.items()}
+    state['image_id'] = int(state['image_id'])
+    state['part_size'] = int(state['part_size'])
+    return state
+
+
+def list_parts(upload_token):
+    """업로드가 끝난 파트 목록을 파트 번호 순으로 반환합니다. 재개 시 누락된 파트를 찾는 데 사용합니다."""
+    parts = redis_client.hgetall(_parts_key(upload_token))
+    result = []
+    for part_number, value in parts.items():
+        part = json.loads(value)
+        part['part_number'] = int(part_number)
+        result.append(part)
+    return sorted(result, key=lambda part: part['part_number'])
+
+
+def upload_part(upload_token, part_number, file_obj, size):
+    """
+    파트 하나를 S3로 스트리밍하고 ETag를 Redis에 기록합니다.
+    같은 파트 번호로 다시 올리면 덮어쓰므로 실패한 파트만 재전송할 수 있습니다.
+    이미 올라간 다른 파트와 합친 크기가 IMAGE_MULTIPART_MAX_SIZE를 넘으면 UploadTooLarge가 발생합니다.
+    """
+    state = get_state(upload_token)
+    uploaded = sum(part['size'] for part in list_parts(upload_token) if part['part_number'] != part_number)
+    if uploaded + size > settings.IMAGE_MULTIPART_MAX_SIZE:
+        raise UploadTooLarge(upload_token)
+    response = get_s3_client().upload_part(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=state['key'],
+        UploadId=state['upload_id'],
+        PartNumber=part_number,
+        Body=file_obj,
+        ContentLength=size,
+    )
+
+    part = {'etag': response['ETag'], 'size': size}
+    pipe = redis_client.pipeline()
+    pipe.hset(_parts_key(upload_token), part_number, json.dumps(part))
+    pipe.expire(_parts_key(upload_token), settings.IMAGE_MULTIPART_TTL)
+    pipe.expire(_state_key(upload_token), settings.IMAGE_MULTIPART_TTL)
+    pipe.execute()
+    return part
+
+
+def complete_upload(upload_token):
+    """
+    CompleteMultipartUpload로 업로드를 마무리하고 객체 키를 반환합니다.
+    마지막이 아닌 파트가 MIN_PART_SIZE보다 작으면 PartTooSmall, 전체 크기가 IMAGE_MULTIPART_MAX_SIZE를 넘으면
+    UploadTooLarge가 발생하며, 이때 업로드는 그대로 남아 있어 파트를 다시 보내거나 취소할 수 있습니다.
+    """
+    state = get_state(upload_token)
+    parts = list_parts(upload_token)
+    # 동시에 전송된 파트가 크기 확인을 함께 통과했을 수 있으므로 완료 전에 다시 확인
+    if sum(part['size'] for part in parts) > settings.IMAGE_MULTIPART_MAX_SIZE:
+        raise UploadTooLarge(upload_token)
+    small_parts = [part['part_number'] for part in parts[:-1] if part['size'] < MIN_PART_SIZE]
+    if small_parts:
+        raise PartTooSmall(small_parts)
+    get_s3_client().complete_multipart_upload(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=state['key'],
+        UploadId=state['upload_id'],
+        MultipartUpload={
+            'Parts': [{'ETag': part['etag'], 'PartNumber': part['part_number']} for part in parts]
+        },
+    )
+    redis_client.delete(_state_key(upload_token), _parts_key(upload_token))
+    logger.info(f"Completed multipart upload {upload_token} with {len(parts)} parts: {state['key']}")
+    return state['key']
+
+
+def abort_upload(upload_token):
+    """멀티파트 업로드를 취소하고 S3에 올라간 파트를 정리합니다."""
+    state = get_state(upload_token)
+    get_s3_client().abort_multipart_upload(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=state['key'],
+        UploadId=state['upload_id'],
+    )
+    redis_client.delete(_state_key(upload_token), _parts_key(upload_token))
+    logger.info(f"Aborted multipart upload {upload_token}")
+    return state
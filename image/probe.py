@@ -0,0 +1,107 @@
+import io
+import logging
+import tempfile
+from PIL import Image as PILImage
+
+logger = logging.getLogger(__name__)
+
+# 파일 앞부분의 매직 바이트로 실제 이미지 형식을 판별
+MAGIC_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+# 형식 판별에 필요한 헤더 길이
+SNIFF_LENGTH = 16
+
+# S3 객체 메타데이터 확인 시 읽어올 앞부분 크기 (JPEG의 EXIF 블록을 포함할 만큼)
+S3_PROBE_RANGE = 64 * 1024
+# 헤더가 앞부분보다 길면(큰 EXIF/ICC/XMP 세그먼트) 이 크기로 한 번 더 읽고, 그래도 모자라면 객체 전체를 읽음
+S3_PROBE_RETRY_RANGE = 1024 * 1024
+# 객체 전체를 읽을 때 이 크기를 넘으면 디스크 임시 파일에 씀
+S3_PROBE_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+class InvalidImage(Exception):
+    """이미지 파일이 아니거나 헤더를 해석할 수 없을 때 발생합니다."""
+
+
+def sniff_format(header):
+    """
+    매직 바이트로 이미지 형식을 판별합니다. 알 수 없는 형식이면 None을 반환합니다.
+    """
+    for signature, image_format in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def probe_image(file_obj, byte_size=None):
+    """
+    이미지 헤더만 읽어 메타데이터(width, height, format, mode, byte_size)를 반환합니다.
+    PIL의 Image.open은 픽셀 데이터를 디코딩하지 않으므로 파일 전체를 읽지 않습니다.
+    """
+    position = file_obj.tell()
+    header = file_obj.read(SNIFF_LENGTH)
+    file_obj.seek(position)
+
+    image_format = sniff_format(header)
+    if image_format is None:
+        raise InvalidImage('지원하지 않는 이미지 형식입니다.')
+
+    try:
+        with PILImage.open(file_obj) as pil_image:
+            if pil_image.format != image_format:
+                raise InvalidImage('파일 내용이 이미지 형식과 일치하지 않습니다.')
+            width, height = pil_image.size
+            mode = pil_image.mode
+    except (OSError, SyntaxError, ValueError, PILImage.DecompressionBombError) as e:
+        logger.debug("Failed to parse image header: %s", e)
+        raise InvalidImage('이미지 헤더를 읽을 수 없습니다.')
+    finally:
+        file_obj.seek(position)
+
+    return {
+        'width': width,
+        'height': height,
+        'format': image_format,
+        'mode': mode,
+        'byte_size': byte_size,
+    }
+
+
+def probe_bytes(data, byte_size=None):
+    """바이트(또는 파일 앞부분)로부터 이미지 메타데이터를 읽습니다."""
+    return probe_image(io.BytesIO(data), byte_size if byte_size is not None else len(data))
+
+
+def probe_s3_object(s3, bucket, key):
+    """
+    S3 객체의 앞부분만 Range GET으로 읽어 이미지 메타데이터를 반환합니다.
+    앞부분으로 헤더를 해석하지 못하면 더 큰 범위로, 그래도 안 되면 객체 전체로 다시 확인합니다.
+    헤더를 해석할 수 없으면 InvalidImage가 발생합니다.
+    """
+    for probe_range in (S3_PROBE_RANGE, S3_PROBE_RETRY_RANGE):
+        response = s3.get_object(Bucket=bucket, Key=key, Range=f'bytes=0-{probe_range - 1}')
+        data = response['Body'].read()
+        # Range 응답의 ContentRange("bytes 0-65535/123456")에서 전체 크기를 얻음
+        content_range = response.get('ContentRange')
+        byte_size = int(content_range.rsplit('/', 1)[-1]) if content_range else len(data)
+        try:
+            return probe_bytes(data, byte_size)
+        except InvalidImage:
+            # 형식을 판별할 수 없거나 이미 객체 전체를 읽었으면 더 읽어도 결과가 같음
+            if sniff_format(data[:SNIFF_LENGTH]) is None or len(data) >= byte_size:
+                raise
+        logger.info("Image header of %s is longer than %d bytes, reading more", key, len(data))
+
+    response = s3.get_object(Bucket=bucket, Key=key)
+    with tempfile.SpooledTemporaryFile(max_size=S3_PROBE_SPOOL_SIZE) as f:
+        for chunk in response['Body'].iter_chunks():
+            f.write(chunk)
+        f.seek(0)
+        return probe_image(f, byte_size)
@@ -1,25 +1,39 @@
 from rest_framework import serializers
 from .models import Image
+from .probe import probe_image, InvalidImage
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ImageSerializer(serializers.ModelSerializer):
-    file = serializers.ImageField(write_only=True)
+    # 전체 디코딩 대신 validate_file에서 헤더만 검사
+    file = serializers.FileField(write_only=True)
     user_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = Image
-        fields = ['id', 'user_id', 'created_at', 'updated_at', 'is_deleted', 'image_url', 'file']
-        read_only_fields = ('image_url', 'created_at', 'updated_at', 'is_deleted')
+        fields = ['id', 'user_id', 'created_at', 'updated_at', 'is_deleted', 'image_url', 'file',
+                  'width', 'height', 'format', 'mode', 'byte_size']
+        read_only_fields = ('image_url', 'created_at', 'updated_at', 'is_deleted',
+                            'width', 'height', 'format', 'mode', 'byte_size')
 
     def validate_file(self, value):
         """
         파일의 유효성을 검사합니다.
+        확장자와 매직 바이트를 확인하고 헤더만 읽어 이미지 메타데이터를 value.image_info에 담습니다.
         """
         logger.debug("Uploaded file: %s", value.name)
+        if not value.size:
+            # 빈 파일은 스테이징 저장소(Redis)에 키가 만들어지지 않아 업로드 작업에서 찾을 수 없음
+            raise serializers.ValidationError('빈 파일은 업로드할 수 없습니다.')
         if not value.name.lower().endswith(('png', 'jpg', 'jpeg', 'gif')):
             raise serializers.ValidationError('유효하지 않은 파일 형식입니다. PNG, JPG, JPEG 또는 GIF 파일을 업로드하세요.')
+        try:
+            value.image_info = probe_image(value, value.size)
+        except InvalidImage as e:
+            raise serializers.ValidationError(str(e))
+        if value.image_info['format'] not in ('PNG', 'JPEG', 'GIF'):
+            raise serializers.ValidationError('유효하지 않은 파일 형식입니다. PNG, JPG, JPEG 또는 GIF 파일을 업로드하세요.')
         return value
 
     def create(self, validated_data):
@@ -35,4 +49,23 @@ class ImageSerializer(serializers.ModelSerializer):
 class ImageDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Image
-        fields = ['id', 'image_url']
+        fields = ['id', 'image_url', 'width', 'height', 'format', 'mode', 'byte_size']
+
+# 일괄 업로드 요청 시리얼라이저 (파일은 뷰에서 하나씩 검사)
+class ImageBatchUploadSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+
+# Presigned 직접 업로드 시작 요청 시리얼라이저
+class ImageUploadBeginSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    file_name = serializers.CharField(max_length=200)
+    content_type = serializers.ChoiceField(choices=['image/png', 'image/jpeg', 'image/gif'])
+
+    def validate_file_name(self, value):
+        """
+        파일 이름의 확장자를 검사합니다.
+        """
+        if not value.lower().endswith(('png', 'jpg', 'jpeg', 'gif')):
+            raise serializers.ValidationError('유효하지 않은 파일 형식입니다. PNG, JPG, JPEG 또는 GIF 파일을 업로드하세요.')
+        # S3 키에 경로 구분자가 들어가지 않도록 파일 이름만 사용
+        return value.replace('/', '_').replace('\\', '_')
@@ -0,0 +1,148 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
+# 스트리밍 시 한 번에 읽고 쓰는 크기 (1 MB)
+CHUNK_SIZE = 1024 * 1024
+
+
+class StagedFileNotFound(Exception):
+    """스테이징된 파일이 만료되었거나 존재하지 않을 때 발생합니다."""
+
+
+class RedisBlobReader:
+    """
+    Redis에 저장된 blob을 GETRANGE로 조금씩 읽어오는 파일 유사 객체.
+    boto3 upload_fileobj가 read(size)만 호출하므로 전체를 메모리에 올리지 않는다.
+    """
+
+    def __init__(self, client, key, size):
+        self.client = client
+        self.key = key
+        self.size = size
+        self.position = 0
+
+    def read(self, size=-1):
+        if self.position >= self.size:
+            return b''
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.position + size, self.size) - 1
+        data = self.client.getrange(self.key, self.position, end)
+        self.position += len(data)
+        return data
+
+    def close(self):
+        pass
+
+
+def _redis_key(staging_key):
+    return f'image_staging_{staging_key}'
+
+
+def _local_path(staging_key):
+    return os.path.join(settings.IMAGE_STAGING_DIR, staging_key)
+
+
+def content_digest(uploaded_file):
+    """업로드된 파일 내용의 SHA-256 다이제스트를 청크 단위로 계산합니다. (스테이징 전에 중복 여부 확인용)"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_upload(uploaded_file):
+    """
+    업로드된 파일을 청크 단위로 스테이징 저장소(로컬 스풀 디렉토리 또는 Redis)에 기록하고,
+    Celery 태스크에 넘길 스테이징 키와 스트리밍 중 계산한 SHA-256 다이제스트를 반환합니다.
+    빈 파일은 Redis에 키가 만들어지지 않아 open_staged에서 찾을 수 없으므로 ValueError가 발생합니다. (호출 전에 검사)
+    """
+    if not uploaded_file.size:
+        raise ValueError(f"Cannot stage empty upload {uploaded_file.name}")
+    staging_key = uuid.uuid4().hex
+    digest = hashlib.sha256()
+
+    if settings.IMAGE_STAGING_BACKEND == 'redis':
+        redis_key = _redis_key(staging_key)
+        for chunk in uploaded_file.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+            pipe = redis_client.pipeline()
+            pipe.append(redis_key, chunk)
+            pipe.expire(redis_key, settings.IMAGE_STAGING_TTL)
+            pipe.execute()
+    else:
+        os.makedirs(settings.IMAGE_STAGING_DIR, exist_ok=True)
+        final_path = _local_path(staging_key)
+        temp_path = f"{final_path}.part"
+        with open(temp_path, 'wb') as f:
+            for chunk in uploaded_file.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+        # 쓰기가 끝난 파일만 보이도록 원자적으로 이름 변경
+        os.replace(temp_path, final_path)
+
+    logger.debug("Staged upload %s as %s", uploaded_file.name, staging_key)
+    return staging_key, digest.hexdigest()
+
+
+def open_staged(staging_key):
+    """스테이징된 파일을 스트리밍으로 읽을 수 있는 파일 객체로 엽니다."""
+    if settings.IMAGE_STAGING_BACKEND == 'redis':
+        redis_key = _redis_key(staging_key)
+        size = redis_client.strlen(redis_key)
+        if not size:
+            raise StagedFileNotFound(staging_key)
+        return RedisBlobReader(redis_client, redis_key, size)
+
+    try:
+        return open(_local_path(staging_key), 'rb')
+    except FileNotFoundError:
+        raise StagedFileNotFound(staging_key)
+
+
+def discard_staged(staging_key):
+    """업로드가 끝난 스테이징 파일을 삭제합니다."""
+    if settings.IMAGE_STAGING_BACKEND == 'redis':
+        redis_client.delete(_redis_key(staging_key))
+        return
+
+    try:
+        os.remove(_local_path(staging_key))
+    except FileNotFoundError:
+        pass
+
+
+def sweep_expired():
+    """
+    로컬 스풀 디렉토리에서 IMAGE_STAGING_TTL보다 오래된 스테이징 파일을 삭제하고 삭제한 파일 수를 반환합니다.
+    업로드 작업이 전달되지 않았거나 끝내 실패해 남은 파일을 정리합니다. (Redis 백엔드는 키 만료로 정리됨)
+    """
+    if settings.IMAGE_STAGING_BACKEND == 'redis':
+        return 0
+
+    cutoff = time.time() - settings.IMAGE_STAGING_TTL
+    removed = 0
+    try:
+        entries = os.scandir(settings.IMAGE_STAGING_DIR)
+    except FileNotFoundError:
+        return 0
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # 그 사이 업로드 작업이 삭제한 파일
+                continue
+    if removed:
+        logger.info("Removed %d expired staged uploads", removed)
+    return removed
@@ -1,36 +1,64 @@
 from celery import shared_task
-import boto3
+import os
 import uuid
-import base64
-from django.conf import settings
 import logging
-from io import BytesIO
+from common import storage, jobs
+from common.retry import retry_or_dead_letter
 from .models import Image
+from .staging import open_staged, discard_staged, sweep_expired, StagedFileNotFound
 import redis
 
 logger = logging.getLogger(__name__)
 redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
 
-@shared_task
-def upload_image_to_s3(file_name, file_content, content_type, image_id):
+
+def build_content_key(digest, file_name):
+    """파일 내용의 SHA-256 다이제스트로 S3 객체 키를 만듭니다. 같은 내용은 항상 같은 키가 됩니다."""
+    extension = os.path.splitext(file_name)[1].lower()
+    return f"{digest}{extension}"
+
+
+def _upload_staged(task, file_name, staging_key, content_type, image_id, key):
+    """스테이징된 파일을 S3에 업로드합니다. 실패를 처리했으면(작업 실패/DeadLetter) False를 반환합니다."""
+    # 스테이징 저장소에서 파일을 스트리밍으로 읽어옴
+    try:
+        file_obj = open_staged(staging_key)
+    except StagedFileNotFound:
+        logger.error(f"Staged file {staging_key} for Image {image_id} has expired or does not exist")
+        jobs.fail_job(task.request.id, "업로드된 파일이 만료되었습니다.")
+        return False
+
+    # S3에 파일 업로드 (큰 파일은 설정된 파트 크기로 나누어 병렬로 멀티파트 업로드)
+    # 일시적인 S3 오류면 재시도하고(스테이징 파일은 업로드가 끝날 때까지 남겨 둠), 그 외에는 DeadLetter에 기록
+    try:
+        storage.upload_fileobj(file_obj, key, content_type)
+    except Exception as e:
+        logger.error(f"Failed to upload {file_name} to S3: {e}")
+        retry_or_dead_letter(task, e)
+        return False
+    finally:
+        file_obj.close()
+    return True
+
+
+@shared_task(bind=True)
+def upload_image_to_s3(self, file_name, staging_key, content_type, image_id, object_key=None):
     logger.info(f"Started uploading {file_name} to S3")
-    s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-    unique_filename = f"{uuid.uuid4()}_{file_name}"
-    file_content = base64.b64decode(file_content)  # base64로 인코딩된 파일 내용을 디코딩
-    file_obj = BytesIO(file_content)  # 파일 내용을 BytesIO 객체로 변환
-
-    # S3에 파일 업로드
-    s3.upload_fileobj(
-        file_obj,
-        settings.AWS_STORAGE_BUCKET_NAME,
-        unique_filename,
-        ExtraArgs={
-            "ContentType": content_type
-        }
-    )
+    jobs.update_job(self.request.id, stage='uploading')
+    # 내용 기반 키가 주어지면 사용하고, 없으면 기존처럼 고유한 파일명을 생성
+    unique_filename = object_key or f"{uuid.uuid4()}_{file_name}"
+
+    skipped = bool(object_key) and storage.object_exists(object_key)
+    if skipped:
+        # 같은 내용의 객체가 이미 있으면 PUT을 생략하고, 삭제 큐에 들어 있으면 빼냄
+        # (이 Image 행이 image_url 없이 같은 sha256으로 대기 중이므로 이후의 삭제 큐 처리도 객체를 지우지 않음)
+        storage.cancel_delete(object_key)
+        logger.info(f"Object {object_key} already exists, skipping upload of {file_name}")
+    elif not _upload_staged(self, file_name, staging_key, content_type, image_id, unique_filename):
+        return None
 
     # 업로드된 파일의 URL 생성
-    file_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{unique_filename}"
+    file_url = storage.build_url(unique_filename)
     logger.info(f"Finished uploading {file_name} to S3, URL: {file_url}")
 
     # 데이터베이스 업데이트
@@ -43,5 +71,23 @@ def upload_image_to_s3(file_name, file_content, content_type, image_id):
         redis_client.delete(f'image_data_{image_id}')
     except Image.DoesNotExist:
         logger.error(f"Image with id {image_id} does not exist")
+        discard_staged(staging_key)
+        jobs.fail_job(self.request.id, "해당 이미지가 없습니다.")
+        return file_url
+
+    # 존재 확인 직전에 가져간 삭제 큐 배치가 그 사이 객체를 지웠으면 스테이징 파일로 다시 업로드
+    if skipped and not storage.object_exists(object_key):
+        logger.warning(f"Object {object_key} was deleted while reusing it, uploading {file_name} again")
+        if not _upload_staged(self, file_name, staging_key, content_type, image_id, unique_filename):
+            return None
+    discard_staged(staging_key)
+
+    jobs.succeed_job(self.request.id, {"image_id": image_id, "image_url": file_url})
 
-    return file_url
\ No newline at end of file
+    return file_url
+
+
+@shared_task
+def sweep_staged_uploads():
+    """로컬 스풀 디렉토리에 남은 만료된 스테이징 파일을 삭제하는 주기 작업."""
+    return sweep_expired()
@@ -0,0 +1,450 @@
+import io
+import os
+import json
+import time
+import struct
+import hashlib
+import pytest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status, serializers
+from rest_framework.test import APIClient
+from PIL import Image as PILImage
+from user.models import User
+from image.models import Image
+from image import multipart, staging, probe
+from image.serializers import ImageSerializer
+
+
+def _png_bytes(size=(4, 3)):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class _Body:
+    # boto3 StreamingBody 대신 사용하는 응답 본문
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def iter_chunks(self):
+        yield self.data
+
+
+def _s3_with_object(data):
+    """get_object(Range 포함)에 data를 돌려주는 S3 클라이언트 목"""
+    s3 = MagicMock()
+
+    def get_object(Bucket, Key, Range=None):
+        if Range is None:
+            return {'Body': _Body(data)}
+        end = int(Range.rsplit('-', 1)[-1])
+        chunk = data[:end + 1]
+        return {'Body': _Body(chunk), 'ContentRange': f'bytes 0-{len(chunk) - 1}/{len(data)}'}
+
+    s3.get_object.side_effect = get_object
+    return s3
+
+
+@pytest.mark.django_db
+class TestPresignedUpload:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create(nickname='testuser')
+
+    @patch('image.views.redis_client')
+    @patch('image.views.storage.get_s3_client')
+    def test_begin_and_complete(self, mock_get_s3_client, mock_redis): #Presigned POST를 발급하고 업로드된 객체의 메타데이터를 저장하는지 테스트
+        s3 = _s3_with_object(_png_bytes())
+        s3.generate_presigned_post.return_value = {'url': 'https://bucket', 'fields': {}}
+        mock_get_s3_client.return_value = s3
+
+        response = self.client.post(reverse('image-upload-begin'), {
+            'user_id': self.user.id, 'file_name': 'a.png', 'content_type': 'image/png'
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        image_id = response.data['image_id']
+        key = mock_redis.set.call_args.args[1]
+
+        mock_redis.get.return_value = key.encode('utf-8')
+        response = self.client.post(reverse('image-upload-complete', kwargs={'imageId': image_id}))
+        assert response.status_code == status.HTTP_200_OK
+        image = Image.objects.get(id=image_id)
+        assert image.image_url.endswith(key)
+        assert (image.width, image.height, image.format) == (4, 3, 'PNG')
+        mock_redis.delete.assert_called_once_with(f'image_upload_key_{image_id}')
+
+    @patch('image.views.redis_client')
+    def test_complete_unknown_upload(self, mock_redis): #업로드 키가 만료되었거나 이미지가 없으면 404를 반환하는지 테스트
+        image = Image.objects.create(user=self.user, image_url='')
+        mock_redis.get.return_value = None
+        response = self.client.post(reverse('image-upload-complete', kwargs={'imageId': image.id}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = self.client.post(reverse('image-upload-complete', kwargs={'imageId': image.id + 1000}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @patch('image.views.redis_client')
+    @patch('image.views.storage.get_s3_client')
+    def test_complete_not_uploaded_yet(self, mock_get_s3_client, mock_redis): #객체가 아직 없으면 400을 반환하고 업로드 키를 유지하는지 테스트
+        image = Image.objects.create(user=self.user, image_url='')
+        mock_redis.get.return_value = b'key.png'
+        mock_get_s3_client.return_value.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+        response = self.client.post(reverse('image-upload-complete', kwargs={'imageId': image.id}))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_redis.delete.assert_not_called()
+
+    @patch('image.views.storage.enqueue_delete')
+    @patch('image.views.redis_client')
+    @patch('image.views.storage.get_s3_client')
+    def test_complete_rejects_non_image(self, mock_get_s3_client, mock_redis, mock_enqueue_delete): #이미지가 아닌 객체는 400을 반환하고 객체, 이미지 인스턴스, 업로드 키를 정리하는지 테스트
+        image = Image.objects.create(user=self.user, image_url='')
+        mock_redis.get.return_value = b'key.png'
+        mock_get_s3_client.return_value = _s3_with_object(b'not an image')
+
+        response = self.client.post(reverse('image-upload-complete', kwargs={'imageId': image.id}))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_enqueue_delete.assert_called_once_with('key.png')
+        assert not Image.objects.filter(id=image.id).exists()
+        mock_redis.delete.assert_called_once_with(f'image_upload_key_{image.id}')
+
+
+@pytest.mark.django_db
+class TestMultipartUpload:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create(nickname='testuser')
+        self.image = Image.objects.create(user=self.user, image_url='')
+        self.state = {
+            'upload_id': 'upload-1', 'key': 'key.png', 'image_id': self.image.id,
+            'content_type': 'image/png', 'part_size': 8 * 1024 * 1024,
+        }
+
+    def _part_url(self, part_number):
+        return reverse('image-multipart-part', kwargs={'uploadToken': 'token', 'partNumber': part_number})
+
+    @patch('image.multipart.redis_client')
+    @patch('image.multipart.get_s3_client')
+    def test_upload_part(self, mock_get_s3_client, mock_redis): #파트를 S3로 보내고 ETag와 크기를 기록하는지 테스트
+        mock_redis.hgetall.side_effect = [{k.encode(): str(v).encode() for k, v in self.state.items()}, {}]
+        mock_get_s3_client.return_value.upload_part.return_value = {'ETag': '"etag-1"'}
+
+        response = self.client.put(self._part_url(1), {'file': io.BytesIO(b'x' * 10)}, format='multipart')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'part_number': 1, 'etag': '"etag-1"', 'size': 10}
+        assert mock_get_s3_client.return_value.upload_part.call_args.kwargs['PartNumber'] == 1
+        mock_redis.pipeline.return_value.hset.assert_called_once_with(
+            'image_multipart_parts_token', 1, json.dumps({'etag': '"etag-1"', 'size': 10})
+        )
+
+    @override_settings(IMAGE_MULTIPART_MAX_SIZE=15)
+    @patch('image.multipart.redis_client')
+    @patch('image.multipart.get_s3_client')
+    def test_upload_part_total_size_limit(self, mock_get_s3_client, mock_redis): #이미 올라간 파트와 합쳐 최대 크기를 넘으면 400을 반환하는지 테스트
+        mock_redis.hgetall.side_effect = [
+            {k.encode(): str(v).encode() for k, v in self.state.items()},
+            {b'1': json.dumps({'etag': 'e1', 'size': 10}).encode()},
+        ]
+        response = self.client.put(self._part_url(2), {'file': io.BytesIO(b'x' * 10)}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_get_s3_client.return_value.upload_part.assert_not_called()
+
+    def test_upload_part_invalid_number(self): #파트 번호가 범위를 벗어나면 400을 반환하는지 테스트
+        response = self.client.put(self._part_url(0), {'file': io.BytesIO(b'x')}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('image.multipart.list_parts')
+    @patch('image.multipart.get_state')
+    @patch('image.multipart.get_s3_client')
+    def test_complete_rejects_small_parts(self, mock_get_s3_client, mock_get_state, mock_list_parts): #마지막이 아닌 파트가 5 MiB보다 작으면 다시 보낼 파트 번호와 함께 400을 반환하는지 테스트
+        mock_get_state.return_value = self.state
+        mock_list_parts.return_value = [
+            {'part_number': 1, 'etag': 'e1', 'size': multipart.MIN_PART_SIZE},
+            {'part_number': 2, 'etag': 'e2', 'size': 100},
+            {'part_number': 3, 'etag': 'e3', 'size': 100},
+        ]
+        response = self.client.post(reverse('image-multipart-complete', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['part_numbers'] == [2]
+        mock_get_s3_client.return_value.complete_multipart_upload.assert_not_called()
+
+    @override_settings(IMAGE_MULTIPART_MAX_SIZE=100)
+    @patch('image.multipart.list_parts')
+    @patch('image.multipart.get_state')
+    @patch('image.multipart.get_s3_client')
+    def test_complete_rejects_too_large(self, mock_get_s3_client, mock_get_state, mock_list_parts): #동시에 보낸 파트로 전체 크기가 최대값을 넘으면 완료하지 않는지 테스트
+        mock_get_state.return_value = self.state
+        mock_list_parts.return_value = [{'part_number': 1, 'etag': 'e1', 'size': 101}]
+        response = self.client.post(reverse('image-multipart-complete', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_get_s3_client.return_value.complete_multipart_upload.assert_not_called()
+
+    @patch('image.views.storage.get_s3_client')
+    @patch('image.multipart.redis_client')
+    @patch('image.multipart.list_parts')
+    @patch('image.multipart.get_state')
+    @patch('image.multipart.get_s3_client')
+    def test_complete(self, mock_get_s3_client, mock_get_state, mock_list_parts, mock_redis, mock_views_s3): #파트를 합쳐 완료하고 이미지 메타데이터를 저장하는지 테스트
+        mock_get_state.return_value = self.state
+        mock_list_parts.return_value = [{'part_number': 1, 'etag': 'e1', 'size': 100}]
+        mock_views_s3.return_value = _s3_with_object(_png_bytes())
+
+        response = self.client.post(reverse('image-multipart-complete', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_200_OK
+        parts = mock_get_s3_client.return_value.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+        assert parts == [{'ETag': 'e1', 'PartNumber': 1}]
+        mock_redis.delete.assert_called_once_with('image_multipart_token', 'image_multipart_parts_token')
+        self.image.refresh_from_db()
+        assert self.image.image_url.endswith('key.png')
+        assert (self.image.width, self.image.height) == (4, 3)
+
+    @patch('image.views.storage.enqueue_delete')
+    @patch('image.views.storage.get_s3_client')
+    @patch('image.multipart.redis_client')
+    @patch('image.multipart.list_parts')
+    @patch('image.multipart.get_state')
+    @patch('image.multipart.get_s3_client')
+    def test_complete_rejects_non_image(self, mock_get_s3_client, mock_get_state, mock_list_parts, mock_redis,
+                                        mock_views_s3, mock_enqueue_delete): #완료한 객체가 이미지가 아니면 400을 반환하고 객체와 이미지 인스턴스를 정리하는지 테스트
+        mock_get_state.return_value = self.state
+        mock_list_parts.return_value = [{'part_number': 1, 'etag': 'e1', 'size': 100}]
+        mock_views_s3.return_value = _s3_with_object(b'not an image')
+
+        response = self.client.post(reverse('image-multipart-complete', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_enqueue_delete.assert_called_once_with('key.png')
+        assert not Image.objects.filter(id=self.image.id).exists()
+
+    @patch('image.multipart.redis_client')
+    @patch('image.multipart.get_state')
+    @patch('image.multipart.get_s3_client')
+    def test_abort(self, mock_get_s3_client, mock_get_state, mock_redis): #업로드를 취소하면 S3 파트와 진행 상태, 이미지 인스턴스를 정리하는지 테스트
+        mock_get_state.return_value = self.state
+        response = self.client.delete(reverse('image-multipart-manage', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_200_OK
+        mock_get_s3_client.return_value.abort_multipart_upload.assert_called_once_with(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key='key.png', UploadId='upload-1'
+        )
+        mock_redis.delete.assert_called_once_with('image_multipart_token', 'image_multipart_parts_token')
+        assert not Image.objects.filter(id=self.image.id).exists()
+
+    @patch('image.multipart.redis_client')
+    def test_unknown_upload(self, mock_redis): #진행 중인 업로드가 없으면 404를 반환하는지 테스트
+        mock_redis.hgetall.return_value = {}
+        response = self.client.get(reverse('image-multipart-manage', kwargs={'uploadToken': 'token'}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestBatchUpload:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create(nickname='testuser')
+
+    def _files(self):
+        return [
+            SimpleUploadedFile('a.png', _png_bytes(), content_type='image/png'),
+            SimpleUploadedFile('b.txt', b'not an image', content_type='text/plain'),
+            SimpleUploadedFile('c.png', _png_bytes((5, 5)), content_type='image/png'),
+        ]
+
+    @patch('image.views.group')
+    @patch('image.views.jobs')
+    @patch('image.views.stage_upload')
+    def test_mixed_batch(self, mock_stage_upload, mock_jobs, mock_group): #잘못된 파일은 결과에 오류로 남기고 나머지만 업로드 작업으로 발행하는지 테스트
+        mock_stage_upload.side_effect = [('staged-a', 'a' * 64), ('staged-c', 'c' * 64)]
+        mock_group.return_value.apply_async.return_value.id = 'group-1'
+
+        response = self.client.post(reverse('upload-images-batch'), {'user_id': self.user.id, 'files': self._files()},
+                                     format='multipart')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        results = response.data['results']
+        assert [result['file_name'] for result in results] == ['a.png', 'b.txt', 'c.png']
+        assert 'error' in results[1] and 'image_id' not in results[1]
+        assert Image.objects.get(id=results[0]['image_id']).width == 4
+        assert Image.objects.get(id=results[2]['image_id']).width == 5
+        assert len(mock_group.call_args.args[0]) == 2
+
+    @patch('image.views.group')
+    @patch('image.views.jobs')
+    @patch('image.views.stage_upload')
+    def test_requeries_rows_without_pk(self, mock_stage_upload, mock_jobs, mock_group): #bulk_create가 PK를 돌려주지 않으면(MySQL) 배치 식별자로 다시 조회하는지 테스트
+        mock_stage_upload.side_effect = [('staged-a', 'a' * 64), ('staged-c', 'c' * 64)]
+        mock_group.return_value.apply_async.return_value.id = 'group-1'
+        bulk_create = Image.objects.bulk_create
+
+        def bulk_create_without_pk(instances):
+            created = bulk_create(instances)
+            for instance in created:
+                instance.pk = None
+            return created
+
+        with patch.object(Image.objects, 'bulk_create', side_effect=bulk_create_without_pk):
+            response = self.client.post(reverse('upload-images-batch'),
+                                        {'user_id': self.user.id, 'files': self._files()}, format='multipart')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        results = response.data['results']
+        assert results[0]['image_id'] is not None and results[2]['image_id'] is not None
+        assert Image.objects.get(id=results[0]['image_id']).sha256 == 'a' * 64
+        assert Image.objects.get(id=results[2]['image_id']).sha256 == 'c' * 64
+
+    def test_invalid_user_id(self): #user_id가 정수가 아니면 400을 반환하는지 테스트
+        response = self.client.post(reverse('upload-images-batch'), {'user_id': 'abc', 'files': self._files()},
+                                    format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'user_id' in response.data['error']
+
+
+class _FakeRedis:
+    # 스테이징에 사용하는 Redis 명령만 흉내 내는 클라이언트
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return self
+
+    def append(self, key, value):
+        self.data[key] = self.data.get(key, b'') + value
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        return []
+
+    def strlen(self, key):
+        return len(self.data.get(key, b''))
+
+    def getrange(self, key, start, end):
+        return self.data.get(key, b'')[start:end + 1]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestStaging:
+    @pytest.mark.parametrize('backend', ['local', 'redis'])
+    def test_round_trip(self, backend, tmp_path): #스테이징한 파일을 읽고 삭제하면 다시 열 수 없는지 테스트
+        data = _png_bytes() * 100
+        with override_settings(IMAGE_STAGING_BACKEND=backend, IMAGE_STAGING_DIR=str(tmp_path)), \
+                patch('image.staging.redis_client', _FakeRedis()), patch('image.staging.CHUNK_SIZE', 256):
+            staging_key, digest = staging.stage_upload(SimpleUploadedFile('a.png', data))
+            assert digest == hashlib.sha256(data).hexdigest()
+
+            file_obj = staging.open_staged(staging_key)
+            try:
+                assert file_obj.read() == data
+            finally:
+                file_obj.close()
+
+            staging.discard_staged(staging_key)
+            with pytest.raises(staging.StagedFileNotFound):
+                staging.open_staged(staging_key)
+
+    def test_rejects_empty_file(self): #빈 파일은 스테이징하지 않고 유효성 검사에서 거절하는지 테스트
+        with pytest.raises(ValueError):
+            staging.stage_upload(SimpleUploadedFile('a.png', b''))
+        with pytest.raises(serializers.ValidationError):
+            ImageSerializer().validate_file(SimpleUploadedFile('a.png', b''))
+
+    @override_settings(IMAGE_STAGING_BACKEND='local', IMAGE_STAGING_TTL=60)
+    def test_sweep_expired(self, tmp_path): #로컬 스풀 디렉토리에서 만료된 파일만 삭제하는지 테스트
+        expired, fresh = tmp_path / 'expired', tmp_path / 'fresh.part'
+        expired.write_bytes(b'x')
+        fresh.write_bytes(b'x')
+        old = time.time() - 120
+        os.utime(expired, (old, old))
+
+        with override_settings(IMAGE_STAGING_DIR=str(tmp_path)):
+            assert staging.sweep_expired() == 1
+        assert not expired.exists() and fresh.exists()
+
+
+@pytest.mark.django_db
+class TestDeduplication:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create(nickname='testuser')
+
+    @patch('image.views.upload_image_to_s3')
+    @patch('image.views.jobs')
+    @patch('image.views.stage_upload')
+    def test_reuses_existing_object(self, mock_stage_upload, mock_jobs, mock_upload_task): #같은 내용의 이미지를 다시 올리면 스테이징과 업로드 없이 기존 URL을 사용하는지 테스트
+        data = _png_bytes()
+        existing = Image.objects.create(user=self.user, image_url='https://bucket/existing.png',
+                                        sha256=hashlib.sha256(data).hexdigest())
+
+        response = self.client.post(reverse('upload-image'), {
+            'user_id': self.user.id, 'file': SimpleUploadedFile('a.png', data, content_type='image/png')
+        }, format='multipart')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['image_url'] == existing.image_url
+        assert Image.objects.get(id=response.data['image_id']).sha256 == existing.sha256
+        mock_stage_upload.assert_not_called()
+        mock_upload_task.apply_async.assert_not_called()
+
+    @patch('image.views.upload_image_to_s3')
+    @patch('image.views.jobs')
+    @patch('image.views.stage_upload')
+    def test_new_content_is_staged(self, mock_stage_upload, mock_jobs, mock_upload_task): #처음 올리는 내용은 스테이징하고 내용 기반 키로 업로드 작업을 발행하는지 테스트
+        mock_stage_upload.return_value = ('staged', 'b' * 64)
+        response = self.client.post(reverse('upload-image'), {
+            'user_id': self.user.id, 'file': SimpleUploadedFile('a.png', _png_bytes(), content_type='image/png')
+        }, format='multipart')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert mock_upload_task.apply_async.call_args.kwargs['args'][1:] == (
+            'staged', 'image/png', response.data['image_id'], f"{'b' * 64}.png"
+        )
+
+    @patch('image.views.storage.enqueue_delete')
+    def test_delete_keeps_shared_object(self, mock_enqueue_delete): #같은 객체를 공유하는 이미지가 남아 있으면 S3 삭제를 큐에 넣지 않는지 테스트
+        first = Image.objects.create(user=self.user, image_url='https://bucket/shared.png', sha256='a' * 64)
+        second = Image.objects.create(user=self.user, image_url='https://bucket/shared.png', sha256='a' * 64)
+
+        response = self.client.delete(reverse('image-detail', kwargs={'imageId': first.id}))
+        assert response.status_code == status.HTTP_200_OK
+        mock_enqueue_delete.assert_not_called()
+
+        response = self.client.delete(reverse('image-detail', kwargs={'imageId': second.id}))
+        assert response.status_code == status.HTTP_200_OK
+        mock_enqueue_delete.assert_called_once()
+
+
+class TestProbe:
+    def _jpeg_with_large_header(self):
+        # 64 KiB를 넘는 APP2(ICC) 세그먼트 뒤에 프레임 헤더가 오는 JPEG
+        buffer = io.BytesIO()
+        PILImage.new('RGB', (30, 20)).save(buffer, format='JPEG')
+        data = buffer.getvalue()
+        segment = b'\xff\xe2' + struct.pack('>H', 65535) + b'\0' * 65533
+        return data[:2] + segment * 2 + data[2:]
+
+    def test_reprobes_with_larger_range(self): #첫 범위로 헤더를 읽지 못하면 더 큰 범위를 다시 요청하는지 테스트
+        data = self._jpeg_with_large_header()
+        s3 = _s3_with_object(data)
+
+        info = probe.probe_s3_object(s3, 'bucket', 'key.jpg')
+        assert (info['width'], info['height'], info['byte_size']) == (30, 20, len(data))
+        ranges = [call.kwargs.get('Range') for call in s3.get_object.call_args_list]
+        assert ranges == [f'bytes=0-{probe.S3_PROBE_RANGE - 1}', f'bytes=0-{probe.S3_PROBE_RETRY_RANGE - 1}']
+
+    @patch('image.probe.S3_PROBE_RETRY_RANGE', 100 * 1024)
+    def test_falls_back_to_full_object(self): #더 큰 범위로도 부족하면 객체 전체를 읽는지 테스트
+        s3 = _s3_with_object(self._jpeg_with_large_header())
+        assert probe.probe_s3_object(s3, 'bucket', 'key.jpg')['width'] == 30
+        assert s3.get_object.call_count == 3
+        assert 'Range' not in s3.get_object.call_args.kwargs
+
+    def test_non_image_is_not_reprobed(self): #형식을 판별할 수 없으면 다시 읽지 않고 거절하는지 테스트
+        s3 = _s3_with_object(b'not an image' * 10000)
+        with pytest.raises(probe.InvalidImage):
+            probe.probe_s3_object(s3, 'bucket', 'key.jpg')
+        assert s3.get_object.call_count == 1
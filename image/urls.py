@@ -1,7 +1,17 @@
 from django.urls import path
-from .views import upload_image, image_manage
+from .views import (
+    upload_image, upload_images_batch, image_manage, begin_image_upload, complete_image_upload,
+    begin_multipart_upload, upload_multipart_part, complete_multipart_upload, multipart_upload_manage,
+)
 
 urlpatterns = [
     path('images/', upload_image, name='upload-image'),  # 이미지 업로드 엔드포인트
+    path('images/batch/', upload_images_batch, name='upload-images-batch'),  # 이미지 일괄 업로드 엔드포인트
     path('images/<int:imageId>/', image_manage, name='image-detail'),  # 이미지 조회 및 삭제 엔드포인트
+    path('images/uploads/', begin_image_upload, name='image-upload-begin'),  # Presigned 직접 업로드 시작 엔드포인트
+    path('images/uploads/<int:imageId>/complete/', complete_image_upload, name='image-upload-complete'),  # Presigned 직접 업로드 완료 엔드포인트
+    path('images/multipart/', begin_multipart_upload, name='image-multipart-begin'),  # 멀티파트 업로드 시작 엔드포인트
+    path('images/multipart/<str:uploadToken>/', multipart_upload_manage, name='image-multipart-manage'),  # 멀티파트 업로드 상태 조회 및 취소 엔드포인트
+    path('images/multipart/<str:uploadToken>/parts/<int:partNumber>/', upload_multipart_part, name='image-multipart-part'),  # 멀티파트 업로드 파트 전송 엔드포인트
+    path('images/multipart/<str:uploadToken>/complete/', complete_multipart_upload, name='image-multipart-complete'),  # 멀티파트 업로드 완료 엔드포인트
 ]
\ No newline at end of file
@@ -4,26 +4,40 @@ from rest_framework import status, serializers
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-import boto3
+from drf_yasg import openapi
+from botocore.exceptions import ClientError
 from django.conf import settings
 import logging
-import base64
+import uuid
+import redis
+from celery import group
+from user.models import User
 from .models import Image
-from .serializers import ImageSerializer, ImageDetailSerializer
-from .tasks import upload_image_to_s3
+from .serializers import ImageSerializer, ImageDetailSerializer, ImageUploadBeginSerializer, ImageBatchUploadSerializer
+from common import storage, jobs
+from django.core.exceptions import ValidationError
+from common.webhooks import validate_callback_url
+from .tasks import upload_image_to_s3, build_content_key
+from .staging import stage_upload, discard_staged, content_digest
+from .probe import probe_s3_object, InvalidImage
+from . import multipart
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
+# Redis 클라이언트 설정
+redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
+
 # Swagger를 사용하여 이미지 업로드 API 문서화
 @swagger_auto_schema(
     method='post',
     operation_id='이미지 업로드',
-    operation_description='이미지를 업로드합니다.',
+    operation_description='이미지를 업로드합니다. callback_url 폼 필드를 보내면 업로드가 끝났을 때 해당 URL로 웹훅을 전송합니다.',
     tags=['Images'],
     request_body=ImageSerializer,
     responses={
         201: "Image successfully uploaded.",
+        202: "Image is being uploaded. Track progress with /jobs/{job_id}/.",
         400: "Bad request. Make sure to provide a valid image.",
     }
 )
@@ -45,26 +59,489 @@ def upload_image(request, *args, **kwargs):
         }
         return Response(error_message, status=status.HTTP_400_BAD_REQUEST)
 
-    # 파일과 사용자 ID 추출
-    file = request.FILES['file']
+    # 작업 완료 시 알림을 받을 콜백 URL (선택)
+    callback_url = request.data.get('callback_url')
+    if callback_url:
+        try:
+            validate_callback_url(callback_url)
+        except ValidationError:
+            return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 파일과 사용자 ID 추출 (유효성 검사에서 읽은 헤더 메타데이터 포함)
+    file = serializer.validated_data['file']
+    image_info = file.image_info
     user_id = request.data.get('user_id')
     content_type = file.content_type  # 파일의 content_type을 가져옴
-    file_content = base64.b64encode(file.read()).decode('utf-8')  # 파일 내용을 base64로 인코딩하여 전달
+    digest = content_digest(file)
+
+    # 같은 내용의 이미지가 이미 업로드되어 있으면 스테이징, S3 업로드, Celery 태스크를 생략하고 기존 객체를 재사용
+    existing_image = Image.objects.filter(sha256=digest).exclude(image_url='').first()
+    if existing_image is not None:
+        image_instance = Image.objects.create(user_id=user_id, image_url=existing_image.image_url, sha256=digest, **image_info)
+        logger.info(f"Reused existing object for {file.name} (sha256={digest}): {existing_image.image_url}")
+        response_data = {
+            "success": "동일한 이미지가 이미 업로드되어 있어 기존 파일을 사용합니다.",
+            "image_id": image_instance.id,
+            "image_url": image_instance.image_url
+        }
+        if callback_url:
+            # 태스크 없이 바로 끝났지만 콜백 URL을 받았으므로 완료 웹훅을 전송
+            response_data["job_id"] = jobs.create_succeeded_job(
+                'image_upload', {"image_id": image_instance.id, "image_url": image_instance.image_url}, callback_url
+            )
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+    # 파일 내용은 브로커로 보내지 않고 스테이징 저장소에 기록한 뒤 키만 전달
+    staging_key, digest = stage_upload(file)
 
     # 이미지 인스턴스 생성
-    image_instance = Image.objects.create(user_id=user_id, image_url='')
+    image_instance = Image.objects.create(user_id=user_id, image_url='', sha256=digest, **image_info)
 
     # 비동기로 S3 업로드
     logger.info(f"Calling Celery task for uploading file: {file.name}")
-    # Celery 태스크 호출
-    result = upload_image_to_s3.delay(file.name, file_content, content_type, image_instance.id)
+    # Celery 태스크 호출 (내용 기반 키로 업로드)
+    object_key = build_content_key(digest, file.name)
+    # 작업 ID는 Celery 태스크 ID와 같으며, 태스크 발행 전에 상태 레코드를 만들어 바로 조회할 수 있게 함
+    job_id = str(uuid.uuid4())
+    jobs.create_job(job_id, 'image_upload', callback_url)
+    result = upload_image_to_s3.apply_async(
+        args=(file.name, staging_key, content_type, image_instance.id, object_key), task_id=job_id
+    )
     logger.info(f"Celery task called with ID: {result.id}")
 
     return Response({
         "success": "이미지가 업로드 중입니다. 업로드가 완료되면 URL이 업데이트됩니다.",
-        "image_id": image_instance.id
+        "image_id": image_instance.id,
+        "job_id": job_id
     }, status=status.HTTP_202_ACCEPTED)
 
+# Swagger를 사용하여 이미지 일괄 업로드 API 문서화
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 일괄 업로드',
+    operation_description='여러 이미지를 한 번에 업로드합니다. 파일별 오류는 해당 파일의 결과에만 표시됩니다.',
+    tags=['Images'],
+    manual_parameters=[
+        openapi.Parameter('user_id', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=True, description='User ID'),
+        openapi.Parameter('files', openapi.IN_FORM, type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_FILE),
+                          required=True, description='업로드할 이미지 파일 목록'),
+        openapi.Parameter('callback_url', openapi.IN_FORM, type=openapi.TYPE_STRING, required=False,
+                          description='파일별 업로드 완료 시 웹훅을 받을 URL'),
+    ],
+    responses={
+        202: "Images are being uploaded. Results are returned per file.",
+        400: "Bad request.",
+        404: "User not found.",
+    }
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def upload_images_batch(request):
+    """
+    이미지 일괄 업로드
+    """
+    user_id = request.data.get('user_id')
+    files = request.FILES.getlist('files')
+    callback_url = request.data.get('callback_url')
+
+    if not user_id or not files:
+        return Response({"error": "user_id와 files가 필요합니다."}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ImageBatchUploadSerializer(data={'user_id': user_id})
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    user_id = serializer.validated_data['user_id']
+    if callback_url:
+        try:
+            validate_callback_url(callback_url)
+        except ValidationError:
+            return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(files) > settings.IMAGE_BATCH_MAX_FILES:
+        return Response({"error": f"한 번에 최대 {settings.IMAGE_BATCH_MAX_FILES}개의 파일만 업로드할 수 있습니다."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not User.objects.filter(id=user_id).exists():
+        return Response({"error": "사용자 없음"}, status=status.HTTP_404_NOT_FOUND)
+
+    # 파일별 유효성 검사 및 스테이징 (실패한 파일은 결과에만 기록하고 계속 진행)
+    results = [None] * len(files)
+    staged = []
+    for index, file in enumerate(files):
+        try:
+            ImageSerializer().validate_file(file)
+        except serializers.ValidationError as e:
+            results[index] = {"file_name": file.name, "error": e.detail}
+            continue
+        staging_key, digest = stage_upload(file)
+        staged.append((index, file, staging_key, digest))
+
+    # 이미 업로드된 동일 내용의 이미지를 한 번의 쿼리로 조회
+    digests = {digest for _, _, _, digest in staged}
+    existing_urls = dict(
+        Image.objects.filter(sha256__in=digests).exclude(image_url='').values_list('sha256', 'image_url')
+    )
+
+    # 이미지 인스턴스를 bulk_create로 한 번에 생성
+    upload_batch = uuid.uuid4()
+    instances = [
+        Image(user_id=user_id, image_url=existing_urls.get(digest, ''), sha256=digest, upload_batch=upload_batch,
+              **file.image_info)
+        for _, file, _, digest in staged
+    ]
+    instances = Image.objects.bulk_create(instances)
+    if instances and instances[0].pk is None:
+        # MySQL은 bulk_create 후 PK를 돌려주지 않으므로 배치 식별자로 다시 조회 (삽입 순서 = ID 순서)
+        instances = list(Image.objects.filter(upload_batch=upload_batch).order_by('id'))
+
+    # 새로 올려야 하는 파일만 하나의 Celery group으로 발행
+    upload_tasks = []
+    for (index, file, staging_key, digest), image_instance in zip(staged, instances):
+        if image_instance.image_url:
+            discard_staged(staging_key)
+            results[index] = {"file_name": file.name, "image_id": image_instance.id, "image_url": image_instance.image_url}
+            if callback_url:
+                # 기존 객체를 재사용해 바로 끝난 파일도 완료 웹훅을 전송
+                results[index]["job_id"] = jobs.create_succeeded_job(
+                    'image_upload', {"image_id": image_instance.id, "image_url": image_instance.image_url}, callback_url
+                )
+            continue
+        object_key = build_content_key(digest, file.name)
+        job_id = str(uuid.uuid4())
+        upload_tasks.append(
+            upload_image_to_s3.s(file.name, staging_key, file.content_type, image_instance.id, object_key).set(task_id=job_id)
+        )
+        results[index] = {"file_name": file.name, "image_id": image_instance.id, "job_id": job_id}
+
+    group_id = None
+    if upload_tasks:
+        jobs.create_jobs('image_upload', [task.id for task in upload_tasks], callback_url)
+        group_result = group(upload_tasks).apply_async()
+        group_id = group_result.id
+        logger.info(f"Dispatched {len(upload_tasks)} upload tasks in group {group_id}")
+
+    if not staged:
+        return Response({"error": "업로드할 수 있는 파일이 없습니다.", "results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "success": "이미지가 업로드 중입니다. 업로드가 완료되면 URL이 업데이트됩니다.",
+        "group_id": group_id,
+        "results": results
+    }, status=status.HTTP_202_ACCEPTED)
+
+# Presigned 직접 업로드 시작 API
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 직접 업로드 시작',
+    operation_description='Image를 생성하고 S3에 직접 업로드할 수 있는 Presigned POST 정보를 반환합니다.',
+    tags=['Images'],
+    request_body=ImageUploadBeginSerializer,
+    responses={
+        201: openapi.Response('Presigned POST 발급 성공', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'image_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='생성된 이미지 ID'),
+                'upload': openapi.Schema(type=openapi.TYPE_OBJECT, description='Presigned POST URL 및 폼 필드'),
+                'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER, description='유효 시간 (초)'),
+            }
+        )),
+        400: "Bad request.",
+        404: "User not found.",
+    }
+)
+@api_view(['POST'])
+def begin_image_upload(request):
+    """
+    Presigned 직접 업로드 시작
+    """
+    serializer = ImageUploadBeginSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_id = serializer.validated_data['user_id']
+    file_name = serializer.validated_data['file_name']
+    content_type = serializer.validated_data['content_type']
+
+    if not User.objects.filter(id=user_id).exists():
+        return Response({"error": "사용자 없음"}, status=status.HTTP_404_NOT_FOUND)
+
+    # 이미지 인스턴스 생성 (URL은 업로드 완료 시 채워짐)
+    image_instance = Image.objects.create(user_id=user_id, image_url='')
+    unique_filename = f"{uuid.uuid4()}_{file_name}"
+
+    # S3 Presigned POST 생성
+    presigned_post = storage.get_s3_client().generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=unique_filename,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, settings.IMAGE_UPLOAD_MAX_SIZE],
+        ],
+        ExpiresIn=settings.IMAGE_PRESIGNED_EXPIRES,
+    )
+
+    # 업로드 완료 확인 시 사용할 S3 키를 임시로 저장
+    redis_client.set(f'image_upload_key_{image_instance.id}', unique_filename, ex=settings.IMAGE_PRESIGNED_EXPIRES * 2)
+    logger.info(f"Issued presigned upload for Image {image_instance.id}: {unique_filename}")
+
+    return Response({
+        "image_id": image_instance.id,
+        "upload": presigned_post,
+        "expires_in": settings.IMAGE_PRESIGNED_EXPIRES,
+    }, status=status.HTTP_201_CREATED)
+
+
+# Presigned 직접 업로드 완료 API
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 직접 업로드 완료',
+    operation_description='S3에 업로드된 객체를 확인하고 이미지 URL을 저장합니다.',
+    tags=['Images'],
+    responses={
+        200: ImageDetailSerializer,
+        400: "The object has not been uploaded yet.",
+        404: "Image or upload not found.",
+    }
+)
+@api_view(['POST'])
+def complete_image_upload(request, imageId):
+    """
+    Presigned 직접 업로드 완료
+    """
+    try:
+        image = Image.objects.get(id=imageId)
+    except Image.DoesNotExist:
+        return Response({"error": "해당 이미지를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+    upload_key = redis_client.get(f'image_upload_key_{imageId}')
+    if upload_key is None:
+        return Response({"error": "진행 중인 업로드가 없거나 만료되었습니다."}, status=status.HTTP_404_NOT_FOUND)
+    upload_key = upload_key.decode('utf-8')
+
+    # HEAD 요청으로 객체가 실제로 업로드되었는지 확인
+    s3 = storage.get_s3_client()
+    try:
+        s3.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=upload_key)
+    except ClientError as e:
+        logger.error("S3 HEAD 오류 (Image %s): %s", imageId, e)
+        return Response({"error": "아직 업로드되지 않았습니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 객체 앞부분만 읽어 이미지 메타데이터 저장
+    try:
+        image_info = probe_s3_object(s3, settings.AWS_STORAGE_BUCKET_NAME, upload_key)
+    except InvalidImage as e:
+        # 이미지가 아닌 객체는 저장하지 않고 정리 (업로드가 끝나지 않은 이미지 인스턴스와 업로드 키도 삭제)
+        logger.error("Invalid image uploaded for Image %s: %s", imageId, e)
+        storage.enqueue_delete(upload_key)
+        Image.objects.filter(id=imageId, image_url='').delete()
+        redis_client.delete(f'image_upload_key_{imageId}')
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    image.image_url = storage.build_url(upload_key)
+    for field, value in image_info.items():
+        setattr(image, field, value)
+    image.save()
+    redis_client.delete(f'image_upload_key_{imageId}')
+    logger.info(f"Completed presigned upload for Image {imageId}: {image.image_url}")
+
+    serializer = ImageDetailSerializer(image)
+    return Response({"success": "이미지 업로드가 완료되었습니다.", "data": serializer.data}, status=status.HTTP_200_OK)
+
+
+# 멀티파트(분할/재개 가능) 업로드 시작 API
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 멀티파트 업로드 시작',
+    operation_description='큰 이미지를 여러 파트로 나누어 업로드하기 위한 멀티파트 업로드를 시작합니다.',
+    tags=['Images'],
+    request_body=ImageUploadBeginSerializer,
+    responses={
+        201: openapi.Response('멀티파트 업로드 시작 성공', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'image_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='생성된 이미지 ID'),
+                'upload_token': openapi.Schema(type=openapi.TYPE_STRING, description='업로드 토큰'),
+                'part_size': openapi.Schema(type=openapi.TYPE_INTEGER, description='파트 크기 (바이트)'),
+                'max_concurrency': openapi.Schema(type=openapi.TYPE_INTEGER, description='권장 동시 전송 파트 수'),
+            }
+        )),
+        400: "Bad request.",
+        404: "User not found.",
+    }
+)
+@api_view(['POST'])
+def begin_multipart_upload(request):
+    """
+    멀티파트 업로드 시작
+    """
+    serializer = ImageUploadBeginSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_id = serializer.validated_data['user_id']
+    if not User.objects.filter(id=user_id).exists():
+        return Response({"error": "사용자 없음"}, status=status.HTTP_404_NOT_FOUND)
+
+    # 이미지 인스턴스 생성 (URL은 업로드 완료 시 채워짐)
+    image_instance = Image.objects.create(user_id=user_id, image_url='')
+    upload_token = multipart.start_upload(
+        image_instance.id,
+        serializer.validated_data['file_name'],
+        serializer.validated_data['content_type'],
+    )
+
+    return Response({
+        "image_id": image_instance.id,
+        "upload_token": upload_token,
+        "part_size": settings.IMAGE_MULTIPART_PART_SIZE,
+        "max_concurrency": settings.IMAGE_MULTIPART_MAX_CONCURRENCY,
+    }, status=status.HTTP_201_CREATED)
+
+
+# 멀티파트 업로드 파트 전송 API
+@swagger_auto_schema(
+    method='put',
+    operation_id='이미지 멀티파트 업로드 파트 전송',
+    operation_description='파트 하나를 업로드합니다. 여러 파트를 동시에 전송할 수 있고, 실패한 파트는 같은 번호로 다시 전송하면 됩니다.',
+    tags=['Images'],
+    manual_parameters=[
+        openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='파트 데이터'),
+    ],
+    responses={
+        200: "Part successfully uploaded.",
+        400: "Bad request.",
+        404: "Upload not found.",
+    }
+)
+@api_view(['PUT'])
+@parser_classes([MultiPartParser, FormParser])
+def upload_multipart_part(request, uploadToken, partNumber):
+    """
+    멀티파트 업로드 파트 전송
+    """
+    if not multipart.MIN_PART_NUMBER <= partNumber <= multipart.MAX_PART_NUMBER:
+        return Response({"error": f"파트 번호는 {multipart.MIN_PART_NUMBER}~{multipart.MAX_PART_NUMBER} 사이여야 합니다."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    file = request.FILES.get('file')
+    if file is None:
+        return Response({"error": "파트 데이터(file)가 필요합니다."}, status=status.HTTP_400_BAD_REQUEST)
+    if file.size > settings.IMAGE_MULTIPART_PART_SIZE:
+        return Response({"error": f"파트 크기는 {settings.IMAGE_MULTIPART_PART_SIZE} 바이트를 넘을 수 없습니다."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        part = multipart.upload_part(uploadToken, partNumber, file, file.size)
+    except multipart.MultipartUploadNotFound:
+        return Response({"error": "진행 중인 업로드가 없거나 만료되었습니다."}, status=status.HTTP_404_NOT_FOUND)
+    except multipart.UploadTooLarge:
+        return Response({"error": f"업로드 크기는 {settings.IMAGE_MULTIPART_MAX_SIZE} 바이트를 넘을 수 없습니다."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except ClientError as e:
+        logger.error("S3 파트 업로드 오류 (%s, part %s): %s", uploadToken, partNumber, e)
+        return Response({"error": "S3 파트 업로드 오류", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({"part_number": partNumber, "etag": part['etag'], "size": part['size']}, status=status.HTTP_200_OK)
+
+
+# 멀티파트 업로드 완료 API
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 멀티파트 업로드 완료',
+    operation_description='업로드된 파트를 합쳐 멀티파트 업로드를 완료하고 이미지 URL을 저장합니다.',
+    tags=['Images'],
+    responses={
+        200: ImageDetailSerializer,
+        400: "Bad request.",
+        404: "Upload not found.",
+    }
+)
+@api_view(['POST'])
+def complete_multipart_upload(request, uploadToken):
+    """
+    멀티파트 업로드 완료
+    """
+    try:
+        state = multipart.get_state(uploadToken)
+        if not multipart.list_parts(uploadToken):
+            return Response({"error": "업로드된 파트가 없습니다."}, status=status.HTTP_400_BAD_REQUEST)
+        key = multipart.complete_upload(uploadToken)
+    except multipart.MultipartUploadNotFound:
+        return Response({"error": "진행 중인 업로드가 없거나 만료되었습니다."}, status=status.HTTP_404_NOT_FOUND)
+    except multipart.UploadTooLarge:
+        return Response({"error": f"업로드 크기는 {settings.IMAGE_MULTIPART_MAX_SIZE} 바이트를 넘을 수 없습니다."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except multipart.PartTooSmall as e:
+        return Response({"error": str(e), "part_numbers": e.part_numbers}, status=status.HTTP_400_BAD_REQUEST)
+    except ClientError as e:
+        logger.error("S3 멀티파트 업로드 완료 오류 (%s): %s", uploadToken, e)
+        return Response({"error": "멀티파트 업로드 완료 실패", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 객체 앞부분만 읽어 이미지 메타데이터 저장
+    try:
+        image_info = probe_s3_object(storage.get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, key)
+    except InvalidImage as e:
+        # 이미지가 아닌 객체는 저장하지 않고 정리 (업로드가 끝나지 않은 이미지 인스턴스도 삭제)
+        logger.error("Invalid image uploaded for multipart upload %s: %s", uploadToken, e)
+        storage.enqueue_delete(key)
+        Image.objects.filter(id=state['image_id'], image_url='').delete()
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    Image.objects.filter(id=state['image_id']).update(image_url=storage.build_url(key), **image_info)
+    image = Image.objects.get(id=state['image_id'])
+
+    serializer = ImageDetailSerializer(image)
+    return Response({"success": "이미지 업로드가 완료되었습니다.", "data": serializer.data}, status=status.HTTP_200_OK)
+
+
+# 멀티파트 업로드 상태 조회 및 취소 API
+@swagger_auto_schema(
+    method='get',
+    operation_id='이미지 멀티파트 업로드 상태 조회',
+    operation_description='업로드가 끝난 파트 목록을 조회합니다. 중단된 업로드를 재개할 때 사용합니다.',
+    tags=['Images'],
+    responses={
+        200: "Upload state.",
+        404: "Upload not found.",
+    }
+)
+@swagger_auto_schema(
+    method='delete',
+    operation_id='이미지 멀티파트 업로드 취소',
+    operation_description='멀티파트 업로드를 취소하고 업로드된 파트를 정리합니다.',
+    tags=['Images'],
+    responses={
+        200: "Upload successfully aborted.",
+        404: "Upload not found.",
+    }
+)
+@api_view(['GET', 'DELETE'])
+def multipart_upload_manage(request, uploadToken):
+    """
+    멀티파트 업로드 상태 조회 및 취소
+    """
+    try:
+        state = multipart.get_state(uploadToken)
+    except multipart.MultipartUploadNotFound:
+        return Response({"error": "진행 중인 업로드가 없거나 만료되었습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return Response({
+            "image_id": state['image_id'],
+            "part_size": state['part_size'],
+            "parts": multipart.list_parts(uploadToken),
+        }, status=status.HTTP_200_OK)
+
+    elif request.method == 'DELETE':
+        try:
+            multipart.abort_upload(uploadToken)
+        except ClientError as e:
+            logger.error("S3 멀티파트 업로드 취소 오류 (%s): %s", uploadToken, e)
+            return Response({"error": "멀티파트 업로드 취소 실패", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # 업로드가 끝나지 않은 이미지 인스턴스 삭제
+        Image.objects.filter(id=state['image_id'], image_url='').delete()
+        return Response({"success": "업로드가 취소되었습니다."}, status=status.HTTP_200_OK)
+
+
 # Swagger를 사용하여 이미지 조회 및 삭제 API 문서화
 @swagger_auto_schema(
     method='get',
@@ -105,10 +582,10 @@ def image_manage(request, imageId):
         return Response({"success": "이미지가 성공적으로 조회되었습니다.", "data": serializer.data}, status=status.HTTP_200_OK)
 
     elif request.method == 'DELETE':
-        # S3에서 파일 삭제
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        file_key = image.image_url.split('/')[-1]
-        s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+        # 같은 내용의 객체를 공유하는 다른 이미지가 없을 때만 S3 파일 삭제를 큐에 추가
+        shared = bool(image.sha256) and Image.objects.filter(sha256=image.sha256).exclude(id=image.id).exists()
+        if image.image_url and not shared:
+            storage.enqueue_delete(storage.key_from_url(image.image_url))
 
         # 데이터베이스에서 이미지 삭제
         image.delete()
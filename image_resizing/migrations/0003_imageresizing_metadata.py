@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_resizing', '0002_imageresizing_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageresizing',
+            name='byte_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imageresizing',
+            name='format',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='imageresizing',
+            name='mode',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_resizing', '0003_imageresizing_metadata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imageresizing',
+            name='image_url',
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+    ]
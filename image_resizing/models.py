@@ -7,10 +7,14 @@ class ImageResizing(models.Model):
     height = models.IntegerField()
     background = models.ForeignKey(Background, on_delete=models.CASCADE, null=True, blank=True)
     recreated_background = models.ForeignKey(RecreatedBackground, on_delete=models.CASCADE, null=True, blank=True)
-    image_url = models.CharField(max_length=500)
+    image_url = models.CharField(max_length=500, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
+    # 리사이징 결과 이미지의 메타데이터 (가로/세로는 width, height 사용)
+    format = models.CharField(max_length=10, blank=True, default='')
+    mode = models.CharField(max_length=10, blank=True, default='')
+    byte_size = models.PositiveBigIntegerField(null=True, blank=True)
 
     def get_background_id(self):
         return self.background.id if self.background else None
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from image.serializers import ImageSerializer
 from .models import ImageResizing
 
 class BackgroundImageResizingSerializer(serializers.ModelSerializer):
@@ -8,8 +9,8 @@ class BackgroundImageResizingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ImageResizing
-        fields = ['background_id', 'width', 'height', 'image_url']
-        read_only_fields = ['image_url', 'created_at', 'updated_at']
+        fields = ['background_id', 'width', 'height', 'image_url', 'format', 'mode', 'byte_size']
+        read_only_fields = ['image_url', 'created_at', 'updated_at', 'format', 'mode', 'byte_size']
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -23,10 +24,26 @@ class RecreatedBackgroundImageResizingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ImageResizing
-        fields = ['recreated_background_id', 'width', 'height', 'image_url']
-        read_only_fields = ['image_url', 'created_at', 'updated_at']
+        fields = ['recreated_background_id', 'width', 'height', 'image_url', 'format', 'mode', 'byte_size']
+        read_only_fields = ['image_url', 'created_at', 'updated_at', 'format', 'mode', 'byte_size']
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation['image_url'] = instance.image_url
         return representation
+
+class PipelineSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    user_id = serializers.IntegerField()
+    gen_type = serializers.ChoiceField(choices=['remove_bg', 'color_bg', 'simple', 'concept'])
+    output_w = serializers.IntegerField(default=1000, min_value=200, max_value=2000)
+    output_h = serializers.IntegerField(default=1000, min_value=200, max_value=2000)
+    # 멀티파트 요청이므로 JSON 문자열로 받음
+    concept_option = serializers.JSONField(binary=True, default=dict)
+    width = serializers.IntegerField(min_value=1)
+    height = serializers.IntegerField(min_value=1)
+    callback_url = serializers.CharField(required=False)
+
+    def validate_file(self, value):
+        # 이미지 업로드 API와 같은 검사 (헤더 메타데이터를 value.image_info에 담음)
+        return ImageSerializer().validate_file(value)
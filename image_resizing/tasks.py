@@ -0,0 +1,139 @@
+from celery import shared_task
+import io
+import uuid
+import logging
+from PIL import Image as PILImage
+from background.models import Background, Image, User
+from background.tasks import create_backgrounds
+from common import storage, source_cache, draph, jobs, generation
+from common.retry import retry_or_dead_letter
+from image.staging import open_staged, discard_staged
+from .models import ImageResizing
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+
+def resize_and_upload(image_url, width, height):
+    """
+    이미지를 로컬 캐시에서 읽어(없으면 다운로드) width x height로 리사이징하고 PNG로 S3에 올립니다.
+    (S3 URL, 이미지 모드, 바이트 크기)를 반환합니다.
+    """
+    with source_cache.open_mmap(image_url) as image_file:
+        pil_image = PILImage.open(image_file)
+
+        # 이미지 리사이징
+        pil_image = pil_image.resize((width, height))
+        resized_image_bytes = io.BytesIO()
+        pil_image.save(resized_image_bytes, format='PNG')
+        resized_image_size = resized_image_bytes.tell()
+        resized_image_bytes.seek(0)
+
+    # S3에 업로드
+    unique_filename = f"{uuid.uuid4()}.png"
+    resized_image_url = storage.upload_fileobj(resized_image_bytes, unique_filename, 'image/png')
+    return resized_image_url, pil_image.mode, resized_image_size
+
+
+# 업로드 → 생성 → 리사이징 파이프라인 (Celery chain, 'pipeline' 큐)
+# 각 단계는 S3에 올린 파일을 로컬 디스크 캐시에도 기록하므로, 같은 워커에서 실행되는 다음 단계는 S3에서 다시 내려받지 않음.
+# 단계가 실패하면 예외를 다시 발생시켜 체인의 나머지 단계가 실행되지 않도록 함.
+
+@shared_task(bind=True)
+def pipeline_upload_task(self, job_id, file_name, staging_key, content_type, image_id, object_key):
+    jobs.update_job(job_id, stage='uploading')
+    try:
+        image_url = storage.build_url(object_key)
+        # 스테이징된 원본을 로컬 캐시에 기록하고, 같은 내용의 객체가 없을 때만 S3에 업로드
+        file_obj = open_staged(staging_key)
+        try:
+            path = source_cache.put(image_url, file_obj)
+        finally:
+            file_obj.close()
+        skipped = storage.object_exists(object_key)
+        if skipped:
+            # 삭제 대기 중인 객체를 다시 사용하게 되면 삭제 큐에서 빼냄 (upload_image_to_s3와 같은 처리)
+            storage.cancel_delete(object_key)
+            logger.info(f"Object {object_key} already exists, skipping upload of {file_name}")
+        else:
+            with open(path, 'rb') as f:
+                storage.upload_fileobj(f, object_key, content_type)
+
+        Image.objects.filter(id=image_id).update(image_url=image_url)
+        if skipped and not storage.object_exists(object_key):
+            # 존재 확인 직전에 가져간 삭제 큐 배치가 그 사이 객체를 지웠으면 다시 업로드
+            logger.warning(f"Object {object_key} was deleted while reusing it, uploading {file_name} again")
+            file_obj = open_staged(staging_key)
+            try:
+                storage.upload_fileobj(file_obj, object_key, content_type)
+            finally:
+                file_obj.close()
+        discard_staged(staging_key)
+        logger.info(f"Pipeline {job_id} uploaded {file_name} to {image_url}")
+        return image_id
+    except Exception as e:
+        logger.error("Error in pipeline_upload_task: %s", e)
+        # 일시적인 오류면 이 단계만 재시도하고, 그 외에는 DeadLetter에 기록 (남은 체인 단계도 함께 기록해 다시 실행할 수 있음)
+        retry_or_dead_letter(self, e, job_id)
+        raise
+
+
+@shared_task(bind=True)
+def pipeline_generate_task(self, image_id, job_id, user_id, gen_type, output_w, output_h, concept_option, unique_filename):
+    jobs.update_job(job_id, stage='generating')
+    try:
+        user = User.objects.get(id=user_id)
+        image = Image.objects.get(id=image_id)
+        data = draph.build_generate_data(gen_type, output_w, output_h, concept_option)
+        # 원본은 앞 단계가 기록한 로컬 캐시에서 읽고, 생성 결과도 다음 단계를 위해 로컬 캐시에 기록
+        results = generation.generate_images(image, data, unique_filename, job_id, keep_local=True)
+        backgrounds = create_backgrounds(user, image, gen_type, output_w, output_h, concept_option, results)
+        return [background.id for background in backgrounds]
+    except Exception as e:
+        logger.error("Error in pipeline_generate_task: %s", e)
+        retry_or_dead_letter(self, e, job_id)
+        raise
+
+
+@shared_task(bind=True)
+def pipeline_resize_task(self, background_ids, job_id, width, height):
+    jobs.update_job(job_id, stage='resizing')
+    try:
+        backgrounds = Background.objects.in_bulk(background_ids)
+        # 재시도 시 이전 실행에서 이미 리사이징한 배경 이미지는 다시 만들지 않음
+        existing = {
+            resizing.background_id: resizing
+            for resizing in ImageResizing.objects.filter(
+                background_id__in=background_ids, width=width, height=height
+            ).order_by('id')
+        }
+        resizings = []
+        for background_id in background_ids:
+            resizing = existing.get(background_id)
+            if resizing is None:
+                background = backgrounds[background_id]
+                resized_image_url, mode, byte_size = resize_and_upload(background.image_url, width, height)
+                resizing = ImageResizing.objects.create(
+                    background=background,
+                    width=width,
+                    height=height,
+                    image_url=resized_image_url,
+                    format='PNG',
+                    mode=mode,
+                    byte_size=byte_size
+                )
+            resizings.append(resizing)
+
+        result = {
+            "image_id": backgrounds[background_ids[0]].image_id,
+            "background_ids": background_ids,
+            "image_urls": [backgrounds[background_id].image_url for background_id in background_ids],
+            "resized_image_ids": [resizing.id for resizing in resizings],
+            "resized_image_urls": [resizing.image_url for resizing in resizings],
+        }
+        jobs.succeed_job(job_id, result)
+        return result
+    except Exception as e:
+        logger.error("Error in pipeline_resize_task: %s", e)
+        retry_or_dead_letter(self, e, job_id)
+        raise
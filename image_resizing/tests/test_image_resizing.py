@@ -4,13 +4,20 @@
 
 
 
+import io
 import pytest
+from PIL import Image as PILImage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from unittest.mock import patch, MagicMock
 from background.models import Background
 from recreated_background.models import RecreatedBackground
+from image.models import Image
+from user.models import User
+from image_resizing.models import ImageResizing
+from image_resizing.tasks import pipeline_resize_task
 
 @pytest.mark.integration  # 이 테스트가 통합 테스트임을 나타냅니다.
 @pytest.mark.django_db  # 이 테스트가 데이터베이스 접근이 필요함을 나타냅니다.
@@ -104,3 +111,82 @@ class TestImageResizingAPI:
         response = self.client.post(self.resize_recreated_background_image_url, data, format='json')
         # 상태 코드가 404 Not Found 인지 확인합니다.
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def _png_file(name='a.png'):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (4, 3)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@pytest.mark.django_db
+class TestPipelineAPI:
+    def setup_method(self):
+        self.client = APIClient()
+        self.pipeline_url = reverse('pipeline')
+        self.user = User.objects.create(nickname='testuser')
+
+    def _post(self, **extra):
+        data = {'file': _png_file(), 'user_id': self.user.id, 'gen_type': 'simple', 'width': 100, 'height': 50, **extra}
+        with patch('image_resizing.views.stage_upload', return_value=('staging-key', 'a' * 64)), \
+                patch('image_resizing.views.discard_staged'), \
+                patch('image_resizing.views.jobs.create_job') as mock_create_job, \
+                patch('image_resizing.views.chain') as mock_chain:
+            response = self.client.post(self.pipeline_url, data, format='multipart')
+        return response, mock_create_job, mock_chain
+
+    def test_pipeline_dispatches_chain(self): #업로드, 생성, 리사이징 단계를 하나의 체인으로 발행하는지 테스트
+        response, mock_create_job, mock_chain = self._post(concept_option='{"num_results": 2}')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_id = response.data['job_id']
+        mock_create_job.assert_called_once_with(job_id, 'pipeline', None)
+        upload, generate, resize = mock_chain.call_args.args
+        assert upload.task == 'image_resizing.tasks.pipeline_upload_task'
+        assert upload.args[4] == response.data['image_id']
+        assert generate.args[0] == job_id and generate.args[5] == {'num_results': 2}
+        assert resize.args == (job_id, 100, 50)
+        mock_chain.return_value.apply_async.assert_called_once()
+
+    def test_pipeline_reuses_existing_image(self): #같은 내용의 이미지가 있으면 업로드 단계를 생략하는지 테스트
+        Image.objects.create(user=self.user, image_url='https://bucket/existing.png', sha256='a' * 64)
+        response, _, mock_chain = self._post()
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        generate, resize = mock_chain.call_args.args
+        assert generate.task == 'image_resizing.tasks.pipeline_generate_task'
+        assert generate.args[:2] == (response.data['image_id'], response.data['job_id'])
+        assert Image.objects.get(id=response.data['image_id']).image_url == 'https://bucket/existing.png'
+
+    def test_pipeline_invalid_data(self): #리사이징 크기가 없으면 400 응답 테스트
+        response = self.client.post(self.pipeline_url, {'file': _png_file(), 'user_id': self.user.id, 'gen_type': 'simple'},
+                                    format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_pipeline_resize_task(self): #생성된 배경 이미지를 모두 리사이징하고 작업을 완료하는지 테스트
+        image = Image.objects.create(user=self.user, image_url='https://bucket/source.png')
+        backgrounds = [
+            Background.objects.create(user=self.user, image=image, gen_type='simple', concept_option='{}',
+                                      output_w=1000, output_h=1000, image_url=f'https://bucket/{index}.png')
+            for index in range(2)
+        ]
+        background_ids = [background.id for background in backgrounds]
+        with patch('image_resizing.tasks.resize_and_upload', return_value=('https://bucket/resized.png', 'RGB', 10)), \
+                patch('image_resizing.tasks.jobs') as mock_jobs:
+            result = pipeline_resize_task(background_ids, 'job-id', 100, 50)
+        assert result['background_ids'] == background_ids and result['image_id'] == image.id
+        assert ImageResizing.objects.filter(background_id__in=background_ids, width=100, height=50).count() == 2
+        mock_jobs.succeed_job.assert_called_once_with('job-id', result)
+
+    def test_pipeline_resize_task_skips_done(self): #재시도 시 이미 리사이징한 배경 이미지는 다시 만들지 않는지 테스트
+        image = Image.objects.create(user=self.user, image_url='https://bucket/source.png')
+        backgrounds = [
+            Background.objects.create(user=self.user, image=image, gen_type='simple', concept_option='{}',
+                                      output_w=1000, output_h=1000, image_url=f'https://bucket/{index}.png')
+            for index in range(2)
+        ]
+        done = ImageResizing.objects.create(background=backgrounds[0], width=100, height=50, image_url='https://bucket/done.png')
+        with patch('image_resizing.tasks.resize_and_upload', return_value=('https://bucket/resized.png', 'RGB', 10)) as mock_resize, \
+                patch('image_resizing.tasks.jobs'):
+            result = pipeline_resize_task([background.id for background in backgrounds], 'job-id', 100, 50)
+        mock_resize.assert_called_once_with('https://bucket/1.png', 100, 50)
+        assert result['resized_image_ids'][0] == done.id
+        assert ImageResizing.objects.count() == 2
@@ -1,19 +1,25 @@
 from django.shortcuts import get_object_or_404
-from rest_framework.decorators import api_view
+from django.core.exceptions import ValidationError
+from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, serializers
+from rest_framework.parsers import MultiPartParser, FormParser
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from celery import chain
 from background.models import Background
 from recreated_background.models import RecreatedBackground
+from image.models import Image
+from image.staging import stage_upload, discard_staged
+from image.tasks import build_content_key
+from user.models import User
 from .models import ImageResizing
-from .serializers import BackgroundImageResizingSerializer, RecreatedBackgroundImageResizingSerializer
-import requests
-import io
+from .serializers import BackgroundImageResizingSerializer, RecreatedBackgroundImageResizingSerializer, PipelineSerializer
+from .tasks import resize_and_upload, pipeline_upload_task, pipeline_generate_task, pipeline_resize_task
+import httpx
 import uuid
-import boto3
-from PIL import Image as PILImage
-from django.conf import settings
+from common import storage, jobs, encoding
+from common.webhooks import validate_callback_url
 import logging
 
 # 로깅 설정
@@ -53,37 +59,24 @@ def resize_background_image_view(request):
         image_url = background.image_url
 
         try:
-            # 이미지를 다운로드
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
-            image_file = io.BytesIO(image_response.content)
-            pil_image = PILImage.open(image_file)
-
-            # 이미지 리사이징
-            pil_image = pil_image.resize((width, height))
-            resized_image_bytes = io.BytesIO()
-            pil_image.save(resized_image_bytes, format='PNG')
-            resized_image_bytes.seek(0)
-
-            # S3에 업로드
-            s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-            unique_filename = f"{uuid.uuid4()}.png"
-            s3.upload_fileobj(resized_image_bytes, settings.AWS_STORAGE_BUCKET_NAME, unique_filename,
-                              ExtraArgs={'ContentType': 'image/png'})
-            resized_image_url = f"http://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
+            # 이미지를 로컬 캐시에서 읽어(없으면 다운로드) 리사이징한 뒤 S3에 업로드
+            resized_image_url, mode, resized_image_size = resize_and_upload(image_url, width, height)
 
             # ImageResizing 객체 생성 및 저장
             image_resizing = ImageResizing.objects.create(
                 background=background,
                 width=width,
                 height=height,
-                image_url=resized_image_url
+                image_url=resized_image_url,
+                format='PNG',
+                mode=mode,
+                byte_size=resized_image_size
             )
 
             return Response({"resized_image_url": resized_image_url, "id": image_resizing.id},
                             status=status.HTTP_200_OK)
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error("Failed to download image: %s", e)
             return Response({"error": "Failed to download image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
@@ -126,37 +119,24 @@ def resize_recreated_background_image_view(request):
         image_url = recreated_background.image_url
 
         try:
-            # 이미지를 다운로드
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
-            image_file = io.BytesIO(image_response.content)
-            pil_image = PILImage.open(image_file)
-
-            # 이미지 리사이징
-            pil_image = pil_image.resize((width, height))
-            resized_image_bytes = io.BytesIO()
-            pil_image.save(resized_image_bytes, format='PNG')
-            resized_image_bytes.seek(0)
-
-            # S3에 업로드
-            s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-            unique_filename = f"{uuid.uuid4()}.png"
-            s3.upload_fileobj(resized_image_bytes, settings.AWS_STORAGE_BUCKET_NAME, unique_filename,
-                              ExtraArgs={'ContentType': 'image/png'})
-            resized_image_url = f"http://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
+            # 이미지를 로컬 캐시에서 읽어(없으면 다운로드) 리사이징한 뒤 S3에 업로드
+            resized_image_url, mode, resized_image_size = resize_and_upload(image_url, width, height)
 
             # ImageResizing 객체 생성 및 저장
             image_resizing = ImageResizing.objects.create(
                 recreated_background=recreated_background,
                 width=width,
                 height=height,
-                image_url=resized_image_url
+                image_url=resized_image_url,
+                format='PNG',
+                mode=mode,
+                byte_size=resized_image_size
             )
 
             return Response({"resized_image_url": resized_image_url, "id": image_resizing.id},
                             status=status.HTTP_200_OK)
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error("Failed to download image: %s", e)
             return Response({"error": "Failed to download image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
@@ -201,11 +181,9 @@ def background_image_manage(request, background_image_id):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'DELETE':
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        file_key = image_resizing.image_url.split('/')[-1]
         try:
-            # S3에서 파일 삭제
-            s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+            # S3 파일 삭제는 큐에 추가하고 백그라운드에서 일괄 처리
+            storage.enqueue_delete(storage.key_from_url(image_resizing.image_url))
         except Exception as e:
             logger.error("S3 파일 삭제 오류: %s", e)
             return Response({"error": "S3 파일 삭제 오류", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -250,11 +228,9 @@ def recreated_background_image_manage(request, recreated_background_image_id):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'DELETE':
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        file_key = image_resizing.image_url.split('/')[-1]
         try:
-            # S3에서 파일 삭제
-            s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+            # S3 파일 삭제는 큐에 추가하고 백그라운드에서 일괄 처리
+            storage.enqueue_delete(storage.key_from_url(image_resizing.image_url))
         except Exception as e:
             logger.error("S3 파일 삭제 오류: %s", e)
             return Response({"error": "S3 파일 삭제 오류", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -262,3 +238,88 @@ def recreated_background_image_manage(request, recreated_background_image_id):
         # 이미지 리사이징 객체 삭제
         image_resizing.delete()
         return Response({"message": "Image deleted successfully."}, status=status.HTTP_200_OK)
+
+
+# 업로드 → 배경 이미지 생성 → 리사이징을 한 번에 처리하는 파이프라인 API 엔드포인트
+@swagger_auto_schema(
+    method='post',
+    operation_id='이미지 파이프라인',
+    operation_description='이미지를 업로드하고 배경 이미지를 생성한 뒤 리사이징까지 하나의 작업으로 처리합니다. '
+                          '각 단계가 끝날 때까지 기다렸다가 다음 API를 호출할 필요가 없으며, 진행 상태는 /jobs/{job_id}/로 조회합니다.',
+    tags=['Resizing'],
+    manual_parameters=[
+        openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='원본 이미지 파일'),
+        openapi.Parameter('user_id', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=True, description='User ID'),
+        openapi.Parameter('gen_type', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True, description='Generation Type',
+                          enum=['remove_bg', 'color_bg', 'simple', 'concept']),
+        openapi.Parameter('output_w', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=False, description='Output Width', default=1000),
+        openapi.Parameter('output_h', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=False, description='Output Height', default=1000),
+        openapi.Parameter('concept_option', openapi.IN_FORM, type=openapi.TYPE_STRING, required=False, description='Concept Option (JSON 문자열)'),
+        openapi.Parameter('width', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=True, description='리사이징할 가로 길이'),
+        openapi.Parameter('height', openapi.IN_FORM, type=openapi.TYPE_INTEGER, required=True, description='리사이징할 세로 길이'),
+        openapi.Parameter('callback_url', openapi.IN_FORM, type=openapi.TYPE_STRING, required=False, description='작업 완료 시 웹훅을 받을 URL'),
+    ],
+    responses={
+        202: openapi.Response('파이프라인 작업 접수', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'job_id': openapi.Schema(type=openapi.TYPE_STRING, description='작업 ID'),
+                'image_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='업로드된 이미지 ID'),
+            }
+        )),
+        400: 'Bad Request',
+        404: 'User not found.',
+    }
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def pipeline_view(request):
+    serializer = PipelineSerializer(data=request.data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except serializers.ValidationError as e:
+        logger.error("Validation error: %s", e)
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+    validated_data = serializer.validated_data
+    callback_url = validated_data.get('callback_url')
+    if callback_url:
+        try:
+            validate_callback_url(callback_url)
+        except ValidationError:
+            return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_id = validated_data['user_id']
+    if not User.objects.filter(id=user_id).exists():
+        return Response({"error": "사용자 없음"}, status=status.HTTP_404_NOT_FOUND)
+
+    # 파일 내용은 브로커로 보내지 않고 스테이징 저장소에 기록한 뒤 키만 전달 (기록하면서 SHA-256 계산)
+    file = validated_data['file']
+    staging_key, digest = stage_upload(file)
+    job_id = str(uuid.uuid4())
+    generate = pipeline_generate_task.s(
+        job_id, user_id, validated_data['gen_type'], validated_data['output_w'], validated_data['output_h'],
+        validated_data['concept_option'], encoding.output_filename(str(uuid.uuid4()))
+    )
+    resize = pipeline_resize_task.s(job_id, validated_data['width'], validated_data['height'])
+
+    # 같은 내용의 이미지가 이미 업로드되어 있으면 업로드 단계를 생략하고 기존 객체를 재사용
+    existing_image = Image.objects.filter(sha256=digest).exclude(image_url='').first()
+    if existing_image is not None:
+        discard_staged(staging_key)
+        image_instance = Image.objects.create(user_id=user_id, image_url=existing_image.image_url, sha256=digest, **file.image_info)
+        # 업로드 단계가 넘겨 주던 image_id를 생성 단계의 첫 번째 인자로 채움
+        pipeline = chain(generate.clone(args=(image_instance.id,)), resize)
+    else:
+        image_instance = Image.objects.create(user_id=user_id, image_url='', sha256=digest, **file.image_info)
+        upload = pipeline_upload_task.s(
+            job_id, file.name, staging_key, file.content_type, image_instance.id, build_content_key(digest, file.name)
+        )
+        pipeline = chain(upload, generate, resize)
+
+    # 작업 상태 레코드를 먼저 만들어 바로 조회할 수 있게 한 뒤, 세 단계를 하나의 체인으로 발행
+    jobs.create_job(job_id, 'pipeline', callback_url)
+    pipeline.apply_async()
+    logger.info(f"Dispatched pipeline {job_id} for Image {image_instance.id}")
+
+    return Response({"job_id": job_id, "image_id": image_instance.id}, status=status.HTTP_202_ACCEPTED)
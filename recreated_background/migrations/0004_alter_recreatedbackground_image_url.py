@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recreated_background', '0003_recreatedbackground_concept_option'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recreatedbackground',
+            name='image_url',
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+    ]
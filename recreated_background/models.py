@@ -5,7 +5,7 @@ class RecreatedBackground(models.Model):
     # Background 모델의 인스턴스를 외래 키로 가짐 -> 하지만 user_id와 image_id만 참조하고 나머지는 다 독립적이다!
     background = models.ForeignKey(Background, on_delete=models.CASCADE)
     concept_option = models.TextField(default='default_concept')
-    image_url = models.CharField(max_length=500)
+    image_url = models.CharField(max_length=500, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
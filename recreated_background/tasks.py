@@ -0,0 +1,54 @@
+from celery import shared_task
+from .models import RecreatedBackground, Background
+from .serializers import RecreatedBackgroundSerializer
+import json
+import logging
+from django.conf import settings
+from common import jobs, generation
+from common.retry import retry_or_dead_letter
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True)
+def recreate_background_task(self, background_id, concept_option, unique_filename):
+    try:
+        background = Background.objects.select_related('image').get(id=background_id)
+
+        # 요청 데이터 구성
+        data = {
+            "username": settings.DRAPHART_USER_NAME,
+            "gen_type": background.gen_type,
+            "output_w": background.output_w,
+            "output_h": background.output_h,
+            'concept_option': json.dumps(concept_option),
+        }
+        # concept_option의 num_results만큼 결과가 오며, 결과마다 RecreatedBackground 행을 만듦
+        # 다시 만들기 요청이므로 이전 결과(캐시)를 재사용하지 않고 항상 새로 생성
+        results = generation.generate_images(background.image, data, unique_filename, self.request.id, use_cache=False)
+        image_urls = [result['image_url'] for result in results]
+
+        # RecreatedBackground 모델에 저장
+        recreated_backgrounds = RecreatedBackground.objects.bulk_create([
+            RecreatedBackground(background=background, concept_option=concept_option, image_url=image_url)
+            for image_url in image_urls
+        ])
+        if not all(recreated_background.pk for recreated_background in recreated_backgrounds):
+            # MySQL은 bulk_create 후 기본 키를 돌려주지 않으므로 방금 만든 행을 다시 조회
+            created = RecreatedBackground.objects.filter(
+                background=background, image_url__in=image_urls
+            ).order_by('-id')[:len(image_urls)]
+            recreated_backgrounds = sorted(created, key=lambda row: (image_urls.index(row.image_url), row.id))
+
+        jobs.succeed_job(self.request.id, {
+            "recreated_background_id": recreated_backgrounds[0].id,
+            "image_url": recreated_backgrounds[0].image_url,
+            "recreated_background_ids": [row.id for row in recreated_backgrounds],
+            "image_urls": [row.image_url for row in recreated_backgrounds],
+        })
+        return RecreatedBackgroundSerializer(recreated_backgrounds, many=True).data
+    except Exception as e:
+        logger.error("Error in recreate_background_task: %s", e)
+        # 일시적인 오류면 재시도하고, 그 외에는 DeadLetter에 기록
+        retry_or_dead_letter(self, e)
+        return {"error": str(e)}
@@ -7,6 +7,7 @@ from recreated_background.models import RecreatedBackground
 from user.models import User
 from image.models import Image
 import uuid
+from unittest.mock import patch
 
 @pytest.mark.integration
 @pytest.mark.django_db
@@ -34,9 +35,15 @@ class TestRecreatedBackgroundAPI:
                 'num_results': 1
             }
         }
-        response = self.client.post(self.recreate_url, payload, format='json')
-        assert response.status_code == status.HTTP_201_CREATED
-        assert 'image_url' in response.data
+        with patch('recreated_background.views.jobs.create_job') as mock_create_job, \
+                patch('recreated_background.views.recreate_background_task.apply_async') as mock_apply_async:
+            mock_apply_async.return_value.id = 'test-task-id'
+            response = self.client.post(self.recreate_url, payload, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['task_id'] == 'test-task-id'
+        assert 's3_url' in response.data
+        mock_create_job.assert_called_once()
+        mock_apply_async.assert_called_once()
 
     def test_get_recreated_background(self): #재생성된 배경 이미지 조회 테스트
         recreated_background = RecreatedBackground.objects.create(
@@ -7,15 +7,12 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import RecreatedBackground, Background
 from .serializers import RecreatedBackgroundSerializer
-import requests
-import io
 import uuid
-import base64
-import boto3
-from PIL import Image as PILImage
-import json
 import logging
-from django.conf import settings
+from .tasks import recreate_background_task
+from common import storage, jobs, encoding
+from django.core.exceptions import ValidationError
+from common.webhooks import validate_callback_url
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
@@ -32,11 +29,18 @@ logger = logging.getLogger(__name__)
                 'theme': openapi.Schema(type=openapi.TYPE_STRING, description='Theme'),
                 'num_results': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of Results', minimum=1, maximum=4)
             }),
+            'callback_url': openapi.Schema(type=openapi.TYPE_STRING, description='작업 완료 시 웹훅을 받을 URL'),
         },
         required=['concept_option']
     ),
     responses={
-        201: openapi.Response('Recreated Image Successfully', RecreatedBackgroundSerializer),
+        202: openapi.Response('Recreation Accepted', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'task_id': openapi.Schema(type=openapi.TYPE_STRING, description='Celery Task ID'),
+                's3_url': openapi.Schema(type=openapi.TYPE_STRING, description='재생성될 이미지의 S3 URL'),
+            }
+        )),
         400: 'Bad Request',
         404: 'Not Found',
         500: 'Internal Server Error'
@@ -46,6 +50,7 @@ logger = logging.getLogger(__name__)
 def recreate_background_view(request):
     # 요청 데이터에서 필요한 값을 추출
     concept_option = request.data.get('concept_option')
+    callback_url = request.data.get('callback_url')
 
     logger.debug("Received request data: %s", request.data)
 
@@ -53,6 +58,11 @@ def recreate_background_view(request):
     if not concept_option:
         logger.debug("Missing required parameter: concept_option")
         return Response({"error": "concept_option is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if callback_url:
+        try:
+            validate_callback_url(callback_url)
+        except ValidationError:
+            return Response({"error": "callback_url is invalid"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         # 사용자의 가장 최근에 생성된 Background 객체를 가져옴
@@ -61,77 +71,17 @@ def recreate_background_view(request):
     except Background.DoesNotExist:
         return Response({"error": "Background not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    user = background.user
-    image = background.image
-
-    # 이미지 테이블에 있는 사용자가 업로드한 사진의 URL을 다운로드
-    image_url = image.image_url
-    try:
-        image_response = requests.get(image_url)
-        image_response.raise_for_status()
-        image_file = io.BytesIO(image_response.content)
-        logger.debug("Downloaded image from URL: %s", image_url)
-    except requests.RequestException as e:
-        logger.error("Failed to download image: %s", e)
-        return Response({"error": "Failed to download image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    # API 호출 준비
-    url = "https://api.draph.art/v1/generate/"
-    headers = {'Authorization': f'Bearer {settings.DRAPHART_API_KEY}'}
-
-    # 파일 객체에 파일 이름을 수동으로 추가
-    files = {
-        'image': ('image.jpg', image_file, 'image/jpeg')
-    }
-
-    # 요청 데이터 구성
-    data = {
-        "username": settings.DRAPHART_USER_NAME,
-        "gen_type": background.gen_type,
-        "output_w": background.output_w,
-        "output_h": background.output_h,
-        'concept_option': json.dumps(concept_option),
-    }
-
-    # API 호출
-    response = requests.post(url, headers=headers, data=data, files=files)
-
-    if response.status_code != 200:
-        logger.debug("AI 이미지 생성 실패: %s", response.text)
-        return Response({"error": "AI 이미지 생성 실패", "details": response.text}, status=status.HTTP_400_BAD_REQUEST)
-
-    response_data = response.content
-
-    try:
-        # base64 이미지를 디코딩하고 처리
-        image_data = base64.b64decode(response_data)
-        image_bytes = io.BytesIO(image_data)
-        pil_image = PILImage.open(image_bytes)
-        pil_image = pil_image.convert('RGB')
-        png_image_bytes = io.BytesIO()
-        pil_image.save(png_image_bytes, format='PNG')
-        png_image_bytes.seek(0)
-
-        # S3에 업로드
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        unique_filename = f"{uuid.uuid4()}.png"
-        s3.upload_fileobj(png_image_bytes, settings.AWS_STORAGE_BUCKET_NAME, unique_filename, ExtraArgs={'ContentType': 'image/png'})
-        s3_url = f"http://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{unique_filename}"
-
-    except Exception as e:
-        logger.error("Error uploading to S3: %s", e)
-        return Response({"error": "Failed to upload image to S3", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # UUID 생성 및 S3 URL 설정
+    unique_filename = encoding.output_filename(str(uuid.uuid4()))
+    s3_url = storage.build_url(unique_filename)
 
-    # RecreatedBackground 모델에 저장
-    recreated_background = RecreatedBackground.objects.create(
-        background=background,
-        concept_option=concept_option,
-        image_url=s3_url,
-    )
+    # 비동기 작업으로 배경 이미지 재생성 (웹 워커가 생성 작업을 기다리지 않도록 함)
+    # 작업 ID는 Celery 태스크 ID와 같으며, 태스크 발행 전에 상태 레코드를 만들어 바로 조회할 수 있게 함
+    task_id = str(uuid.uuid4())
+    jobs.create_job(task_id, 'background_recreate', callback_url)
+    task = recreate_background_task.apply_async(args=(background.id, concept_option, unique_filename), task_id=task_id)
 
-    # 성공적으로 저장되었음을 클라이언트에게 반환
-    serializer = RecreatedBackgroundSerializer(recreated_background)
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response({"task_id": task.id, "s3_url": s3_url}, status=status.HTTP_202_ACCEPTED)
 
 @swagger_auto_schema(
     method='get',
@@ -167,11 +117,9 @@ def recreated_background_manage(request, recreated_backgroundId):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'DELETE':
-        s3 = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
-        file_key = recreated_background.image_url.split('/')[-1]
         try:
-            # S3에서 파일 삭제
-            s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+            # S3 파일 삭제는 큐에 추가하고 백그라운드에서 일괄 처리
+            storage.enqueue_delete(storage.key_from_url(recreated_background.image_url))
         except Exception as e:
             logger.error("S3 파일 삭제 오류: %s", e)
             return Response({"error": "S3 파일 삭제 오류", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)